@@ -1,24 +1,40 @@
 # app.py - Aplicação Principal Flask Atualizada (raiz do projeto)
-from flask import Flask
+from flask import Flask, Response
 from config import Config
 from extensions import db, migrate
 
-def create_app():
+def create_app(config_class=Config):
     """Factory function para criar a aplicação Flask"""
     app = Flask(__name__)
-    app.config.from_object(Config)
+    app.config.from_object(config_class)
     
     # Inicializar extensões
     db.init_app(app)
     migrate.init_app(app, db)
     
+    # Instrumentação de requisições, LLM e banco para /metrics
+    from services.metrics import init_metrics
+    init_metrics(app, db)
+    
+    # Detector de consultas N+1 (relatório por requisição em modo debug)
+    from services.query_audit import init_query_audit
+    init_query_audit(app, db)
+    
+    # Fila de jobs em segundo plano (workers iniciados na primeira requisição)
+    from services.job_queue import init_job_queue
+    init_job_queue(app)
+    
     # Importar modelos (necessário para migrations)
     from models import (
         BrainstormSession, Card, SocraticSessionAnswers, 
         BloomTaxonomyLevel, BloomObjective, GdcTemplate, 
-        GdcSection, GdcNote, GroqResponse
+        GdcSection, GdcNote, GroqResponse, TokenUsageRollup
     )
     
+    # Níveis de Bloom carregados uma vez em memória
+    from services.bloom_taxonomy import init_bloom_taxonomy
+    init_bloom_taxonomy(app)
+    
     # Registrar blueprints
     try:
         from routes.home import home_bp
@@ -58,6 +74,18 @@ def create_app():
     except ImportError:
         print("⚠️  routes.gamedesign não encontrado")
     
+    try:
+        from routes.jobs import jobs_bp
+        app.register_blueprint(jobs_bp, url_prefix='/jobs')
+    except ImportError:
+        print("⚠️  routes.jobs não encontrado")
+    
+    try:
+        from routes.usage import usage_bp
+        app.register_blueprint(usage_bp, url_prefix='/usage')
+    except ImportError:
+        print("⚠️  routes.usage não encontrado")
+    
     # Rota de health check
     @app.route('/health')
     def health_check():
@@ -79,6 +107,13 @@ def create_app():
                 'error': str(e)
             }, 500
     
+    # Métricas no formato texto do Prometheus
+    @app.route('/metrics')
+    def metrics():
+        """Exposição das métricas para o Prometheus"""
+        from services.metrics import render_metrics
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+    
     return app
 
 if __name__ == '__main__':
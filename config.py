@@ -12,7 +12,7 @@ class Config:
     
     # Configuração do banco MySQL
     MYSQL_HOST = os.environ.get('MYSQL_HOST')
-    MYSQL_PORT = int(os.environ.get('MYSQL_PORT'))
+    MYSQL_PORT = int(os.environ.get('MYSQL_PORT', 3306))
     MYSQL_USER = os.environ.get('MYSQL_USER')
     MYSQL_PASSWORD = os.environ.get('MYSQL_PASSWORD')
     MYSQL_DATABASE = os.environ.get('MYSQL_DATABASE', 'defaultdb')
@@ -34,10 +34,131 @@ class Config:
     # Configuração para integração com LLMs
     GROQ_API_KEY = os.environ.get('GROQ_API_KEY', 'sua-chave-groq-aqui')
     GROQ_MODEL = os.environ.get('GROQ_MODEL', 'llama-3.3-70b-versatile')
+    GROQ_BASE_URL = os.environ.get('GROQ_BASE_URL', 'https://api.groq.com/openai/v1')
     
     # Configuração Gemini
     GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY', 'sua-chave-gemini-aqui')
     GEMINI_MODEL = os.environ.get('GEMINI_MODEL', 'gemini-2.0-flash')
+    GEMINI_BASE_URL = os.environ.get('GEMINI_BASE_URL', 'https://generativelanguage.googleapis.com/v1beta')
+    
+    # Para apontar os serviços ao servidor local de testes (mock_llm_server.py), use por exemplo
+    # GROQ_BASE_URL=http://127.0.0.1:8099/openai/v1 e GEMINI_BASE_URL=http://127.0.0.1:8099/v1beta
+    
+    # Pool HTTP compartilhado pelos provedores de LLM
+    LLM_POOL_SIZE = int(os.environ.get('LLM_POOL_SIZE', 10))
+    LLM_CONNECT_TIMEOUT = float(os.environ.get('LLM_CONNECT_TIMEOUT', 5))
+    LLM_READ_TIMEOUT = float(os.environ.get('LLM_READ_TIMEOUT', 60))
+    
+    # Orçamento de tokens de prompt por modelo (montagem de prompts em services/prompt_builder.py)
+    LLM_PROMPT_TOKEN_BUDGET = int(os.environ.get('LLM_PROMPT_TOKEN_BUDGET', 3000))
+    LLM_PROMPT_TOKEN_BUDGETS = {
+        'llama-3.3-70b-versatile': 6000,
+        'gemini-2.0-flash': 8000
+    }
+    
+    # Cache de respostas de LLM (L1 em memória, L2 em groq_responses)
+    LLM_CACHE_ENABLED = os.environ.get('LLM_CACHE_ENABLED', 'True').lower() == 'true'
+    LLM_CACHE_TTL_SECONDS = int(os.environ.get('LLM_CACHE_TTL_SECONDS', 3600))
+    LLM_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 1000))
+    LLM_CACHE_L2_ENABLED = os.environ.get('LLM_CACHE_L2_ENABLED', 'True').lower() == 'true'
+    LLM_CACHE_L2_TTL_SECONDS = int(os.environ.get('LLM_CACHE_L2_TTL_SECONDS', 7 * 24 * 3600))
+    
+    # Cache semântico de prompts quase idênticos (opcional, requer NumPy)
+    LLM_SEMANTIC_CACHE_ENABLED = os.environ.get('LLM_SEMANTIC_CACHE_ENABLED', 'False').lower() == 'true'
+    LLM_SEMANTIC_CACHE_THRESHOLD = float(os.environ.get('LLM_SEMANTIC_CACHE_THRESHOLD', 0.92))
+    LLM_SEMANTIC_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_SEMANTIC_CACHE_MAX_ENTRIES', 500))  # por module_type
+    LLM_SEMANTIC_CACHE_DIMENSIONS = int(os.environ.get('LLM_SEMANTIC_CACHE_DIMENSIONS', 4096))
+    LLM_SEMANTIC_CACHE_LOG_SCORES = os.environ.get('LLM_SEMANTIC_CACHE_LOG_SCORES', 'True').lower() == 'true'
+    
+    # Coalescência de chamadas idênticas em andamento (single-flight)
+    LLM_COALESCING_ENABLED = os.environ.get('LLM_COALESCING_ENABLED', 'True').lower() == 'true'
+    
+    # Limitador de taxa por provedor/modelo (ajustado pelos cabeçalhos x-ratelimit-*)
+    LLM_RATE_LIMIT_ENABLED = os.environ.get('LLM_RATE_LIMIT_ENABLED', 'True').lower() == 'true'
+    LLM_RATE_LIMIT_MAX_WAIT = float(os.environ.get('LLM_RATE_LIMIT_MAX_WAIT', 10))
+    LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', 3))
+    LLM_RATE_LIMITS = {
+        'groq': {
+            'requests_per_minute': int(os.environ.get('GROQ_REQUESTS_PER_MINUTE', 30)),
+            'tokens_per_minute': int(os.environ.get('GROQ_TOKENS_PER_MINUTE', 12000))
+        },
+        'gemini': {
+            'requests_per_minute': int(os.environ.get('GEMINI_REQUESTS_PER_MINUTE', 15)),
+            'tokens_per_minute': int(os.environ.get('GEMINI_TOKENS_PER_MINUTE', 1000000))
+        }
+    }
+    
+    # Roteamento entre provedores: circuit breaker, failover e hedging
+    LLM_ROUTING_ENABLED = os.environ.get('LLM_ROUTING_ENABLED', 'True').lower() == 'true'
+    LLM_ROUTER_WINDOW = int(os.environ.get('LLM_ROUTER_WINDOW', 50))
+    LLM_BREAKER_MIN_SAMPLES = int(os.environ.get('LLM_BREAKER_MIN_SAMPLES', 5))
+    LLM_BREAKER_ERROR_THRESHOLD = float(os.environ.get('LLM_BREAKER_ERROR_THRESHOLD', 0.5))
+    LLM_BREAKER_COOLDOWN_SECONDS = float(os.environ.get('LLM_BREAKER_COOLDOWN_SECONDS', 30))
+    LLM_HEDGE_ENABLED = os.environ.get('LLM_HEDGE_ENABLED', 'False').lower() == 'true'
+    
+    # Gravação assíncrona (write-behind) de groq_responses
+    AUDIT_SINK_ENABLED = os.environ.get('AUDIT_SINK_ENABLED', 'True').lower() == 'true'
+    AUDIT_QUEUE_SIZE = int(os.environ.get('AUDIT_QUEUE_SIZE', 1000))
+    AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', 50))
+    AUDIT_FLUSH_INTERVAL = float(os.environ.get('AUDIT_FLUSH_INTERVAL', 1.0))
+    
+    # Discussão multiagentes: agentes consultados em paralelo sob um prazo global
+    MULTIAGENT_MAX_WORKERS = int(os.environ.get('MULTIAGENT_MAX_WORKERS', 8))
+    MULTIAGENT_DEADLINE_SECONDS = float(os.environ.get('MULTIAGENT_DEADLINE_SECONDS', 45))
+    MULTIAGENT_SINGLE_CALL_SYNTHESIS = os.environ.get('MULTIAGENT_SINGLE_CALL_SYNTHESIS', 'True').lower() == 'true'
+    
+    # Sugestões do canvas em lote: várias seções por chamada, divididas pelo limite de saída
+    GDC_BATCH_MAX_SECTIONS = int(os.environ.get('GDC_BATCH_MAX_SECTIONS', 9))
+    GDC_BATCH_TOKENS_PER_SECTION = int(os.environ.get('GDC_BATCH_TOKENS_PER_SECTION', 250))
+    GDC_BATCH_MAX_OUTPUT_TOKENS = int(os.environ.get('GDC_BATCH_MAX_OUTPUT_TOKENS', 4000))
+    
+    # Contabilidade de tokens: preço (USD por milhão de tokens) e orçamento por sessão
+    LLM_MODEL_PRICING = {
+        'llama-3.3-70b-versatile': {'prompt': 0.59, 'completion': 0.79},
+        'llama-3.1-8b-instant': {'prompt': 0.05, 'completion': 0.08},
+        'gemini-2.0-flash': {'prompt': 0.10, 'completion': 0.40},
+        'gemini-2.0-flash-lite': {'prompt': 0.075, 'completion': 0.30}
+    }
+    LLM_SESSION_TOKEN_BUDGET = int(os.environ.get('LLM_SESSION_TOKEN_BUDGET', 0))  # 0 = sem limite
+    LLM_SESSION_COST_BUDGET_USD = float(os.environ.get('LLM_SESSION_COST_BUDGET_USD', 0))  # 0 = sem limite
+    LLM_BUDGET_EXCEEDED_ACTION = os.environ.get('LLM_BUDGET_EXCEEDED_ACTION', 'downgrade')  # downgrade | block
+    LLM_BUDGET_HARD_LIMIT_FACTOR = float(os.environ.get('LLM_BUDGET_HARD_LIMIT_FACTOR', 2.0))
+    LLM_BUDGET_DOWNGRADE_MODELS = {
+        'groq': os.environ.get('GROQ_DOWNGRADE_MODEL', 'llama-3.1-8b-instant'),
+        'gemini': os.environ.get('GEMINI_DOWNGRADE_MODEL', 'gemini-2.0-flash-lite')
+    }
+    LLM_BUDGET_CACHE_SECONDS = float(os.environ.get('LLM_BUDGET_CACHE_SECONDS', 30))
+    
+    # Fila de jobs em segundo plano (SQLite; padrão instance/jobs.sqlite3)
+    JOB_QUEUE_PATH = os.environ.get('JOB_QUEUE_PATH')
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 4))  # 0 = este processo só enfileira
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 0.5))
+    JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', 300))
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 2))
+    JOB_RETENTION_HOURS = float(os.environ.get('JOB_RETENTION_HOURS', 24))
+    JOB_EVENTS_TIMEOUT_SECONDS = float(os.environ.get('JOB_EVENTS_TIMEOUT_SECONDS', 300))
+    
+    # Pré-geração da próxima etapa ao finalizar brainstorm/socrático (via fila de jobs)
+    PREFETCH_ENABLED = os.environ.get('PREFETCH_ENABLED', 'True').lower() == 'true'
+    PREFETCH_WAIT_SECONDS = float(os.environ.get('PREFETCH_WAIT_SECONDS', 10))  # espera por pré-geração em andamento
+    
+    # Níveis de Bloom em memória: recarregados quando a tabela muda ou após este intervalo
+    BLOOM_TAXONOMY_REFRESH_SECONDS = float(os.environ.get('BLOOM_TAXONOMY_REFRESH_SECONDS', 300))
+    
+    # Detector de N+1: relatório por requisição de consultas repetidas e acima do orçamento
+    QUERY_AUDIT_ENABLED = os.environ.get('QUERY_AUDIT_ENABLED', os.environ.get('FLASK_DEBUG', 'False')).lower() == 'true'
+    QUERY_AUDIT_MAX_QUERIES = int(os.environ.get('QUERY_AUDIT_MAX_QUERIES', 20))
+    QUERY_AUDIT_REPEAT_THRESHOLD = int(os.environ.get('QUERY_AUDIT_REPEAT_THRESHOLD', 3))  # mesma SQL N vezes
+    
+    # Lote de alterações de cards do brainstorming (/brainstorm/cards/batch)
+    BRAINSTORM_BATCH_MAX_CHANGES = int(os.environ.get('BRAINSTORM_BATCH_MAX_CHANGES', 500))
+    
+    # Métricas Prometheus em /metrics (latência por rota, chamadas de LLM e SQL)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+    # Obrigatório com vários workers (gunicorn -w N): diretório compartilhado onde cada
+    # processo grava suas métricas para /metrics somar todos (limpar a cada deploy)
+    METRICS_MULTIPROC_DIR = os.environ.get('METRICS_MULTIPROC_DIR') or None
+    METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', 5))  # gravação periódica por processo
     
     @classmethod
     def validate_config(cls):
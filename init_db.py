@@ -2,53 +2,7 @@
 from app import create_app
 from extensions import db
 from models import BloomTaxonomyLevel, GdcTemplate, GdcSection
-import json
-
-# Dados dos níveis da Taxonomia de Bloom
-BLOOM_LEVELS = [
-    {
-        'name': 'Criar',
-        'description': 'Juntar elementos para formar um todo coerente ou funcional; reorganizar elementos em um novo padrão ou estrutura.',
-        'color': '#8B4513',
-        'order': 6,
-        'verbs': ['criar', 'desenvolver', 'projetar', 'construir', 'inventar', 'formular']
-    },
-    {
-        'name': 'Avaliar', 
-        'description': 'Fazer julgamentos baseados em critérios e padrões.',
-        'color': '#FF4500',
-        'order': 5,
-        'verbs': ['avaliar', 'julgar', 'criticar', 'verificar', 'testar', 'monitorar']
-    },
-    {
-        'name': 'Analisar',
-        'description': 'Quebrar material em partes constituintes e determinar como as partes se relacionam entre si.',
-        'color': '#FFD700',
-        'order': 4,
-        'verbs': ['analisar', 'comparar', 'contrastar', 'organizar', 'desconstruir', 'questionar']
-    },
-    {
-        'name': 'Aplicar',
-        'description': 'Executar ou usar um procedimento em uma situação específica.',
-        'color': '#32CD32',
-        'order': 3,
-        'verbs': ['aplicar', 'executar', 'implementar', 'demonstrar', 'usar', 'ilustrar']
-    },
-    {
-        'name': 'Compreender',
-        'description': 'Construir significado a partir de mensagens instrucionais, incluindo comunicação oral, escrita e gráfica.',
-        'color': '#4169E1',
-        'order': 2,
-        'verbs': ['compreender', 'interpretar', 'exemplificar', 'classificar', 'resumir', 'explicar']
-    },
-    {
-        'name': 'Lembrar',
-        'description': 'Recuperar conhecimento relevante da memória de longo prazo.',
-        'color': '#8A2BE2',
-        'order': 1,
-        'verbs': ['lembrar', 'reconhecer', 'listar', 'identificar', 'recuperar', 'nomear']
-    }
-]
+from services.bloom_taxonomy import BLOOM_LEVELS
 
 # Seções do Endo-GDC
 ENDO_GDC_SECTIONS = [
@@ -133,8 +87,7 @@ def init_bloom_levels():
                 name=level_data['name'],
                 description=level_data['description'],
                 level_order=level_data['order'],
-                color=level_data['color'],
-                verbs=json.dumps(level_data['verbs'])
+                color=level_data['color']
             )
             db.session.add(level)
             print(f"  Adicionado nível: {level_data['name']}")
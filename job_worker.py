@@ -0,0 +1,25 @@
+# job_worker.py - Processo dedicado aos jobs em segundo plano
+"""
+Executa apenas os workers da fila de jobs (geração de objetivos, chat multiagentes),
+para que os processos web possam rodar com JOB_WORKERS=0 e só enfileirar.
+
+Uso: JOB_WORKERS=8 python job_worker.py
+"""
+
+import time
+from app import create_app
+
+if __name__ == '__main__':
+    app = create_app()
+    pool = app.extensions['job_workers']
+
+    print(f"⚙️  {pool.size} workers consumindo {app.extensions['job_queue'].path}")
+    print("Pressione Ctrl+C para parar")
+    pool.start()
+
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        print("\nEncerrando workers...")
+        pool.stop()
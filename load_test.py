@@ -0,0 +1,417 @@
+# load_test.py - Teste de carga HTTP de ponta a ponta dos blueprints
+"""
+Sobe create_app() contra um banco local e o servidor LLM simulado (mock_llm_server.py),
+executa cargas mistas realistas e mede latência p50/p95/p99, requisições por segundo
+e taxa de erro por endpoint.
+
+Cenários:
+  classroom   - muitos alunos arrastando/criando cards e poucos gerando com IA (padrão)
+  drag        - apenas arrastar/criar/editar cards e salvar respostas
+  generation  - apenas rotas que chamam LLM
+
+Uso:
+  python load_test.py --students 40 --generators 4 --duration 30
+  python load_test.py --scenario drag --output benchmarks/drag-baseline.json
+  python load_test.py --compare benchmarks/drag-baseline.json --tolerance 0.2
+
+Com --compare o processo termina com código 1 se algum endpoint regredir.
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import requests
+from sqlalchemy.dialects.mysql import LONGTEXT
+from sqlalchemy.ext.compiler import compiles
+from werkzeug.serving import make_server
+
+from app import create_app
+from config import Config
+from extensions import db
+from mock_llm_server import MockSettings, create_mock_app
+
+
+@compiles(LONGTEXT, 'sqlite')
+def _compile_longtext_sqlite(type_, compiler, **kw):
+    """Os modelos usam LONGTEXT do MySQL; no SQLite local vira TEXT"""
+    return 'TEXT'
+
+
+# Peso de cada operação por tipo de usuário virtual
+STUDENT_MIX = [
+    ('update-card-position', 70),
+    ('add-card', 12),
+    ('update-card', 10),
+    ('save-answers', 5),
+    ('brainstorm-page', 3)
+]
+
+GENERATOR_MIX = [
+    ('generate-objectives', 35),
+    ('socratic-suggestions', 30),
+    ('multiagent-chat', 20),
+    ('brainstorm-suggestions', 15)
+]
+
+SCENARIOS = {
+    'classroom': {'students': True, 'generators': True},
+    'drag': {'students': True, 'generators': False},
+    'generation': {'students': False, 'generators': True}
+}
+
+
+def build_config(database_url, mock_url, args):
+    """Configuração da aplicação para o teste de carga"""
+
+    class LoadTestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        SQLALCHEMY_ENGINE_OPTIONS = (
+            {'connect_args': {'timeout': 30}} if database_url.startswith('sqlite')
+            else Config.SQLALCHEMY_ENGINE_OPTIONS
+        )
+        GROQ_BASE_URL = f'{mock_url}/openai/v1'
+        GEMINI_BASE_URL = f'{mock_url}/v1beta'
+        GROQ_API_KEY = 'load-test'
+        GEMINI_API_KEY = 'load-test'
+        LLM_CACHE_ENABLED = args.llm_cache
+        LLM_CACHE_L2_ENABLED = args.llm_cache
+        LLM_RATE_LIMIT_ENABLED = args.rate_limit
+
+    return LoadTestConfig
+
+
+def start_server(app, host='127.0.0.1'):
+    """Servidor WSGI com threads em uma porta livre, rodando em segundo plano"""
+    server = make_server(host, 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f'http://{host}:{server.server_port}'
+
+
+def seed_sessions(app, count, cards_per_session):
+    """Cria sessões com cards e respostas socráticas; retorna {session_id: [card_ids]}"""
+    from models import BrainstormSession, Card, SocraticSessionAnswers
+
+    sessions = {}
+    with app.app_context():
+        db.create_all()
+        for index in range(count):
+            session = BrainstormSession(status='active', theme=f'Jogo de carga {index}')
+            db.session.add(session)
+            db.session.flush()
+
+            cards = [
+                Card(session_id=session.id, content=f'Ideia {n} da sessão {session.id}',
+                     category='geral', color='#FFD700', position_x=n * 10, position_y=n * 10)
+                for n in range(cards_per_session)
+            ]
+            db.session.add_all(cards)
+            db.session.add(SocraticSessionAnswers(
+                session_id=session.id,
+                problem=f'Problema da sessão {session.id}',
+                justification='Jogos aproximam teoria e prática',
+                impact='Maior engajamento',
+                motivation='Desafios e colaboração'
+            ))
+            db.session.flush()
+            sessions[session.id] = [card.id for card in cards]
+
+        db.session.commit()
+    return sessions
+
+
+class Recorder:
+    """Coleta latência e erros por endpoint (thread-safe)"""
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def record(self, name, latency_ms, ok):
+        with self.lock:
+            self.samples.setdefault(name, []).append(latency_ms)
+            self.errors[name] = self.errors.get(name, 0) + (0 if ok else 1)
+
+
+def percentile(sorted_values, pct):
+    """Percentil por posição mais próxima (valores já ordenados)"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def run_operation(http, base_url, name, session_id, card_ids):
+    """Executa uma operação e retorna a resposta HTTP"""
+    if name == 'update-card-position':
+        return http.post(f'{base_url}/brainstorm/update-card-position', json={
+            'card_id': random.choice(card_ids),
+            'position_x': random.uniform(0, 1200),
+            'position_y': random.uniform(0, 800)
+        })
+    if name == 'add-card':
+        response = http.post(f'{base_url}/brainstorm/add-card', json={
+            'session_id': session_id,
+            'text': f'Nova ideia {random.randint(1, 10 ** 6)}',
+            'position_x': random.uniform(0, 1200),
+            'position_y': random.uniform(0, 800)
+        })
+        card = (response.json() or {}).get('card') if response.ok else None
+        if card and card.get('id'):
+            card_ids.append(card['id'])
+        return response
+    if name == 'update-card':
+        return http.post(f'{base_url}/brainstorm/update-card', json={
+            'card_id': random.choice(card_ids),
+            'text': f'Ideia revisada {random.randint(1, 10 ** 6)}',
+            'color': '#87CEEB'
+        })
+    if name == 'save-answers':
+        return http.post(f'{base_url}/socratic/save-answers', json={
+            'session_id': session_id,
+            'problem': f'Problema revisado {random.randint(1, 10 ** 6)}'
+        })
+    if name == 'brainstorm-page':
+        return http.get(f'{base_url}/brainstorm/', params={'session_id': session_id})
+    if name == 'generate-objectives':
+        return http.post(f'{base_url}/bloom/generate-objectives', json={'session_id': session_id})
+    if name == 'socratic-suggestions':
+        return http.post(f'{base_url}/socratic/get-suggestions', json={'session_id': session_id})
+    if name == 'multiagent-chat':
+        return http.post(f'{base_url}/gamedesign/multiagent-chat', json={
+            'session_id': session_id,
+            'message': 'Como tornar as mecânicas mais colaborativas?'
+        })
+    if name == 'brainstorm-suggestions':
+        return http.post(f'{base_url}/brainstorm/get-suggestions', json={'session_id': session_id})
+    raise ValueError(f'Operação desconhecida: {name}')
+
+
+def virtual_user(base_url, mix, session_id, card_ids, recorder, stop_at, think_ms):
+    """Laço de um usuário virtual até o fim do teste"""
+    http = requests.Session()
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+
+    while time.monotonic() < stop_at:
+        name = random.choices(names, weights)[0]
+        start_time = time.perf_counter()
+        try:
+            response = run_operation(http, base_url, name, session_id, card_ids)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            ok = False
+        recorder.record(name, (time.perf_counter() - start_time) * 1000, ok)
+
+        if think_ms:
+            time.sleep(random.uniform(0, 2 * think_ms) / 1000.0)
+
+    http.close()
+
+
+def run_phase(base_url, users, sessions, recorder, duration, think_ms):
+    """Roda todos os usuários virtuais em paralelo; retorna a duração real"""
+    stop_at = time.monotonic() + duration
+    start_time = time.monotonic()
+    threads = [
+        threading.Thread(
+            target=virtual_user,
+            args=(base_url, mix, session_id, sessions[session_id], recorder, stop_at, think_ms),
+            daemon=True
+        )
+        for mix, session_id in users
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.monotonic() - start_time
+
+
+def summarize(recorder, duration):
+    """Estatísticas por endpoint e totais"""
+    endpoints = {}
+    total_requests = 0
+    total_errors = 0
+
+    for name, latencies in sorted(recorder.samples.items()):
+        latencies = sorted(latencies)
+        errors = recorder.errors.get(name, 0)
+        total_requests += len(latencies)
+        total_errors += errors
+        endpoints[name] = {
+            'requests': len(latencies),
+            'errors': errors,
+            'error_rate': round(errors / len(latencies), 4),
+            'rps': round(len(latencies) / duration, 2),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'max_ms': round(latencies[-1], 2)
+        }
+
+    return endpoints, {
+        'requests': total_requests,
+        'errors': total_errors,
+        'error_rate': round(total_errors / total_requests, 4) if total_requests else 0.0,
+        'rps': round(total_requests / duration, 2)
+    }
+
+
+def print_report(endpoints, totals):
+    print(f"\n{'endpoint':<24}{'req':>8}{'rps':>9}{'p50':>10}{'p95':>10}{'p99':>10}{'erros':>8}")
+    for name, stats in endpoints.items():
+        print(f"{name:<24}{stats['requests']:>8}{stats['rps']:>9.1f}{stats['p50_ms']:>10.1f}"
+              f"{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['error_rate']:>8.1%}")
+    print(f"{'TOTAL':<24}{totals['requests']:>8}{totals['rps']:>9.1f}{'':>30}{totals['error_rate']:>8.1%}")
+
+
+def compare_with_baseline(endpoints, baseline_path, tolerance):
+    """Compara com uma execução salva; retorna a lista de regressões"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    regressions = []
+    print(f"\n📊 Comparação com {baseline_path} (tolerância {tolerance:.0%})")
+    for name, stats in endpoints.items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if not previous:
+            continue
+
+        p95_delta = (stats['p95_ms'] - previous['p95_ms']) / previous['p95_ms'] if previous['p95_ms'] else 0.0
+        rps_delta = (stats['rps'] - previous['rps']) / previous['rps'] if previous['rps'] else 0.0
+        print(f"   {name:<24} p95 {p95_delta:+.1%}   rps {rps_delta:+.1%}   "
+              f"erros {previous['error_rate']:.1%} → {stats['error_rate']:.1%}")
+
+        if p95_delta > tolerance:
+            regressions.append(f'{name}: p95 {previous["p95_ms"]}ms → {stats["p95_ms"]}ms')
+        if rps_delta < -tolerance:
+            regressions.append(f'{name}: rps {previous["rps"]} → {stats["rps"]}')
+        if stats['error_rate'] > previous['error_rate'] + 0.01:
+            regressions.append(f'{name}: taxa de erro {previous["error_rate"]:.1%} → {stats["error_rate"]:.1%}')
+
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga HTTP do Endo-GDC Maker')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='classroom')
+    parser.add_argument('--students', type=int, default=30, help='usuários arrastando/criando cards')
+    parser.add_argument('--generators', type=int, default=3, help='usuários gerando com IA')
+    parser.add_argument('--duration', type=float, default=20, help='segundos de medição')
+    parser.add_argument('--warmup', type=float, default=2, help='segundos de aquecimento (descartados)')
+    parser.add_argument('--think-ms', type=float, default=200, help='pausa média entre ações de um usuário')
+    parser.add_argument('--cards', type=int, default=20, help='cards por sessão no seed')
+    parser.add_argument('--database-url', default=None, help='padrão: SQLite em diretório temporário')
+    parser.add_argument('--mock-url', default=None, help='usar um mock_llm_server.py já em execução')
+    parser.add_argument('--latency', default='lognormal:600,0.4', help='distribuição de latência do mock')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fração de 500 injetados no mock')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='fração de 429 injetados no mock')
+    parser.add_argument('--llm-cache', action='store_true', help='manter o cache de respostas de LLM ligado')
+    parser.add_argument('--rate-limit', action='store_true', help='manter o limitador de taxa ligado')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', default=None, help='arquivo JSON com o resultado (baseline)')
+    parser.add_argument('--compare', default=None, help='baseline JSON para comparar')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='variação aceita antes de acusar regressão')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)  # sem log por requisição
+    scenario = SCENARIOS[args.scenario]
+    students = args.students if scenario['students'] else 0
+    generators = args.generators if scenario['generators'] else 0
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='endogdc-load-'), 'load.db')}"
+
+    mock_server = None
+    mock_url = args.mock_url
+    if not mock_url:
+        settings = MockSettings(latency=args.latency, error_rate=args.error_rate,
+                                rate_limit_rate=args.rate_limit_rate, seed=args.seed)
+        mock_server, mock_url = start_server(create_mock_app(settings))
+
+    app = create_app(build_config(database_url, mock_url, args))
+    sessions = seed_sessions(app, students + generators, args.cards)
+    app_server, base_url = start_server(app)
+
+    print("🚀 Teste de carga do Endo-GDC Maker")
+    print(f"   Cenário: {args.scenario} | alunos: {students} | geradores: {generators}")
+    print(f"   Banco: {database_url}")
+    print(f"   LLM simulado: {mock_url} ({args.latency})")
+
+    session_ids = list(sessions)
+    users = [(STUDENT_MIX, session_ids[i]) for i in range(students)]
+    users += [(GENERATOR_MIX, session_ids[students + i]) for i in range(generators)]
+
+    if args.warmup:
+        print(f"\n⏳ Aquecimento de {args.warmup:.0f}s...")
+        run_phase(base_url, users, sessions, Recorder(), args.warmup, args.think_ms)
+
+    print(f"⏱️  Medindo por {args.duration:.0f}s...")
+    recorder = Recorder()
+    duration = run_phase(base_url, users, sessions, recorder, args.duration, args.think_ms)
+
+    app_server.shutdown()
+    if mock_server:
+        mock_server.shutdown()
+
+    endpoints, totals = summarize(recorder, duration)
+    print_report(endpoints, totals)
+
+    result = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(),
+            'git_revision': git_revision(),
+            'scenario': args.scenario,
+            'students': students,
+            'generators': generators,
+            'duration_seconds': round(duration, 2),
+            'think_ms': args.think_ms,
+            'database': database_url.split(':', 1)[0],
+            'mock_latency': args.latency,
+            'llm_cache': args.llm_cache,
+            'rate_limit': args.rate_limit
+        },
+        'totals': totals,
+        'endpoints': endpoints
+    }
+
+    output = args.output or os.path.join(
+        'benchmarks', f"{args.scenario}-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Resultado salvo em {output}")
+
+    if args.compare:
+        regressions = compare_with_baseline(endpoints, args.compare, args.tolerance)
+        if regressions:
+            print("\n❌ Regressões encontradas:")
+            for regression in regressions:
+                print(f"   - {regression}")
+            sys.exit(1)
+        print("\n✅ Nenhuma regressão acima da tolerância")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+"""groq_responses: coluna prompt_hash para o cache de respostas
+
+Revision ID: 3f2a9c1d7e01
+Revises: 
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c1d7e01'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('groq_responses', sa.Column('prompt_hash', sa.String(length=64), nullable=True))
+    op.create_index('ix_groq_responses_prompt_hash', 'groq_responses', ['prompt_hash'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_groq_responses_prompt_hash', table_name='groq_responses')
+    op.drop_column('groq_responses', 'prompt_hash')
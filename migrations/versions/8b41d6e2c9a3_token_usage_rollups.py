@@ -0,0 +1,49 @@
+"""groq_responses: prompt_tokens/completion_tokens e tabela token_usage_rollups
+
+Revision ID: 8b41d6e2c9a3
+Revises: 3f2a9c1d7e01
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b41d6e2c9a3'
+down_revision = '3f2a9c1d7e01'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('groq_responses', sa.Column('prompt_tokens', sa.Integer(), nullable=True))
+    op.add_column('groq_responses', sa.Column('completion_tokens', sa.Integer(), nullable=True))
+
+    op.create_table(
+        'token_usage_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('model', sa.String(length=100), nullable=False),
+        sa.Column('module_type', sa.String(length=50), nullable=False),
+        sa.Column('session_id', sa.Integer(), nullable=False),
+        sa.Column('requests', sa.Integer(), nullable=False),
+        sa.Column('prompt_tokens', sa.BigInteger(), nullable=False),
+        sa.Column('completion_tokens', sa.BigInteger(), nullable=False),
+        sa.Column('total_tokens', sa.BigInteger(), nullable=False),
+        sa.Column('cost_usd', sa.Numeric(precision=12, scale=6), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('day', 'model', 'module_type', 'session_id', name='uq_token_usage_rollup')
+    )
+    op.create_index('ix_token_usage_rollups_session_id', 'token_usage_rollups', ['session_id'], unique=False)
+
+    # Os totais do histórico existente podem ser gerados com
+    # services.token_accounting.rebuild_rollups() dentro de um app context
+
+
+def downgrade():
+    op.drop_index('ix_token_usage_rollups_session_id', table_name='token_usage_rollups')
+    op.drop_table('token_usage_rollups')
+    op.drop_column('groq_responses', 'completion_tokens')
+    op.drop_column('groq_responses', 'prompt_tokens')
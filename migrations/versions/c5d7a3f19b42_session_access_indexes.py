@@ -0,0 +1,127 @@
+"""índices compostos dos caminhos de acesso por sessão e de groq_responses
+
+Revision ID: c5d7a3f19b42
+Revises: 8b41d6e2c9a3
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d7a3f19b42'
+down_revision = '8b41d6e2c9a3'
+branch_labels = None
+depends_on = None
+
+
+# (nome, tabela, colunas); as listas de sessão são lidas por session_id em ordem de id
+INDEXES = [
+    ('ix_cards_session_id_id', 'cards', ['session_id', 'id']),
+    ('ix_bloom_objectives_session_id_id', 'bloom_objectives', ['session_id', 'id']),
+    ('ix_game_groups_session_id_id', 'game_groups', ['session_id', 'id']),
+    ('ix_gdc_templates_session_id_id', 'gdc_templates', ['session_id', 'id']),
+    ('ix_gdc_sections_template_id_id', 'gdc_sections', ['template_id', 'id']),
+    ('ix_gdc_notes_section_id_id', 'gdc_notes', ['section_id', 'id']),
+    ('ix_groq_responses_module_type_created_at', 'groq_responses', ['module_type', 'created_at']),
+    ('ix_groq_responses_session_id_created_at', 'groq_responses', ['session_id', 'created_at']),
+]
+
+UNIQUE_INDEXES = [
+    ('uq_socratic_session_answers_session_id', 'socratic_session_answers', ['session_id']),
+    ('uq_bloom_taxonomy_levels_name', 'bloom_taxonomy_levels', ['name']),
+]
+
+
+# Linhas de respostas duplicadas removidas pelo upgrade (restauradas pelo downgrade)
+ANSWERS_BACKUP_TABLE = 'socratic_session_answers_duplicates'
+DUPLICATE_ANSWERS = (
+    'FROM socratic_session_answers WHERE id NOT IN ('
+    'SELECT id FROM (SELECT MIN(id) AS id FROM socratic_session_answers GROUP BY session_id) AS keep_rows)'
+)
+
+
+def _backup_duplicate_answers():
+    """
+    Copia para ANSWERS_BACKUP_TABLE as linhas que o índice único não aceita
+    (todas menos a primeira de cada sessão) e devolve os session_ids afetados
+    """
+    bind = op.get_bind()
+    session_ids = [row[0] for row in bind.execute(sa.text(f'SELECT DISTINCT session_id {DUPLICATE_ANSWERS}'))]
+    if not session_ids:
+        return []
+
+    if not sa.inspect(bind).has_table(ANSWERS_BACKUP_TABLE):
+        # Mesmas colunas, sem restrições (CREATE TABLE ... SELECT falha no MySQL com GTID)
+        source = sa.Table('socratic_session_answers', sa.MetaData(), autoload_with=bind)
+        op.create_table(ANSWERS_BACKUP_TABLE, *[sa.Column(column.name, column.type) for column in source.columns])
+    op.execute(f'INSERT INTO {ANSWERS_BACKUP_TABLE} SELECT * {DUPLICATE_ANSWERS}')
+    return session_ids
+
+
+def _existing(table):
+    """{nome: (colunas, único, tipo)} dos índices ('index') e restrições únicas ('constraint') da tabela"""
+    inspector = sa.inspect(op.get_bind())
+    found = {constraint['name']: (constraint['column_names'], True, 'constraint')
+             for constraint in inspector.get_unique_constraints(table)}
+    # No MySQL a restrição única também aparece como índice; o índice prevalece
+    found.update({index['name']: (index['column_names'], bool(index.get('unique')), 'index')
+                  for index in inspector.get_indexes(table)})
+    return found
+
+
+def _covered(table, columns, unique):
+    """True se já existe um índice com essas colunas (ex.: name UNIQUE criado pelo create_all)"""
+    return any(existing_columns == columns and (existing_unique or not unique)
+               for existing_columns, existing_unique, _ in _existing(table).values())
+
+
+def upgrade():
+    # Mantém só a primeira linha de respostas de cada sessão (a que .first() já devolvia);
+    # as demais ficam em ANSWERS_BACKUP_TABLE antes de sair da tabela
+    session_ids = _backup_duplicate_answers()
+    if session_ids:
+        print(f"⚠️  Respostas socráticas duplicadas movidas para {ANSWERS_BACKUP_TABLE} "
+              f"(sessões {', '.join(str(session_id) for session_id in session_ids)})")
+        op.execute(f'DELETE {DUPLICATE_ANSWERS}')
+
+    for name, table, columns in UNIQUE_INDEXES:
+        if not _covered(table, columns, unique=True):
+            op.create_index(name, table, columns, unique=True)
+
+    for name, table, columns in INDEXES:
+        if not _covered(table, columns, unique=False):
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    is_mysql = op.get_bind().dialect.name == 'mysql'
+    foreign_keys = {}
+
+    for name, table, columns in reversed(INDEXES + UNIQUE_INDEXES):
+        existing = _existing(table)
+        if name not in existing:
+            continue
+
+        # No MySQL o índice composto pode ter substituído o índice automático da FK;
+        # recria o índice simples antes de removê-lo
+        if is_mysql:
+            if table not in foreign_keys:
+                foreign_keys[table] = {column for fk in sa.inspect(op.get_bind()).get_foreign_keys(table)
+                                       for column in fk['constrained_columns']}
+            leading = columns[0]
+            if leading in foreign_keys[table] and not _covered(table, [leading], unique=False):
+                op.create_index(f'ix_{table}_{leading}', table, [leading], unique=False)
+
+        if existing[name][2] == 'index':
+            op.drop_index(name, table_name=table)
+        else:
+            # Restrição única criada pelo create_all (o SQLite exige recriar a tabela)
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.drop_constraint(name, type_='unique')
+
+    # Sem o índice único, as respostas duplicadas podem voltar para a tabela
+    if sa.inspect(op.get_bind()).has_table(ANSWERS_BACKUP_TABLE):
+        op.execute(f'INSERT INTO socratic_session_answers SELECT * FROM {ANSWERS_BACKUP_TABLE}')
+        op.drop_table(ANSWERS_BACKUP_TABLE)
@@ -0,0 +1,311 @@
+# mock_llm_server.py - Servidor local que imita as APIs do Groq e do Gemini
+"""
+Servidor HTTP local compatível com as APIs usadas por GroqService e GeminiService,
+para testar, medir e fazer testes de carga dos fluxos de LLM sem chaves reais.
+
+Endpoints:
+  POST /openai/v1/chat/completions                      (Groq, com ou sem stream)
+  POST /v1beta/models/<modelo>:generateContent          (Gemini)
+  POST /v1beta/models/<modelo>:streamGenerateContent    (Gemini, alt=sse)
+  GET  /stats                                           (contadores do servidor)
+
+Uso: python mock_llm_server.py --port 8099 --latency lognormal:800,0.5 --rate-limit-rate 0.02
+
+Depois aponte a aplicação para ele:
+  GROQ_BASE_URL=http://127.0.0.1:8099/openai/v1
+  GEMINI_BASE_URL=http://127.0.0.1:8099/v1beta
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from flask import Flask, Response, request, jsonify
+
+# Respostas prontas para os prompts com saída estruturada
+BLOOM_RESPONSE = {
+    'objectives': [
+        {'text': 'Criar um protótipo de jogo que aplique os conceitos estudados', 'level': 'Criar'},
+        {'text': 'Avaliar estratégias de resolução usadas pelos colegas', 'level': 'Avaliar'},
+        {'text': 'Analisar as relações entre as regras do jogo e o conteúdo', 'level': 'Analisar'},
+        {'text': 'Aplicar os conceitos em desafios práticos do jogo', 'level': 'Aplicar'},
+        {'text': 'Compreender os conceitos centrais apresentados na narrativa', 'level': 'Compreender'},
+        {'text': 'Lembrar os termos-chave introduzidos em cada fase', 'level': 'Lembrar'}
+    ]
+}
+
+SOCRATIC_RESPONSE = {
+    'problem': 'Os estudantes têm dificuldade em relacionar a teoria com situações práticas.',
+    'justification': 'Jogos permitem experimentar consequências de decisões em um ambiente seguro.',
+    'impact': 'Maior retenção do conteúdo e autonomia na resolução de problemas.',
+    'motivation': 'Desafios progressivos, colaboração e feedback imediato.'
+}
+
+SUGGESTIONS = [
+    {
+        'section': 'Mecânicas de Jogo',
+        'action': 'add',
+        'content': 'Sistema de pontos por desafio concluído com bônus por colaboração',
+        'justification': 'Reforça o engajamento e o trabalho em equipe'
+    },
+    {
+        'section': 'Narrativa',
+        'action': 'add',
+        'content': 'Jornada de um personagem que resolve problemas da comunidade',
+        'justification': 'Conecta o conteúdo a um contexto significativo'
+    }
+]
+
+LOREM_LINES = [
+    'Jogo de cartas colaborativo em que cada rodada introduz um novo conceito',
+    'RPG de investigação em que pistas são desbloqueadas respondendo perguntas',
+    'Jogo de tabuleiro com trilha de progressão ligada aos objetivos da aula',
+    'Desafios cooperativos com feedback imediato e recompensas coletivas'
+]
+
+
+class MockSettings:
+    """Configuração do servidor: latência, tokens e injeção de erros"""
+
+    def __init__(self, latency='lognormal:600,0.4', ttft_ms=150, tokens_per_second=200,
+                 completion_tokens=120, error_rate=0.0, rate_limit_rate=0.0,
+                 requests_per_minute=1000, tokens_per_minute=1000000, seed=None):
+        self.latency = latency
+        self.ttft_ms = ttft_ms
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.random = random.Random(seed)
+
+    def sample_latency_ms(self):
+        """
+        Sorteia a latência total segundo a distribuição configurada:
+        fixed:MS | uniform:MIN,MAX | normal:MEDIA,DESVIO | lognormal:MEDIANA,SIGMA
+        """
+        kind, _, params = self.latency.partition(':')
+        values = [float(v) for v in params.split(',') if v]
+
+        if kind == 'fixed':
+            return values[0]
+        if kind == 'uniform':
+            return self.random.uniform(values[0], values[1])
+        if kind == 'normal':
+            return max(0.0, self.random.gauss(values[0], values[1]))
+        if kind == 'lognormal':
+            return self.random.lognormvariate(math.log(values[0]), values[1])
+        raise ValueError(f'Distribuição de latência desconhecida: {self.latency}')
+
+
+def count_tokens(text):
+    """Contagem aproximada de tokens (palavras e pontuação)"""
+    return len(re.findall(r'\w+|[^\w\s]', text or ''))
+
+
+def canned_response(prompt):
+    """Escolhe uma resposta coerente com o tipo de prompt recebido"""
+    if '"objectives"' in prompt:
+        return json.dumps(BLOOM_RESPONSE, ensure_ascii=False)
+    if '"problem"' in prompt:
+        return json.dumps(SOCRATIC_RESPONSE, ensure_ascii=False)
+    if '"synthesis"' in prompt:
+        return json.dumps({
+            'synthesis': 'Os agentes convergem para um jogo colaborativo com progressão clara.',
+            'suggestions': SUGGESTIONS
+        }, ensure_ascii=False)
+    if '"sections"' in prompt:
+        names = re.findall(r'^- (.+)$', prompt, re.MULTILINE)
+        return json.dumps({
+            'sections': [
+                {'section': name, 'suggestions': [f'Sugestão para {name} 1', f'Sugestão para {name} 2']}
+                for name in names
+            ]
+        }, ensure_ascii=False)
+    if '"suggestions"' in prompt:
+        return json.dumps({'suggestions': SUGGESTIONS}, ensure_ascii=False)
+    return '\n'.join(LOREM_LINES)
+
+
+def create_mock_app(settings=None):
+    """Cria o app Flask do servidor simulado"""
+    settings = settings or MockSettings()
+    app = Flask(__name__)
+    stats = {'requests': 0, 'errors': 0, 'rate_limited': 0, 'streams': 0}
+    stats_lock = threading.Lock()
+
+    def count(name):
+        with stats_lock:
+            stats[name] += 1
+
+    def rate_limit_headers():
+        return {
+            'x-ratelimit-limit-requests': str(settings.requests_per_minute),
+            'x-ratelimit-limit-tokens': str(settings.tokens_per_minute),
+            'x-ratelimit-remaining-requests': str(settings.requests_per_minute - 1),
+            'x-ratelimit-remaining-tokens': str(settings.tokens_per_minute - settings.completion_tokens),
+            'x-ratelimit-reset-requests': '1s',
+            'x-ratelimit-reset-tokens': '1s'
+        }
+
+    def injected_error():
+        """Resposta de erro sorteada (429 ou 500) ou None"""
+        roll = settings.random.random()
+        if roll < settings.rate_limit_rate:
+            count('rate_limited')
+            headers = rate_limit_headers()
+            headers.update({'retry-after': '1', 'x-ratelimit-remaining-requests': '0'})
+            return jsonify({'error': {'code': 429, 'message': 'Rate limit exceeded',
+                                      'details': [{'retryDelay': '1s'}]}}), 429, headers
+        if roll < settings.rate_limit_rate + settings.error_rate:
+            count('errors')
+            return jsonify({'error': {'code': 500, 'message': 'Injected failure'}}), 500
+        return None
+
+    def split_chunks(content):
+        words = content.split(' ')
+        return [word + (' ' if i < len(words) - 1 else '') for i, word in enumerate(words)]
+
+    def stream_delays(chunks):
+        """Espera do primeiro token (TTFT) e depois ritmo de tokens por segundo"""
+        time.sleep(settings.ttft_ms / 1000.0)
+        for chunk in chunks:
+            yield chunk
+            time.sleep(1.0 / settings.tokens_per_second)
+
+    @app.route('/openai/v1/chat/completions', methods=['POST'])
+    def chat_completions():
+        count('requests')
+        error = injected_error()
+        if error:
+            return error
+
+        payload = request.get_json() or {}
+        prompt = ''.join(m.get('content', '') for m in payload.get('messages', []))
+        content = canned_response(prompt)
+        prompt_tokens = count_tokens(prompt)
+        completion_tokens = count_tokens(content)
+        usage = {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens
+        }
+        model = payload.get('model', 'mock-model')
+
+        if payload.get('stream'):
+            count('streams')
+
+            def generate():
+                for chunk in stream_delays(split_chunks(content)):
+                    data = {'object': 'chat.completion.chunk', 'model': model,
+                            'choices': [{'index': 0, 'delta': {'content': chunk}}]}
+                    yield f'data: {json.dumps(data, ensure_ascii=False)}\n\n'
+                final = {'object': 'chat.completion.chunk', 'model': model,
+                         'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}],
+                         'x_groq': {'usage': usage}}
+                yield f'data: {json.dumps(final)}\n\n'
+                yield 'data: [DONE]\n\n'
+
+            return Response(generate(), mimetype='text/event-stream', headers=rate_limit_headers())
+
+        time.sleep(settings.sample_latency_ms() / 1000.0)
+        return jsonify({
+            'object': 'chat.completion',
+            'model': model,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content},
+                         'finish_reason': 'stop'}],
+            'usage': usage
+        }), 200, rate_limit_headers()
+
+    @app.route('/v1beta/models/<path:model_action>', methods=['POST'])
+    def gemini(model_action):
+        count('requests')
+        model, _, action = model_action.partition(':')
+        if action not in ('generateContent', 'streamGenerateContent'):
+            return jsonify({'error': {'code': 404, 'message': f'Ação desconhecida: {action}'}}), 404
+
+        error = injected_error()
+        if error:
+            return error
+
+        payload = request.get_json() or {}
+        prompt = ''.join(
+            part.get('text', '')
+            for content in payload.get('contents', [])
+            for part in content.get('parts', [])
+        )
+        content = canned_response(prompt)
+        prompt_tokens = count_tokens(prompt)
+        completion_tokens = count_tokens(content)
+        usage = {
+            'promptTokenCount': prompt_tokens,
+            'candidatesTokenCount': completion_tokens,
+            'totalTokenCount': prompt_tokens + completion_tokens
+        }
+
+        if action == 'streamGenerateContent':
+            count('streams')
+
+            def generate():
+                for chunk in stream_delays(split_chunks(content)):
+                    data = {'candidates': [{'content': {'parts': [{'text': chunk}], 'role': 'model'}}],
+                            'usageMetadata': usage, 'modelVersion': model}
+                    yield f'data: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+            return Response(generate(), mimetype='text/event-stream')
+
+        time.sleep(settings.sample_latency_ms() / 1000.0)
+        return jsonify({
+            'candidates': [{'content': {'parts': [{'text': content}], 'role': 'model'},
+                            'finishReason': 'STOP'}],
+            'usageMetadata': usage,
+            'modelVersion': model
+        })
+
+    @app.route('/stats')
+    def server_stats():
+        with stats_lock:
+            return jsonify(dict(stats))
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor local simulando as APIs do Groq e do Gemini')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency', default='lognormal:600,0.4',
+                        help='fixed:MS | uniform:MIN,MAX | normal:MEDIA,DESVIO | lognormal:MEDIANA,SIGMA')
+    parser.add_argument('--ttft-ms', type=float, default=150, help='tempo até o primeiro token no streaming')
+    parser.add_argument('--tokens-per-second', type=float, default=200, help='ritmo do streaming')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fração de respostas 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='fração de respostas 429')
+    parser.add_argument('--requests-per-minute', type=int, default=1000)
+    parser.add_argument('--tokens-per-minute', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    settings = MockSettings(
+        latency=args.latency,
+        ttft_ms=args.ttft_ms,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        requests_per_minute=args.requests_per_minute,
+        tokens_per_minute=args.tokens_per_minute,
+        seed=args.seed
+    )
+
+    print(f"🧪 Servidor LLM simulado em http://{args.host}:{args.port}")
+    print(f"   GROQ_BASE_URL=http://{args.host}:{args.port}/openai/v1")
+    print(f"   GEMINI_BASE_URL=http://{args.host}:{args.port}/v1beta")
+
+    create_mock_app(settings).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
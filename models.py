@@ -1,7 +1,81 @@
 # models.py - COMPLETO baseado na estrutura real detectada (raiz do projeto)
+import json
 from extensions import db
 from datetime import datetime
+from sqlalchemy import event
 from sqlalchemy.dialects.mysql import TEXT, LONGTEXT
+from sqlalchemy.ext.mutable import MutableDict
+from sqlalchemy.types import TypeDecorator
+from services.bloom_taxonomy import bloom_taxonomy, DEFAULT_LEVEL_COLOR
+
+class JSONText(TypeDecorator):
+    """
+    Documento JSON numa coluna de texto: decodificado uma vez ao carregar a linha
+    e serializado uma vez no flush. JSON inválido no banco é lido como {}.
+    """
+    impl = TEXT
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return json.dumps(value)
+    
+    def process_result_value(self, value, dialect):
+        if not value:
+            return {}
+        try:
+            data = json.loads(value)
+        except ValueError:
+            print(f"⚠️  JSON inválido em coluna {self.__class__.__name__}, lido como vazio")
+            return {}
+        return data if isinstance(data, dict) else {}
+
+class JSONLongText(JSONText):
+    impl = LONGTEXT
+    cache_ok = True
+
+class JSONDocument(MutableDict):
+    """
+    Dicionário que marca a coluna como alterada a cada mudança de chave (só no
+    primeiro nível; para estruturas aninhadas, atribua o documento de novo).
+    Aceita também uma string JSON na atribuição (código legado).
+    """
+    @classmethod
+    def coerce(cls, key, value):
+        if isinstance(value, str):
+            try:
+                value = json.loads(value or '{}')
+            except ValueError:
+                value = {}
+        return super().coerce(key, value)
+
+class JSONField:
+    """Chave de um documento JSON exposta como atributo do modelo"""
+    
+    def __init__(self, column, key, default=None, normalize=None):
+        self.column = column
+        self.key = key
+        self.default = default
+        self.normalize = normalize
+    
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        data = getattr(obj, self.column)
+        return data.get(self.key, self.default) if data else self.default
+    
+    def __set__(self, obj, value):
+        if self.normalize:
+            value = self.normalize(value)
+        data = getattr(obj, self.column)
+        if data is None:
+            setattr(obj, self.column, {self.key: value})
+        else:
+            data[self.key] = value
+
+def _answer_text(value):
+    return value or ''
 
 class BrainstormSession(db.Model):
     __tablename__ = 'brainstorm_sessions'
@@ -15,6 +89,13 @@ class BrainstormSession(db.Model):
     description = db.Column(TEXT, nullable=True)
     duration_minutes = db.Column(db.Integer, nullable=True, default=30)
     created_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow)
+    
+    # Agregado da sessão (carregado em poucas consultas por services/session_loader.py)
+    # passive_deletes: a exclusão continua a cargo do banco, sem carregar os filhos
+    cards = db.relationship('Card', order_by='Card.id', lazy=True, passive_deletes=True)
+    socratic_answers = db.relationship('SocraticSessionAnswers', uselist=False, lazy=True, passive_deletes=True)
+    objectives = db.relationship('BloomObjective', order_by='BloomObjective.id', lazy=True, passive_deletes=True)
+    gdc_templates = db.relationship('GdcTemplate', order_by='GdcTemplate.id', lazy=True, passive_deletes=True)
 
 class Card(db.Model):
     __tablename__ = 'cards'
@@ -30,6 +111,10 @@ class Card(db.Model):
     created_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, nullable=True)
     
+    __table_args__ = (
+        db.Index('ix_cards_session_id_id', 'session_id', 'id'),
+    )
+    
     # Propriedade para compatibilidade com código que usa 'text'
     @property
     def text(self):
@@ -50,6 +135,10 @@ class BloomObjective(db.Model):
     verb = db.Column(db.String(100), nullable=True)
     created_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_bloom_objectives_session_id_id', 'session_id', 'id'),
+    )
+    
     # Propriedades para compatibilidade
     @property
     def text(self):
@@ -61,18 +150,26 @@ class BloomObjective(db.Model):
         
     @property
     def level(self):
-        # Retorna o nome do nível baseado no level_id
-        if self.level_id and self.taxonomy_level:
-            return self.taxonomy_level.name
-        return None
+        # Retorna o nome do nível baseado no level_id (registro em memória, sem consulta)
+        if not self.level_id:
+            return None
+        level = bloom_taxonomy.by_id(self.level_id)
+        if level:
+            return level.name
+        return self.taxonomy_level.name if self.taxonomy_level else None
     
     @level.setter
     def level(self, value):
-        # Encontra o level_id baseado no nome
+        # Encontra o level_id baseado no nome (aceita variações como 'Analisar (nível 4)')
         if value:
-            level_obj = BloomTaxonomyLevel.query.filter_by(name=value).first()
-            if level_obj:
-                self.level_id = level_obj.id
+            level = bloom_taxonomy.match(value)
+            if level and level.id is not None:
+                self.level_id = level.id
+    
+    @property
+    def color(self):
+        level = bloom_taxonomy.by_id(self.level_id)
+        return level.color if level else DEFAULT_LEVEL_COLOR
 
 class BloomTaxonomyLevel(db.Model):
     __tablename__ = 'bloom_taxonomy_levels'
@@ -96,6 +193,10 @@ class BloomTaxonomyLevel(db.Model):
     def level_order(self, value):
         self.order_level = value
 
+# Alterações na tabela de níveis recarregam o registro em memória
+for _event_name in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(BloomTaxonomyLevel, _event_name, bloom_taxonomy.invalidate)
+
 # Correção para SocraticSessionAnswers - Substitua no seu models.py
 
 class SocraticSessionAnswers(db.Model):
@@ -104,110 +205,30 @@ class SocraticSessionAnswers(db.Model):
     # Estrutura real: id, session_id, answers_json, created_at, updated_at
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.Integer, db.ForeignKey('brainstorm_sessions.id'), nullable=False)
-    answers_json = db.Column(LONGTEXT, nullable=False, default='{}')
+    answers_json = db.Column(JSONDocument.as_mutable(JSONLongText), nullable=False, default=dict)
     created_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, nullable=True)
     
+    # Uma linha de respostas por sessão
+    __table_args__ = (
+        db.Index('uq_socratic_session_answers_session_id', 'session_id', unique=True),
+    )
+    
+    # Campos dentro de answers_json (documento decodificado uma vez por instância)
+    problem = JSONField('answers_json', 'problem', '', _answer_text)
+    justification = JSONField('answers_json', 'justification', '', _answer_text)
+    impact = JSONField('answers_json', 'impact', '', _answer_text)
+    motivation = JSONField('answers_json', 'motivation', '', _answer_text)
+    
     def __init__(self, **kwargs):
-        # Extrair campos especiais antes de chamar o construtor pai
-        problem = kwargs.pop('problem', '')
-        justification = kwargs.pop('justification', '')
-        impact = kwargs.pop('impact', '')
-        motivation = kwargs.pop('motivation', '')
-        
-        # Chamar construtor pai com campos restantes
+        # Respostas vazias não entram no documento
+        answers = {name: kwargs.pop(name, '') for name in ('problem', 'justification', 'impact', 'motivation')}
+        kwargs.setdefault('answers_json', {})
         super().__init__(**kwargs)
         
-        # Inicializar JSON
-        if not self.answers_json:
-            self.answers_json = '{}'
-        
-        # Definir valores
-        if problem:
-            self.problem = problem
-        if justification:
-            self.justification = justification
-        if impact:
-            self.impact = impact
-        if motivation:
-            self.motivation = motivation
-    
-    # Propriedades com getters E setters
-    @property
-    def problem(self):
-        import json
-        try:
-            data = json.loads(self.answers_json or '{}')
-            return data.get('problem', '')
-        except:
-            return ''
-    
-    @problem.setter
-    def problem(self, value):
-        import json
-        try:
-            data = json.loads(self.answers_json or '{}')
-        except:
-            data = {}
-        data['problem'] = value or ''
-        self.answers_json = json.dumps(data)
-    
-    @property
-    def justification(self):
-        import json
-        try:
-            data = json.loads(self.answers_json or '{}')
-            return data.get('justification', '')
-        except:
-            return ''
-    
-    @justification.setter
-    def justification(self, value):
-        import json
-        try:
-            data = json.loads(self.answers_json or '{}')
-        except:
-            data = {}
-        data['justification'] = value or ''
-        self.answers_json = json.dumps(data)
-    
-    @property
-    def impact(self):
-        import json
-        try:
-            data = json.loads(self.answers_json or '{}')
-            return data.get('impact', '')
-        except:
-            return ''
-    
-    @impact.setter
-    def impact(self, value):
-        import json
-        try:
-            data = json.loads(self.answers_json or '{}')
-        except:
-            data = {}
-        data['impact'] = value or ''
-        self.answers_json = json.dumps(data)
-    
-    @property
-    def motivation(self):
-        import json
-        try:
-            data = json.loads(self.answers_json or '{}')
-            return data.get('motivation', '')
-        except:
-            return ''
-    
-    @motivation.setter
-    def motivation(self, value):
-        import json
-        try:
-            data = json.loads(self.answers_json or '{}')
-        except:
-            data = {}
-        data['motivation'] = value or ''
-        self.answers_json = json.dumps(data)
+        for name, value in answers.items():
+            if value:
+                setattr(self, name, value)
 
 class GameGroup(db.Model):
     __tablename__ = 'game_groups'
@@ -219,6 +240,10 @@ class GameGroup(db.Model):
     description = db.Column(TEXT, nullable=True)
     color = db.Column(db.String(7), nullable=True)
     created_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_game_groups_session_id_id', 'session_id', 'id'),
+    )
 
 class GdcTemplate(db.Model):
     __tablename__ = 'gdc_templates'
@@ -228,9 +253,15 @@ class GdcTemplate(db.Model):
     session_id = db.Column(db.Integer, db.ForeignKey('brainstorm_sessions.id'), nullable=True)
     name = db.Column(db.String(255), nullable=False)
     description = db.Column(TEXT, nullable=True)
-    canvas_data = db.Column(LONGTEXT, nullable=True)  # DADOS DO CANVAS EM JSON
+    canvas_data = db.Column(JSONDocument.as_mutable(JSONLongText), nullable=True)  # DADOS DO CANVAS EM JSON
     created_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, nullable=True)
+    
+    __table_args__ = (
+        db.Index('ix_gdc_templates_session_id_id', 'session_id', 'id'),
+    )
+    
+    sections = db.relationship('GdcSection', backref='template', order_by='GdcSection.id', lazy=True, passive_deletes=True)
 
 class GdcSection(db.Model):
     __tablename__ = 'gdc_sections'
@@ -241,36 +272,19 @@ class GdcSection(db.Model):
     name = db.Column(db.String(255), nullable=False)
     description = db.Column(TEXT, nullable=True)
     color = db.Column(db.String(7), nullable=True)
-    position_data = db.Column(TEXT, nullable=True)  # POSIÇÕES EM JSON, NÃO CAMPOS SEPARADOS
+    position_data = db.Column(JSONDocument.as_mutable(JSONText), nullable=True)  # POSIÇÕES EM JSON, NÃO CAMPOS SEPARADOS
     
-    # Propriedades para compatibilidade
-    @property
-    def position_x(self):
-        import json
-        try:
-            data = json.loads(self.position_data or '{}')
-            return data.get('x', 0)
-        except:
-            return 0
-    
-    @position_x.setter
-    def position_x(self, value):
-        import json
-        try:
-            data = json.loads(self.position_data or '{}')
-        except:
-            data = {}
-        data['x'] = value
-        self.position_data = json.dumps(data)
+    __table_args__ = (
+        db.Index('ix_gdc_sections_template_id_id', 'template_id', 'id'),
+    )
     
-    @property
-    def position_y(self):
-        import json
-        try:
-            data = json.loads(self.position_data or '{}')
-            return data.get('y', 0)
-        except:
-            return 0
+    # Campos de position_data, para compatibilidade
+    position_x = JSONField('position_data', 'x', 0)
+    position_y = JSONField('position_data', 'y', 0)
+    width = JSONField('position_data', 'width')
+    height = JSONField('position_data', 'height')
+    
+    notes = db.relationship('GdcNote', backref='section', order_by='GdcNote.id', lazy=True, passive_deletes=True)
 
 class GdcNote(db.Model):
     __tablename__ = 'gdc_notes'
@@ -285,6 +299,10 @@ class GdcNote(db.Model):
     created_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, nullable=True)
     
+    __table_args__ = (
+        db.Index('ix_gdc_notes_section_id_id', 'section_id', 'id'),
+    )
+    
     # Propriedade para compatibilidade
     @property
     def text(self):
@@ -298,6 +316,8 @@ class GroqResponse(db.Model):
     __tablename__ = 'groq_responses'
     
     # Estrutura real: id, session_id, prompt, response, model_used, tokens_used, response_time_ms, module_type, created_at
+    # prompt_hash: chave do cache de respostas (ver services/llm_cache.py)
+    # prompt_tokens/completion_tokens: uso separado por tipo (tokens_used continua sendo o total)
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.Integer, db.ForeignKey('brainstorm_sessions.id'), nullable=True)
     prompt = db.Column(LONGTEXT, nullable=False)
@@ -306,4 +326,34 @@ class GroqResponse(db.Model):
     tokens_used = db.Column(db.Integer, nullable=True)
     response_time_ms = db.Column(db.Integer, nullable=True)
     module_type = db.Column(db.String(50), nullable=True)
-    created_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow)
\ No newline at end of file
+    created_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow)
+    prompt_hash = db.Column(db.String(64), nullable=True, index=True)
+    prompt_tokens = db.Column(db.Integer, nullable=True)
+    completion_tokens = db.Column(db.Integer, nullable=True)
+    
+    # Relatórios por módulo/período e histórico da sessão
+    __table_args__ = (
+        db.Index('ix_groq_responses_module_type_created_at', 'module_type', 'created_at'),
+        db.Index('ix_groq_responses_session_id_created_at', 'session_id', 'created_at'),
+    )
+
+class TokenUsageRollup(db.Model):
+    __tablename__ = 'token_usage_rollups'
+    
+    # Totais diários por modelo, módulo e sessão, mantidos a cada lote gravado em groq_responses
+    # (ver services/token_accounting.py). session_id = 0 agrupa chamadas sem sessão.
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    model = db.Column(db.String(100), nullable=False)
+    module_type = db.Column(db.String(50), nullable=False)
+    session_id = db.Column(db.Integer, nullable=False, default=0, index=True)
+    requests = db.Column(db.Integer, nullable=False, default=0)
+    prompt_tokens = db.Column(db.BigInteger, nullable=False, default=0)
+    completion_tokens = db.Column(db.BigInteger, nullable=False, default=0)
+    total_tokens = db.Column(db.BigInteger, nullable=False, default=0)
+    cost_usd = db.Column(db.Numeric(12, 6), nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('day', 'model', 'module_type', 'session_id', name='uq_token_usage_rollup'),
+    )
\ No newline at end of file
@@ -2,56 +2,17 @@
 from flask import Blueprint, render_template, request, jsonify, redirect, url_for
 from models import BrainstormSession, BloomObjective, BloomTaxonomyLevel, SocraticSessionAnswers, db
 from services.groq_service import GroqService
+from services.json_stream import JSONStreamParser, loads_tolerant
+from services.prefetch import take_prefetched, BLOOM_OBJECTIVES
+from services.bloom_taxonomy import bloom_taxonomy, BLOOM_LEVELS
+from services.session_loader import load_session_or_404, OBJECTIVES
+from routes.sse import sse_response, stream_llm_events
+from routes.jobs import job_accepted
+from services.job_queue import register_job, JobError
 import json
 
 bloom_bp = Blueprint('bloom', __name__)
 
-# Dados dos níveis da Taxonomia de Bloom
-BLOOM_LEVELS = [
-    {
-        'name': 'Criar',
-        'description': 'Juntar elementos para formar um todo coerente ou funcional; reorganizar elementos em um novo padrão ou estrutura.',
-        'color': '#8B4513',  # Marrom
-        'order': 6,
-        'verbs': ['criar', 'desenvolver', 'projetar', 'construir', 'inventar', 'formular']
-    },
-    {
-        'name': 'Avaliar', 
-        'description': 'Fazer julgamentos baseados em critérios e padrões.',
-        'color': '#FF4500',  # Laranja avermelhado
-        'order': 5,
-        'verbs': ['avaliar', 'julgar', 'criticar', 'verificar', 'testar', 'monitorar']
-    },
-    {
-        'name': 'Analisar',
-        'description': 'Quebrar material em partes constituintes e determinar como as partes se relacionam entre si.',
-        'color': '#FFD700',  # Dourado
-        'order': 4,
-        'verbs': ['analisar', 'comparar', 'contrastar', 'organizar', 'desconstruir', 'questionar']
-    },
-    {
-        'name': 'Aplicar',
-        'description': 'Executar ou usar um procedimento em uma situação específica.',
-        'color': '#32CD32',  # Verde lima
-        'order': 3,
-        'verbs': ['aplicar', 'executar', 'implementar', 'demonstrar', 'usar', 'ilustrar']
-    },
-    {
-        'name': 'Compreender',
-        'description': 'Construir significado a partir de mensagens instrucionais, incluindo comunicação oral, escrita e gráfica.',
-        'color': '#4169E1',  # Azul royal
-        'order': 2,
-        'verbs': ['compreender', 'interpretar', 'exemplificar', 'classificar', 'resumir', 'explicar']
-    },
-    {
-        'name': 'Lembrar',
-        'description': 'Recuperar conhecimento relevante da memória de longo prazo.',
-        'color': '#8A2BE2',  # Azul violeta
-        'order': 1,
-        'verbs': ['lembrar', 'reconhecer', 'listar', 'identificar', 'recuperar', 'nomear']
-    }
-]
-
 @bloom_bp.route('/')
 def index():
     """Página principal da Taxonomia de Bloom"""
@@ -59,34 +20,33 @@ def index():
     if not session_id:
         return redirect(url_for('home.index'))
     
-    session = BrainstormSession.query.get_or_404(session_id)
-    objectives = BloomObjective.query.filter_by(session_id=session_id).all()
+    session = load_session_or_404(session_id, OBJECTIVES)
     
     # Organizar objetivos por nível
     objectives_by_level = {}
-    for obj in objectives:
+    for obj in session.objectives:
         if obj.level not in objectives_by_level:
             objectives_by_level[obj.level] = []
         objectives_by_level[obj.level].append(obj)
     
     return render_template('bloom/index.html', 
                          session=session, 
-                         bloom_levels=BLOOM_LEVELS,
+                         bloom_levels=bloom_taxonomy.levels(),
                          objectives_by_level=objectives_by_level)
 
 @bloom_bp.route('/initialize-levels', methods=['POST'])
 def initialize_levels():
     """Inicializa os níveis da Taxonomia de Bloom no banco"""
     try:
+        # Os verbos ficam no registro em memória (a tabela não tem coluna para eles)
+        existing_names = {name for (name,) in db.session.query(BloomTaxonomyLevel.name)}
         for level_data in BLOOM_LEVELS:
-            existing_level = BloomTaxonomyLevel.query.filter_by(name=level_data['name']).first()
-            if not existing_level:
+            if level_data['name'] not in existing_names:
                 level = BloomTaxonomyLevel(
                     name=level_data['name'],
                     description=level_data['description'],
                     level_order=level_data['order'],
-                    color=level_data['color'],
-                    verbs=json.dumps(level_data['verbs'])
+                    color=level_data['color']
                 )
                 db.session.add(level)
         
@@ -95,6 +55,37 @@ def initialize_levels():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
 
+def _save_objectives(session_id, items):
+    """Cria os objetivos gerados pela IA (itens sem texto ou nível são ignorados)"""
+    new_objectives = []
+    for obj_data in items:
+        if not isinstance(obj_data, dict) or not obj_data.get('text') or not obj_data.get('level'):
+            continue
+        objective = BloomObjective(
+            session_id=session_id,
+            text=obj_data['text'],
+            level=obj_data['level']
+        )
+        db.session.add(objective)
+        new_objectives.append((objective, bloom_taxonomy.color_for(obj_data['level'])))
+    
+    db.session.commit()
+    
+    return [{
+        'id': obj.id,
+        'text': obj.text,
+        'level': obj.level,
+        'color': color,
+        'is_ai_generated': True
+    } for obj, color in new_objectives]
+
+def _save_generated_objectives(session_id, response_text):
+    """Faz o parse (tolerante) da resposta JSON da IA e cria os objetivos no banco"""
+    objectives_data = loads_tolerant(response_text)
+    if isinstance(objectives_data, dict):
+        objectives_data = objectives_data.get('objectives', [])
+    return _save_objectives(session_id, objectives_data)
+
 @bloom_bp.route('/generate-objectives', methods=['POST'])
 def generate_objectives():
     """Gera objetivos educacionais automaticamente"""
@@ -111,52 +102,19 @@ def generate_objectives():
                 'error': 'Respostas socráticas não encontradas. Complete o módulo socrático primeiro.'
             }), 400
         
-        groq_service = GroqService()
-        result = groq_service.generate_bloom_objectives(socratic_answers, session_id)
+        # Resultado pré-gerado ao finalizar a reflexão socrática (se as respostas não mudaram)
+        prefetched = take_prefetched(BLOOM_OBJECTIVES, session_id)
+        if prefetched:
+            result = {'success': True, 'content': prefetched['content']}
+        else:
+            groq_service = GroqService()
+            result = groq_service.generate_bloom_objectives(socratic_answers, session_id)
         
         if result['success']:
             try:
-                # Limpar e fazer parse da resposta JSON
-                response_text = result['content'].strip()
-                
-                if response_text.startswith('```json'):
-                    response_text = response_text[7:]
-                if response_text.endswith('```'):
-                    response_text = response_text[:-3]
-                
-                objectives_data = json.loads(response_text)
-                new_objectives = []
-                
-                # Criar objetivos no banco
-                for obj_data in objectives_data.get('objectives', []):
-                    # Determinar a cor baseada no nível
-                    level_color = '#6c757d'  # Cor padrão
-                    for level in BLOOM_LEVELS:
-                        if level['name'].lower() in obj_data['level'].lower():
-                            level_color = level['color']
-                            break
-                    
-                    objective = BloomObjective(
-                        session_id=session_id,
-                        text=obj_data['text'],
-                        level=obj_data['level'],
-                        color=level_color,
-                        is_ai_generated=True
-                    )
-                    db.session.add(objective)
-                    new_objectives.append(objective)
-                
-                db.session.commit()
-                
                 return jsonify({
                     'success': True,
-                    'objectives': [{
-                        'id': obj.id,
-                        'text': obj.text,
-                        'level': obj.level,
-                        'color': obj.color,
-                        'is_ai_generated': obj.is_ai_generated
-                    } for obj in new_objectives]
+                    'objectives': _save_generated_objectives(session_id, result['content'])
                 })
                 
             except json.JSONDecodeError as e:
@@ -170,25 +128,93 @@ def generate_objectives():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@bloom_bp.route('/generate-objectives/stream', methods=['GET'])
+def stream_objectives():
+    """Gera objetivos educacionais via Server-Sent Events"""
+    session_id = request.args.get('session_id')
+    
+    if not session_id:
+        return jsonify({'success': False, 'error': 'session_id é obrigatório'}), 400
+    
+    socratic_answers = SocraticSessionAnswers.query.filter_by(session_id=session_id).first()
+    if not socratic_answers:
+        return jsonify({
+            'success': False, 
+            'error': 'Respostas socráticas não encontradas. Complete o módulo socrático primeiro.'
+        }), 400
+    
+    prefetched = take_prefetched(BLOOM_OBJECTIVES, session_id)
+    if prefetched:
+        chunks = iter([prefetched['content']])
+    else:
+        chunks = GroqService().generate_bloom_objectives(socratic_answers, session_id, stream=True)
+    parser = JSONStreamParser(['objectives'])
+    saved = []
+    
+    def on_item(field, item):
+        # Cada objetivo é gravado e enviado assim que seu JSON fecha
+        objectives = _save_objectives(session_id, [item])
+        saved.extend(objectives)
+        return {'objective': objectives[0]} if objectives else None
+    
+    def on_complete(content):
+        if not saved:
+            saved.extend(_save_generated_objectives(session_id, content))
+        return {'objectives': saved}
+    
+    return sse_response(stream_llm_events(chunks, on_complete, parser, on_item))
+
+@bloom_bp.route('/generate-objectives/jobs', methods=['POST'])
+def enqueue_objectives():
+    """Enfileira a geração de objetivos e retorna o id do job (acompanhar em /jobs/<id>)"""
+    data = request.get_json() or {}
+    session_id = data.get('session_id')
+    
+    if not session_id:
+        return jsonify({'success': False, 'error': 'session_id é obrigatório'}), 400
+    
+    if not SocraticSessionAnswers.query.filter_by(session_id=session_id).first():
+        return jsonify({
+            'success': False, 
+            'error': 'Respostas socráticas não encontradas. Complete o módulo socrático primeiro.'
+        }), 400
+    
+    return job_accepted('bloom.generate_objectives', {'session_id': session_id})
+
+@register_job('bloom.generate_objectives')
+def generate_objectives_job(payload, job):
+    """Job: mesmo fluxo de /generate-objectives, executado por um worker"""
+    session_id = payload['session_id']
+    socratic_answers = SocraticSessionAnswers.query.filter_by(session_id=session_id).first()
+    if not socratic_answers:
+        raise JobError('Respostas socráticas não encontradas')
+    
+    job.report('progress', {'stage': 'generating'})
+    prefetched = take_prefetched(BLOOM_OBJECTIVES, session_id)
+    if prefetched:
+        result = {'success': True, 'content': prefetched['content']}
+    else:
+        result = GroqService().generate_bloom_objectives(socratic_answers, session_id)
+    if not result['success']:
+        raise JobError(result['error'])
+    
+    job.report('progress', {'stage': 'saving'})
+    try:
+        return {'objectives': _save_generated_objectives(session_id, result['content'])}
+    except json.JSONDecodeError as e:
+        raise JobError(f'Erro ao processar resposta da IA: {str(e)}')
+
 @bloom_bp.route('/add-objective', methods=['POST'])
 def add_objective():
     """Adiciona um objetivo manualmente"""
     data = request.get_json()
     
     try:
-        # Determinar a cor baseada no nível
-        level_color = '#6c757d'  # Cor padrão
-        for level in BLOOM_LEVELS:
-            if level['name'].lower() == data['level'].lower():
-                level_color = level['color']
-                break
-        
+        # A cor vem do nível (registro em memória), não é coluna do objetivo
         objective = BloomObjective(
             session_id=data['session_id'],
             text=data['text'].strip(),
-            level=data['level'],
-            color=level_color,
-            is_ai_generated=False
+            level=data['level']
         )
         
         db.session.add(objective)
@@ -201,7 +227,7 @@ def add_objective():
                 'text': objective.text,
                 'level': objective.level,
                 'color': objective.color,
-                'is_ai_generated': objective.is_ai_generated
+                'is_ai_generated': False
             }
         })
     except Exception as e:
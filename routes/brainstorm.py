@@ -1,8 +1,14 @@
 # routes/brainstorm.py - Corrigido para funcionar com a estrutura real do banco
-from flask import Blueprint, render_template, request, redirect, url_for, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, jsonify, current_app
+from sqlalchemy import case, select
 from extensions import db
 from models import BrainstormSession, Card, GameGroup
+from services.groq_service import GroqService
+from services.prefetch import start_prefetch, SOCRATIC_SUGGESTIONS
+from routes.sse import sse_response, stream_llm_events
 from datetime import datetime
+import math
+import re
 
 brainstorm_bp = Blueprint('brainstorm', __name__)
 
@@ -184,6 +190,26 @@ def get_suggestions():
             'error': f'Erro ao gerar sugestões: {str(e)}'
         }), 500
 
+@brainstorm_bp.route('/get-suggestions/stream', methods=['GET'])
+def stream_suggestions():
+    """Gera sugestões de IA para ideias via Server-Sent Events"""
+    session_id = request.args.get('session_id')
+    
+    if not session_id:
+        return jsonify({'success': False, 'error': 'session_id é obrigatório'}), 400
+    
+    session = BrainstormSession.query.get(session_id)
+    if not session:
+        return jsonify({'success': False, 'error': 'Sessão não encontrada'}), 404
+    
+    cards = Card.query.filter_by(session_id=session_id).all()
+    chunks = GroqService().generate_brainstorm_suggestions(cards, session_id, stream=True)
+    
+    def on_complete(content):
+        return {'suggestions': [line.strip() for line in content.split('\n') if line.strip()]}
+    
+    return sse_response(stream_llm_events(chunks, on_complete))
+
 @brainstorm_bp.route('/create-group', methods=['POST'])
 def create_group():
     """Cria um grupo para organizar cartas"""
@@ -242,6 +268,9 @@ def finish_session():
         
         db.session.commit()
         
+        # Sugestões socráticas já começam a ser geradas enquanto o usuário muda de página
+        start_prefetch(SOCRATIC_SUGGESTIONS, session_id)
+        
         return jsonify({
             'success': True,
             'redirect_url': url_for('socratic.index', session_id=session_id)
@@ -357,4 +386,133 @@ def update_card_position():
     except Exception as e:
         print(f"❌ Erro ao atualizar posição do card: {e}")
         db.session.rollback()
-        return jsonify({'success': False, 'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def _finite_float(value):
+    """float() que recusa nan/inf (o MySQL não aceita esses valores)"""
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f'Posição inválida: {value}')
+    return number
+
+# Limites das colunas de cards: content é TEXT (64 KB no MySQL, até 4 bytes por caractere)
+CARD_CONTENT_MAX_LENGTH = 10000
+CARD_CATEGORY_MAX_LENGTH = Card.__table__.c.category.type.length
+_HEX_COLOR = re.compile(r'^#[0-9a-fA-F]{6}$')
+
+def _bounded_str(max_length, label):
+    """Conversão que exige texto com no máximo max_length caracteres"""
+    def convert(value):
+        if not isinstance(value, str):
+            raise ValueError(f'{label}: o valor deve ser texto')
+        if len(value) > max_length:
+            raise ValueError(f'{label}: mais de {max_length} caracteres')
+        return value
+    return convert
+
+def _hex_color(value):
+    """Cor no formato #RRGGBB (a coluna tem 7 caracteres)"""
+    if not isinstance(value, str) or not _HEX_COLOR.match(value):
+        raise ValueError(f'Cor inválida: {value} (use #RRGGBB)')
+    return value
+
+# Campos de card alteráveis em lote: nome no JSON -> (coluna, conversão)
+CARD_BATCH_FIELDS = {
+    'text': ('content', _bounded_str(CARD_CONTENT_MAX_LENGTH, 'Texto')),
+    'content': ('content', _bounded_str(CARD_CONTENT_MAX_LENGTH, 'Texto')),
+    'category': ('category', _bounded_str(CARD_CATEGORY_MAX_LENGTH, 'Categoria')),
+    'color': ('color', _hex_color),
+    'position_x': ('position_x', _finite_float),
+    'position_y': ('position_y', _finite_float),
+}
+
+def _parse_card_batch(data, max_changes):
+    """Normaliza o lote: ({card_id: {coluna: valor}}, {ids a remover}); alterações do mesmo card são mescladas"""
+    updates = data.get('updates') or []
+    deletes = data.get('deletes') or []
+    if not isinstance(updates, list) or not isinstance(deletes, list):
+        raise ValueError('updates e deletes devem ser listas')
+    if len(updates) + len(deletes) > max_changes:
+        raise ValueError(f'Lote com mais de {max_changes} alterações')
+    
+    changes = {}
+    for item in updates:
+        if not isinstance(item, dict) or item.get('card_id') is None:
+            raise ValueError('Cada alteração precisa de card_id')
+        values = changes.setdefault(int(item['card_id']), {})
+        for field, (column, convert) in CARD_BATCH_FIELDS.items():
+            if field in item and item[field] is not None:
+                values[column] = convert(item[field])
+        if 'content' in values and not values['content'].strip():
+            raise ValueError(f"Texto vazio para o card {item['card_id']}")
+    
+    removed = {int(card_id) for card_id in deletes}
+    for card_id in removed:
+        changes.pop(card_id, None)
+    return {card_id: values for card_id, values in changes.items() if values}, removed
+
+@brainstorm_bp.route('/cards/batch', methods=['POST'])
+def batch_cards():
+    """
+    Aplica várias alterações de cards (posição, texto, cor, categoria) e remoções
+    numa única transação: um UPDATE com CASE para todos os cards e um DELETE com IN.
+    Corpo: {session_id, updates: [{card_id, position_x, ...}], deletes: [card_id, ...]}
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        if not data.get('session_id'):
+            return jsonify({'success': False, 'error': 'session_id é obrigatório'}), 400
+        
+        try:
+            session_id = int(data['session_id'])
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'session_id inválido'}), 400
+        
+        try:
+            max_changes = current_app.config.get('BRAINSTORM_BATCH_MAX_CHANGES', 500)
+            changes, removed = _parse_card_batch(data, max_changes)
+        except (TypeError, ValueError) as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        requested = set(changes) | removed
+        if not requested:
+            return jsonify({'success': True, 'updated': 0, 'deleted': 0, 'missing': []})
+        
+        # Só cards da própria sessão; os demais voltam em 'missing'
+        table = Card.__table__
+        existing = set(db.session.execute(
+            select(table.c.id).where(table.c.session_id == session_id, table.c.id.in_(requested))
+        ).scalars())
+        changes = {card_id: values for card_id, values in changes.items() if card_id in existing}
+        removed &= existing
+        
+        if changes:
+            assignments = {'updated_at': datetime.utcnow()}
+            for column in sorted({column for values in changes.values() for column in values}):
+                whens = {card_id: values[column] for card_id, values in changes.items() if column in values}
+                assignments[column] = case(whens, value=table.c.id, else_=table.c[column])
+            db.session.execute(
+                table.update()
+                .where(table.c.session_id == session_id, table.c.id.in_(changes))
+                .values(assignments)
+            )
+        
+        if removed:
+            db.session.execute(
+                table.delete().where(table.c.session_id == session_id, table.c.id.in_(removed))
+            )
+        
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'updated': len(changes),
+            'deleted': len(removed),
+            'missing': sorted(requested - existing)
+        })
+        
+    except Exception as e:
+        print(f"❌ Erro ao aplicar lote de cards: {e}")
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
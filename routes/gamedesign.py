@@ -1,16 +1,133 @@
 # routes/gamedesign.py - Módulo Game Design (VERSÃO CORRIGIDA)
-from flask import Blueprint, render_template_string, jsonify
+import re
+from flask import Blueprint, render_template, request, jsonify, redirect, url_for
+from models import BrainstormSession, GdcSection, GdcTemplate, GdcNote, db
+from services.groq_service import GroqService, parse_suggestion_lines
+from services.multiagent_service import MultiAgentService
+from services.session_loader import load_session_or_404, ALL_PARTS, CANVAS
+from routes.sse import sse_event, sse_response
+from routes.jobs import job_accepted
+from services.job_queue import register_job
 
 gamedesign_bp = Blueprint('gamedesign', __name__)
 
+DEFAULT_NOTE_COLOR = '#ffff99'
+_HEX_COLOR = re.compile(r'^#[0-9A-Fa-f]{6}$')
+
+def _default_sections():
+    from init_db import ENDO_GDC_SECTIONS
+    return {section['name']: section for section in ENDO_GDC_SECTIONS}
+
+def _note_dict(note, section_name, is_ai_generated=False):
+    return {
+        'id': note.id,
+        'text': note.text,
+        'color': note.color or DEFAULT_NOTE_COLOR,
+        'position_x': note.position_x or 0,
+        'position_y': note.position_y or 0,
+        'section_name': section_name,
+        'is_ai_generated': is_ai_generated
+    }
+
+def _canvas_view(session):
+    """
+    (seções, notas por seção) do canvas da sessão para os templates; sem template
+    salvo, as seções padrão do Endo-GDC (requer as partes do canvas carregadas)
+    """
+    defaults = _default_sections()
+    template = session.gdc_templates[0] if session.gdc_templates else None
+    if not template or not template.sections:
+        return list(defaults.values()), {}
+    
+    sections = []
+    notes_by_section = {}
+    for section in template.sections:
+        default = defaults.get(section.name, {})
+        position = dict(default.get('position') or {'x': 0, 'y': 0, 'width': 200, 'height': 150})
+        position.update({key: value for key, value in (section.position_data or {}).items() if value is not None})
+        sections.append({
+            'id': section.id,
+            'name': section.name,
+            'description': section.description,
+            'color': section.color or default.get('color'),
+            'position': position
+        })
+        if section.notes:
+            notes_by_section[section.name] = [_note_dict(note, section.name) for note in section.notes]
+    return sections, notes_by_section
+
+def _canvas_section(session_id, section_name):
+    """Seção do canvas da sessão pelo nome, criando o template padrão na primeira nota; None se não existir"""
+    section = (GdcSection.query
+               .join(GdcTemplate, GdcSection.template_id == GdcTemplate.id)
+               .filter(GdcTemplate.session_id == session_id, GdcSection.name == section_name)
+               .first())
+    if section:
+        return section
+    
+    if GdcTemplate.query.filter_by(session_id=session_id).first():
+        return None
+    
+    defaults = _default_sections()
+    if section_name not in defaults:
+        return None
+    
+    template = GdcTemplate(session_id=session_id, name='Endo-GDC',
+                           description='Game Design Canvas para Jogos Educativos Endógenos')
+    db.session.add(template)
+    db.session.flush()
+    for data in defaults.values():
+        row = GdcSection(template_id=template.id, name=data['name'], description=data['description'],
+                         color=data['color'], position_data=dict(data['position']))
+        db.session.add(row)
+        if data['name'] == section_name:
+            section = row
+    db.session.flush()
+    return section
+
+def _create_note(session_id, section_name, text, color=None, position_x=None, position_y=None):
+    """Cria a nota na seção (sem commit); None se a seção não existir"""
+    section = _canvas_section(session_id, section_name)
+    if not section:
+        return None
+    
+    note = GdcNote(
+        section_id=section.id,
+        content=text,
+        color=color if color and _HEX_COLOR.match(color) else DEFAULT_NOTE_COLOR,
+        position_x=float(position_x or 10),
+        position_y=float(position_y or 10)
+    )
+    db.session.add(note)
+    db.session.flush()
+    return note
+
+def _summary_context(session_id):
+    session = load_session_or_404(session_id, *ALL_PARTS)
+    sections, notes_by_section = _canvas_view(session)
+    return {
+        'session': session,
+        'cards': session.cards,
+        'socratic': session.socratic_answers,
+        'objectives': session.objectives,
+        'sections': sections,
+        'notes_by_section': notes_by_section
+    }
+
 @gamedesign_bp.route('/')
 def index():
     """Página principal do Game Design Canvas"""
-    return render_template_string("""
-    <h1>🎮 Game Design Canvas</h1>
-    <p>Módulo Game Design funcionando!</p>
-    <p><a href="/">← Voltar ao início</a></p>
-    """)
+    session_id = request.args.get('session_id')
+    if not session_id:
+        return redirect(url_for('home.index'))
+    
+    session = load_session_or_404(session_id, CANVAS)
+    sections, notes_by_section = _canvas_view(session)
+    
+    return render_template('gamedesign/index.html',
+                         session=session,
+                         sections=sections,
+                         notes_by_section=notes_by_section)
 
 @gamedesign_bp.route('/health')
 def health():
@@ -20,3 +137,296 @@ def health():
         'module': 'gamedesign',
         'message': 'Módulo funcionando'
     })
+
+def _canvas_sections(session_id):
+    """
+    Seções do canvas da sessão (template da sessão) com o id da linha em gdc_sections;
+    sem template, as seções padrão do Endo-GDC (sem id)
+    """
+    rows = (GdcSection.query
+            .join(GdcTemplate, GdcSection.template_id == GdcTemplate.id)
+            .filter(GdcTemplate.session_id == session_id)
+            .order_by(GdcSection.id)
+            .all())
+    if rows:
+        return [{'id': row.id, 'name': row.name, 'description': row.description} for row in rows]
+    
+    from init_db import ENDO_GDC_SECTIONS
+    return [{'id': None, 'name': section['name'], 'description': section['description']}
+            for section in ENDO_GDC_SECTIONS]
+
+@gamedesign_bp.route('/add-note', methods=['POST'])
+def add_note():
+    """Adiciona uma nota a uma seção do canvas"""
+    try:
+        data = request.get_json() or {}
+        session_id = data.get('session_id')
+        text = (data.get('text') or '').strip()
+        
+        if not session_id or not data.get('section_name'):
+            return jsonify({'success': False, 'error': 'session_id e section_name são obrigatórios'}), 400
+        
+        if not text:
+            return jsonify({'success': False, 'error': 'Texto da nota é obrigatório'}), 400
+        
+        if not BrainstormSession.query.get(session_id):
+            return jsonify({'success': False, 'error': 'Sessão não encontrada'}), 404
+        
+        note = _create_note(session_id, data['section_name'], text, data.get('color'),
+                            data.get('position_x'), data.get('position_y'))
+        if not note:
+            return jsonify({'success': False, 'error': 'Seção do canvas não encontrada'}), 404
+        
+        db.session.commit()
+        return jsonify({
+            'success': True,
+            'note': _note_dict(note, data['section_name'], bool(data.get('is_ai_generated')))
+        })
+        
+    except (TypeError, ValueError):
+        db.session.rollback()
+        return jsonify({'success': False, 'error': 'Posição da nota inválida'}), 400
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Erro ao adicionar nota: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@gamedesign_bp.route('/delete-note', methods=['POST'])
+def delete_note():
+    """Remove uma nota do canvas"""
+    try:
+        data = request.get_json() or {}
+        note = GdcNote.query.get(data.get('note_id'))
+        if not note:
+            return jsonify({'success': False, 'error': 'Nota não encontrada'}), 404
+        
+        db.session.delete(note)
+        db.session.commit()
+        return jsonify({'success': True})
+        
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Erro ao remover nota: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@gamedesign_bp.route('/suggestions', methods=['POST'])
+def get_suggestions():
+    """Sugestões da IA para uma seção do canvas"""
+    try:
+        data = request.get_json() or {}
+        session_id = data.get('session_id')
+        section_name = data.get('section_name')
+        
+        if not session_id or not section_name:
+            return jsonify({'success': False, 'error': 'session_id e section_name são obrigatórios'}), 400
+        
+        if not BrainstormSession.query.get(session_id):
+            return jsonify({'success': False, 'error': 'Sessão não encontrada'}), 404
+        
+        context = MultiAgentService().build_project_context(session_id)
+        result = GroqService().generate_gamedesign_suggestions(context, section_name, session_id)
+        if not result['success']:
+            return jsonify({'success': False, 'error': result['error']}), 502
+        
+        return jsonify({'success': True, 'suggestions': parse_suggestion_lines(result['content'])})
+        
+    except Exception as e:
+        print(f"❌ Erro nas sugestões do canvas: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@gamedesign_bp.route('/apply-suggestion', methods=['POST'])
+def apply_suggestion():
+    """Aplica uma sugestão dos agentes como nota na seção indicada"""
+    try:
+        data = request.get_json() or {}
+        session_id = data.get('session_id')
+        suggestion = data.get('suggestion') or {}
+        content = (suggestion.get('content') or '').strip()
+        
+        if not session_id or not suggestion.get('section') or not content:
+            return jsonify({'success': False, 'error': 'session_id e sugestão com seção e conteúdo são obrigatórios'}), 400
+        
+        if not BrainstormSession.query.get(session_id):
+            return jsonify({'success': False, 'error': 'Sessão não encontrada'}), 404
+        
+        note = _create_note(session_id, suggestion['section'], content, '#90EE90')
+        if not note:
+            return jsonify({'success': False, 'error': f"Seção do canvas não encontrada: {suggestion['section']}"}), 404
+        
+        db.session.commit()
+        return jsonify({'success': True, 'note': _note_dict(note, suggestion['section'], True)})
+        
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Erro ao aplicar sugestão: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@gamedesign_bp.route('/export', methods=['POST'])
+def export_canvas():
+    """HTML do resumo do projeto para exportação"""
+    try:
+        data = request.get_json() or {}
+        session_id = data.get('session_id')
+        if not session_id:
+            return jsonify({'success': False, 'error': 'session_id é obrigatório'}), 400
+        
+        context = _summary_context(session_id)
+        return jsonify({
+            'success': True,
+            'html': render_template('gamedesign/summary.html', **context),
+            'game_name': context['session'].theme or f"Sessão {session_id}"
+        })
+        
+    except Exception as e:
+        print(f"❌ Erro ao exportar o canvas: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@gamedesign_bp.route('/summary/<int:session_id>')
+def export_summary(session_id):
+    """Resumo do projeto (brainstorming, reflexão, objetivos e canvas) para impressão"""
+    return render_template('gamedesign/summary.html', **_summary_context(session_id))
+
+@gamedesign_bp.route('/suggestions/batch', methods=['POST'])
+def batch_suggestions():
+    """
+    Sugestões para todas as seções do canvas (ou as listadas em 'sections')
+    com uma chamada por lote em vez de uma por seção
+    """
+    try:
+        data = request.get_json() or {}
+        session_id = data.get('session_id')
+        
+        if not session_id:
+            return jsonify({'success': False, 'error': 'session_id é obrigatório'}), 400
+        
+        session = BrainstormSession.query.get(session_id)
+        if not session:
+            return jsonify({'success': False, 'error': 'Sessão não encontrada'}), 404
+        
+        sections = _canvas_sections(session_id)
+        requested = data.get('sections')
+        if requested:
+            by_name = {section['name']: section for section in sections}
+            unknown = [name for name in requested if name not in by_name]
+            if unknown:
+                return jsonify({'success': False, 'error': f"Seções desconhecidas: {', '.join(unknown)}"}), 400
+            sections = [by_name[name] for name in dict.fromkeys(requested)]
+        
+        context = MultiAgentService().build_project_context(session_id)
+        result = GroqService().generate_gamedesign_batch_suggestions(context, sections, session_id)
+        
+        return jsonify({
+            'success': result['success'],
+            'sections': [
+                {
+                    'section_id': section['id'],
+                    'section': section['name'],
+                    'suggestions': result['suggestions'].get(section['name'], []),
+                    'error': result['failed'].get(section['name'])
+                }
+                for section in sections
+            ],
+            'batches': result['batches'],
+            'fallbacks': result['fallbacks']
+        })
+        
+    except Exception as e:
+        print(f"❌ Erro nas sugestões do canvas em lote: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@gamedesign_bp.route('/multiagent-chat', methods=['POST'])
+def multiagent_chat():
+    """Discussão multiagentes sobre o design do jogo"""
+    try:
+        data = request.get_json() or {}
+        session_id = data.get('session_id')
+        
+        if not session_id:
+            return jsonify({'success': False, 'error': 'session_id é obrigatório'}), 400
+        
+        if not data.get('message'):
+            return jsonify({'success': False, 'error': 'message é obrigatório'}), 400
+        
+        session = BrainstormSession.query.get(session_id)
+        if not session:
+            return jsonify({'success': False, 'error': 'Sessão não encontrada'}), 404
+        
+        result = MultiAgentService().start_multiagent_discussion(
+            session_id, data['message'], data.get('focus_section')
+        )
+        
+        return jsonify({
+            'success': True,
+            'agents_responses': result['agents_responses'],
+            'synthesis': result['synthesis'],
+            'suggestions': result['suggestions']
+        })
+        
+    except Exception as e:
+        print(f"❌ Erro no chat multiagentes: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@gamedesign_bp.route('/multiagent-chat/jobs', methods=['POST'])
+def enqueue_multiagent_chat():
+    """Enfileira a discussão multiagentes e retorna o id do job (acompanhar em /jobs/<id>)"""
+    data = request.get_json() or {}
+    session_id = data.get('session_id')
+    
+    if not session_id:
+        return jsonify({'success': False, 'error': 'session_id é obrigatório'}), 400
+    
+    if not data.get('message'):
+        return jsonify({'success': False, 'error': 'message é obrigatório'}), 400
+    
+    if not BrainstormSession.query.get(session_id):
+        return jsonify({'success': False, 'error': 'Sessão não encontrada'}), 404
+    
+    return job_accepted('gamedesign.multiagent_chat', {
+        'session_id': session_id,
+        'message': data['message'],
+        'focus_section': data.get('focus_section')
+    })
+
+@register_job('gamedesign.multiagent_chat')
+def multiagent_chat_job(payload, job):
+    """Job: mesmo fluxo de /multiagent-chat, executado por um worker"""
+    job.report('progress', {'stage': 'discussing'})
+    result = MultiAgentService().start_multiagent_discussion(
+        payload['session_id'], payload['message'], payload.get('focus_section')
+    )
+    
+    return {
+        'agents_responses': result['agents_responses'],
+        'synthesis': result['synthesis'],
+        'suggestions': result['suggestions']
+    }
+
+@gamedesign_bp.route('/multiagent-chat/stream', methods=['GET'])
+def multiagent_chat_stream():
+    """Discussão multiagentes via Server-Sent Events"""
+    session_id = request.args.get('session_id')
+    message = request.args.get('message')
+    
+    if not session_id:
+        return jsonify({'success': False, 'error': 'session_id é obrigatório'}), 400
+    
+    if not message:
+        return jsonify({'success': False, 'error': 'message é obrigatório'}), 400
+    
+    session = BrainstormSession.query.get(session_id)
+    if not session:
+        return jsonify({'success': False, 'error': 'Sessão não encontrada'}), 404
+    
+    multiagent = MultiAgentService()
+    
+    def generate():
+        try:
+            for event, data in multiagent.stream_multiagent_discussion(
+                    session_id, message, request.args.get('focus_section')):
+                yield sse_event(data, event)
+            yield sse_event({}, 'done')
+        except Exception as e:
+            print(f"❌ Erro no streaming multiagentes: {e}")
+            yield sse_event({'error': str(e)}, 'error')
+    
+    return sse_response(generate())
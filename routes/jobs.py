@@ -0,0 +1,53 @@
+# routes/jobs.py - Acompanhamento de jobs em segundo plano (polling e SSE)
+import time
+from flask import Blueprint, current_app, request, jsonify, url_for
+from routes.sse import sse_event, sse_response
+from services.job_queue import enqueue_job
+
+jobs_bp = Blueprint('jobs', __name__)
+
+def job_accepted(kind, payload):
+    """Enfileira o job e monta a resposta 202 com os endereços de acompanhamento"""
+    job_id = enqueue_job(kind, payload)
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': url_for('jobs.job_status', job_id=job_id),
+        'events_url': url_for('jobs.job_events', job_id=job_id)
+    }), 202
+
+@jobs_bp.route('/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Estado atual do job (para polling)"""
+    job = current_app.extensions['job_queue'].get(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job não encontrado'}), 404
+    return jsonify({'success': True, 'job': job})
+
+@jobs_bp.route('/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    Progresso do job via Server-Sent Events até o evento final ('done' ou 'error').
+    Reconexões continuam a partir do cabeçalho Last-Event-ID.
+    """
+    queue = current_app.extensions['job_queue']
+    if not queue.get(job_id):
+        return jsonify({'success': False, 'error': 'Job não encontrado'}), 404
+
+    poll_interval = float(current_app.config.get('JOB_POLL_INTERVAL', 0.5))
+    timeout = float(current_app.config.get('JOB_EVENTS_TIMEOUT_SECONDS', 300))
+    last_seq = request.headers.get('Last-Event-ID', type=int) or request.args.get('last_event_id', 0, type=int)
+
+    def generate():
+        seq = last_seq
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            for item in queue.events_since(job_id, seq):
+                seq = item['seq']
+                yield sse_event(item['data'], item['event'], seq)
+                if item['event'] in ('done', 'error'):
+                    return
+            time.sleep(poll_interval)
+
+    return sse_response(generate())
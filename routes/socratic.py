@@ -2,7 +2,12 @@
 from flask import Blueprint, render_template, request, redirect, url_for, jsonify
 from extensions import db
 from models import BrainstormSession, Card, SocraticSessionAnswers
+from services.groq_service import GroqService
+from services.json_stream import loads_tolerant
+from services.prefetch import start_prefetch, take_prefetched, SOCRATIC_SUGGESTIONS, BLOOM_OBJECTIVES
+from routes.sse import sse_response, stream_llm_events
 from datetime import datetime
+import json
 
 socratic_bp = Blueprint('socratic', __name__)
 
@@ -92,6 +97,30 @@ def save_answers():
             'error': f'Erro ao salvar: {str(e)}'
         }), 500
 
+def _ai_suggestions(session_id, cards):
+    """Sugestões da IA (pré-geradas, se os cards não mudaram) ou None em caso de falha"""
+    prefetched = take_prefetched(SOCRATIC_SUGGESTIONS, session_id)
+    if prefetched:
+        content = prefetched['content']
+    else:
+        result = GroqService().generate_socratic_suggestions(cards, session_id)
+        if not result['success']:
+            print(f"⚠️  Erro ao gerar sugestões socráticas com IA: {result['error']}")
+            return None
+        content = result['content']
+    
+    try:
+        parsed = loads_tolerant(content)
+    except json.JSONDecodeError as e:
+        print(f"⚠️  Resposta da IA sem JSON válido: {e}")
+        return None
+    if not isinstance(parsed, dict):
+        return None
+    
+    fields = ('problem', 'justification', 'impact', 'motivation')
+    suggestions = {field: str(parsed[field]).strip() for field in fields if parsed.get(field)}
+    return suggestions or None
+
 @socratic_bp.route('/get-suggestions', methods=['POST'])
 def get_suggestions():
     """Obtém sugestões de IA para reflexão socrática"""
@@ -110,19 +139,22 @@ def get_suggestions():
         cards = Card.query.filter_by(session_id=session_id).all()
         ideas_context = [card.content for card in cards] if cards else []
         
-        # Por enquanto, retornar sugestões fixas baseadas no contexto
-        # TODO: Implementar integração real com IA
-        suggestions = {
-            'problem': f"Como podemos criar um jogo educativo eficaz sobre {session.theme}?",
-            'justification': "Este problema é relevante porque combina aprendizado com engajamento através de gamificação.",
-            'impact': "O impacto esperado é melhorar a retenção de conhecimento e motivação dos estudantes.",
-            'motivation': "Os estudantes se sentirão mais engajados através de elementos lúdicos e desafios progressivos."
-        }
+        # Resultado pré-gerado ao finalizar o brainstorming ou, sem ele, geração na hora
+        suggestions = _ai_suggestions(session_id, cards) if cards else None
         
-        # Se temos ideias do brainstorming, personalizar as sugestões
-        if ideas_context:
-            first_idea = ideas_context[0]
-            suggestions['problem'] = f"Como implementar '{first_idea}' em um jogo educativo eficaz?"
+        # Sem ideias ou com falha da IA, sugestões fixas baseadas no contexto
+        if not suggestions:
+            suggestions = {
+                'problem': f"Como podemos criar um jogo educativo eficaz sobre {session.theme}?",
+                'justification': "Este problema é relevante porque combina aprendizado com engajamento através de gamificação.",
+                'impact': "O impacto esperado é melhorar a retenção de conhecimento e motivação dos estudantes.",
+                'motivation': "Os estudantes se sentirão mais engajados através de elementos lúdicos e desafios progressivos."
+            }
+            
+            # Se temos ideias do brainstorming, personalizar as sugestões
+            if ideas_context:
+                first_idea = ideas_context[0]
+                suggestions['problem'] = f"Como implementar '{first_idea}' em um jogo educativo eficaz?"
         
         return jsonify({
             'success': True,
@@ -138,6 +170,34 @@ def get_suggestions():
             'error': f'Erro ao gerar sugestões: {str(e)}'
         }), 500
 
+@socratic_bp.route('/get-suggestions/stream', methods=['GET'])
+def stream_suggestions():
+    """Gera sugestões de IA para a reflexão socrática via Server-Sent Events"""
+    session_id = request.args.get('session_id')
+    
+    if not session_id:
+        return jsonify({'success': False, 'error': 'session_id é obrigatório'}), 400
+    
+    session = BrainstormSession.query.get(session_id)
+    if not session:
+        return jsonify({'success': False, 'error': 'Sessão não encontrada'}), 404
+    
+    # Resultado pré-gerado ao finalizar o brainstorming (se os cards não mudaram)
+    prefetched = take_prefetched(SOCRATIC_SUGGESTIONS, session_id)
+    if prefetched:
+        chunks = iter([prefetched['content']])
+    else:
+        cards = Card.query.filter_by(session_id=session_id).all()
+        chunks = GroqService().generate_socratic_suggestions(cards, session_id, stream=True)
+    
+    def on_complete(content):
+        # Procurar o objeto JSON na resposta (com reparo de defeitos comuns)
+        if '{' not in content:
+            return {'suggestions': None}
+        return {'suggestions': loads_tolerant(content)}
+    
+    return sse_response(stream_llm_events(chunks, on_complete))
+
 @socratic_bp.route('/skip', methods=['POST'])
 def skip():
     """Pula a reflexão socrática criando respostas padrão"""
@@ -207,6 +267,9 @@ def finish():
                 'error': 'Respostas incompletas. Complete pelo menos o problema e justificação.'
             }), 400
         
+        # Objetivos de Bloom já começam a ser gerados enquanto o usuário muda de página
+        start_prefetch(BLOOM_OBJECTIVES, session_id)
+        
         return jsonify({
             'success': True,
             'message': 'Reflexão socrática finalizada com sucesso!',
@@ -0,0 +1,56 @@
+# routes/sse.py - Utilitários para respostas Server-Sent Events (streaming de LLM)
+import json
+from flask import Response, stream_with_context
+
+
+def sse_event(data, event=None, event_id=None):
+    """Formata um evento SSE; data é serializado como JSON"""
+    message = ''
+    if event_id is not None:
+        message += f'id: {event_id}\n'
+    if event:
+        message += f'event: {event}\n'
+    message += f'data: {json.dumps(data, ensure_ascii=False)}\n\n'
+    return message
+
+
+def sse_response(generator):
+    """Cria a resposta Flask text/event-stream mantendo o contexto da requisição"""
+    return Response(
+        stream_with_context(generator),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Desativa o buffer do nginx
+        }
+    )
+
+
+def stream_llm_events(chunks, on_complete=None, parser=None, on_item=None):
+    """
+    Converte um gerador de trechos de texto em eventos SSE:
+    'token' para cada trecho, 'done' ao final e 'error' em caso de falha.
+    on_complete(content) pode devolver um dict extra incluído no evento 'done'.
+    Com um JSONStreamParser, cada elemento completo gera um evento 'item'
+    (com os dados devolvidos por on_item(campo, elemento), se informado).
+    """
+    parts = []
+    try:
+        for chunk in chunks:
+            parts.append(chunk)
+            yield sse_event({'content': chunk}, 'token')
+            
+            for field, item in (parser.feed(chunk) if parser else ()):
+                data = on_item(field, item) if on_item else {field: item}
+                if data:
+                    yield sse_event(data, 'item')
+
+        content = ''.join(parts)
+        done = {'content': content}
+        if on_complete:
+            done.update(on_complete(content) or {})
+        yield sse_event(done, 'done')
+
+    except Exception as e:
+        print(f"❌ Erro no streaming: {e}")
+        yield sse_event({'error': str(e)}, 'error')
@@ -0,0 +1,53 @@
+# routes/usage.py - Relatórios de uso de tokens, custos e orçamento por sessão
+from datetime import datetime
+from flask import Blueprint, request, jsonify
+from services.token_accounting import cost_report, token_accounting
+
+usage_bp = Blueprint('usage', __name__)
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+@usage_bp.route('/report', methods=['GET'])
+def report():
+    """
+    Tokens e custo agregados a partir de token_usage_rollups.
+    Parâmetros: group_by (ex.: 'model,module_type'), start/end (AAAA-MM-DD), session_id
+    """
+    try:
+        group_by = tuple(g.strip() for g in request.args.get('group_by', 'model').split(',') if g.strip())
+        session_id = request.args.get('session_id', type=int)
+
+        result = cost_report(
+            group_by=group_by or ('model',),
+            start=_parse_date(request.args.get('start')),
+            end=_parse_date(request.args.get('end')),
+            session_id=session_id
+        )
+        return jsonify(dict(result, success=True))
+
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        print(f"❌ Erro no relatório de uso: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@usage_bp.route('/session/<int:session_id>', methods=['GET'])
+def session_usage(session_id):
+    """Gasto da sessão por modelo/módulo e situação do orçamento"""
+    try:
+        breakdown = cost_report(group_by=('model', 'module_type'), session_id=session_id)
+        status = token_accounting.session_budget_status(session_id)
+
+        return jsonify({
+            'success': True,
+            'session_id': session_id,
+            'usage': breakdown['rows'],
+            'total_tokens': breakdown['total_tokens'],
+            'total_cost_usd': breakdown['total_cost_usd'],
+            'budget': status
+        })
+
+    except Exception as e:
+        print(f"❌ Erro ao consultar uso da sessão: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
@@ -0,0 +1,130 @@
+# services/audit_sink.py - Gravação assíncrona (write-behind) das linhas de groq_responses
+import atexit
+import queue
+import threading
+from datetime import datetime
+from flask import current_app
+from sqlalchemy.orm import Session
+
+
+class AuditSink:
+    """
+    Fila em memória limitada, drenada por uma thread de fundo que insere
+    as linhas de GroqResponse em lote, com sessão própria.
+    Tira a escrita no banco do caminho da resposta do LLM.
+    """
+
+    def __init__(self):
+        self._queue = None
+        self._thread = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def record(self, **row):
+        """Enfileira uma linha de groq_responses (ou grava na hora se o sink estiver desligado)"""
+        row.setdefault('created_at', datetime.utcnow())
+        app = current_app._get_current_object()
+
+        if not app.config.get('AUDIT_SINK_ENABLED', True):
+            self._write_batch(app, [row])
+            return
+
+        self._ensure_started(app)
+        try:
+            self._queue.put_nowait(row)
+            with self._lock:
+                self.enqueued += 1
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            print("⚠️  Fila de auditoria cheia - registro de GroqResponse descartado")
+
+    def _ensure_started(self, app):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._queue = queue.Queue(maxsize=int(app.config.get('AUDIT_QUEUE_SIZE', 1000)))
+                self._stopping.clear()
+                self._thread = threading.Thread(
+                    target=self._run, args=(app,), name='audit-sink', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self, app):
+        batch_size = int(app.config.get('AUDIT_BATCH_SIZE', 50))
+        flush_interval = float(app.config.get('AUDIT_FLUSH_INTERVAL', 1.0))
+
+        while True:
+            try:
+                batch = [self._queue.get(timeout=flush_interval)]
+            except queue.Empty:
+                if self._stopping.is_set():
+                    break
+                continue
+
+            while len(batch) < batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._write_batch(app, batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write_batch(self, app, rows):
+        """
+        Insere o lote em groq_responses com uma sessão independente da requisição
+        e acumula os totais de tokens/custo em token_usage_rollups na mesma transação
+        """
+        from models import GroqResponse, db
+        from services.token_accounting import apply_rollups
+
+        try:
+            with app.app_context():
+                with Session(db.engine) as session:
+                    session.execute(GroqResponse.__table__.insert(), rows)
+                    apply_rollups(session, rows)
+                    session.commit()
+            with self._lock:
+                self.written += len(rows)
+        except Exception as e:
+            with self._lock:
+                self.failed += len(rows)
+            print(f"❌ Erro ao gravar lote de auditoria ({len(rows)} linhas): {e}")
+
+    def flush(self):
+        """Bloqueia até que todas as linhas enfileiradas tenham sido gravadas"""
+        if self._queue is not None:
+            self._queue.join()
+
+    def close(self, timeout=10):
+        """Drena a fila e encerra a thread (chamado automaticamente ao encerrar o processo)"""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stopping.set()
+        thread.join(timeout)
+        with self._lock:
+            self._thread = None
+
+    def stats(self):
+        """Contadores do sink"""
+        with self._lock:
+            return {
+                'enqueued': self.enqueued,
+                'written': self.written,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'backlog': self._queue.qsize() if self._queue is not None else 0
+            }
+
+
+# Instância compartilhada pelo processo
+audit_sink = AuditSink()
+atexit.register(audit_sink.close)
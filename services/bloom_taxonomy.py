@@ -0,0 +1,162 @@
+# services/bloom_taxonomy.py - Registro em memória dos níveis da Taxonomia de Bloom
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+from flask import current_app
+
+# Dados dos níveis da Taxonomia de Bloom (cores e verbos completam a tabela bloom_taxonomy_levels)
+BLOOM_LEVELS = [
+    {
+        'name': 'Criar',
+        'description': 'Juntar elementos para formar um todo coerente ou funcional; reorganizar elementos em um novo padrão ou estrutura.',
+        'color': '#8B4513',  # Marrom
+        'order': 6,
+        'verbs': ['criar', 'desenvolver', 'projetar', 'construir', 'inventar', 'formular']
+    },
+    {
+        'name': 'Avaliar',
+        'description': 'Fazer julgamentos baseados em critérios e padrões.',
+        'color': '#FF4500',  # Laranja avermelhado
+        'order': 5,
+        'verbs': ['avaliar', 'julgar', 'criticar', 'verificar', 'testar', 'monitorar']
+    },
+    {
+        'name': 'Analisar',
+        'description': 'Quebrar material em partes constituintes e determinar como as partes se relacionam entre si.',
+        'color': '#FFD700',  # Dourado
+        'order': 4,
+        'verbs': ['analisar', 'comparar', 'contrastar', 'organizar', 'desconstruir', 'questionar']
+    },
+    {
+        'name': 'Aplicar',
+        'description': 'Executar ou usar um procedimento em uma situação específica.',
+        'color': '#32CD32',  # Verde lima
+        'order': 3,
+        'verbs': ['aplicar', 'executar', 'implementar', 'demonstrar', 'usar', 'ilustrar']
+    },
+    {
+        'name': 'Compreender',
+        'description': 'Construir significado a partir de mensagens instrucionais, incluindo comunicação oral, escrita e gráfica.',
+        'color': '#4169E1',  # Azul royal
+        'order': 2,
+        'verbs': ['compreender', 'interpretar', 'exemplificar', 'classificar', 'resumir', 'explicar']
+    },
+    {
+        'name': 'Lembrar',
+        'description': 'Recuperar conhecimento relevante da memória de longo prazo.',
+        'color': '#8A2BE2',  # Azul violeta
+        'order': 1,
+        'verbs': ['lembrar', 'reconhecer', 'listar', 'identificar', 'recuperar', 'nomear']
+    }
+]
+
+DEFAULT_LEVEL_COLOR = '#6c757d'
+
+# Nível imutável; id é None enquanto o nível não existir na tabela
+TaxonomyLevel = namedtuple('TaxonomyLevel', ['id', 'name', 'description', 'color', 'order', 'verbs'])
+
+
+class _Snapshot:
+    """Níveis carregados num instante: ordenados do mais alto (Criar) ao mais baixo"""
+
+    def __init__(self, levels, loaded_at):
+        self.levels = tuple(sorted(levels, key=lambda level: -level.order))
+        self.by_id = MappingProxyType({level.id: level for level in self.levels if level.id is not None})
+        self.by_name = MappingProxyType({level.name.casefold(): level for level in self.levels})
+        self.loaded_at = loaded_at
+
+
+def _static_levels():
+    return [
+        TaxonomyLevel(None, data['name'], data['description'], data['color'], data['order'], tuple(data['verbs']))
+        for data in BLOOM_LEVELS
+    ]
+
+
+class BloomTaxonomyRegistry:
+    """
+    Níveis de Bloom (id <-> nome, cores e verbos) sem consultas por objetivo.
+    Carregado da tabela bloom_taxonomy_levels uma vez e recarregado quando a tabela
+    muda neste processo (eventos do mapper) ou após BLOOM_TAXONOMY_REFRESH_SECONDS.
+    Sem a tabela, usa BLOOM_LEVELS (sem ids).
+    """
+
+    def __init__(self):
+        self._snapshot = None
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def invalidate(self, *args):
+        """Marca o registro para recarga no próximo acesso (usado como listener do mapper)"""
+        self._stale = True
+
+    def load(self):
+        """Lê a tabela e troca o snapshot de uma vez"""
+        from models import BloomTaxonomyLevel, db
+
+        static = {data['name'].casefold(): data for data in BLOOM_LEVELS}
+        self._stale = False
+        try:
+            with db.session.no_autoflush:
+                rows = BloomTaxonomyLevel.query.all()
+            levels = []
+            for row in rows:
+                data = static.get(row.name.casefold(), {})
+                levels.append(TaxonomyLevel(
+                    row.id, row.name, row.description or data.get('description', ''),
+                    row.color or data.get('color', DEFAULT_LEVEL_COLOR),
+                    row.order_level, tuple(data.get('verbs', ()))
+                ))
+            # Níveis padrão ainda não inicializados no banco continuam disponíveis (sem id)
+            loaded = {level.name.casefold() for level in levels}
+            levels.extend(level for level in _static_levels() if level.name.casefold() not in loaded)
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️  Erro ao carregar níveis de Bloom, usando os padrões: {e}")
+            levels = _static_levels()
+            self._stale = True  # tenta a tabela de novo no próximo acesso
+
+        snapshot = _Snapshot(levels, time.monotonic())
+        with self._lock:
+            self._snapshot = snapshot
+        return snapshot
+
+    def _current(self):
+        snapshot = self._snapshot
+        ttl = float(current_app.config.get('BLOOM_TAXONOMY_REFRESH_SECONDS', 300))
+        if snapshot is None or self._stale or time.monotonic() - snapshot.loaded_at > ttl:
+            snapshot = self.load()
+        return snapshot
+
+    def levels(self):
+        """Todos os níveis, de Criar a Lembrar"""
+        return self._current().levels
+
+    def by_id(self, level_id):
+        return self._current().by_id.get(level_id) if level_id is not None else None
+
+    def by_name(self, name):
+        return self._current().by_name.get((name or '').strip().casefold())
+
+    def match(self, text):
+        """Nível pelo nome exato ou, senão, pelo nome contido no texto (ex.: 'Criar (nível 6)')"""
+        level = self.by_name(text)
+        if level is None and text:
+            folded = text.casefold()
+            level = next((level for level in self.levels() if level.name.casefold() in folded), None)
+        return level
+
+    def color_for(self, text):
+        level = self.match(text)
+        return level.color if level else DEFAULT_LEVEL_COLOR
+
+
+def init_bloom_taxonomy(app):
+    """Carrega o registro na inicialização (se o banco ainda não existir, carrega no primeiro uso)"""
+    with app.app_context():
+        bloom_taxonomy.load()
+
+
+# Instância compartilhada pelo processo
+bloom_taxonomy = BloomTaxonomyRegistry()
@@ -3,17 +3,33 @@ import requests
 import json
 import time
 from flask import current_app
-from models import GroqResponse, db
+from services.llm_service import BaseLLMService, LLMServiceError
+from services.http_client import get_provider_session, get_provider_timeout
 
-class GeminiService:
+class GeminiService(BaseLLMService):
+    provider = 'gemini'
+    
     def __init__(self):
         self.api_key = current_app.config.get('GEMINI_API_KEY')
         self.model = current_app.config.get('GEMINI_MODEL', 'gemini-2.0-flash')
-        self.base_url = f'https://generativelanguage.googleapis.com/v1beta/models/{self.model}:generateContent'
+        self.api_root = current_app.config.get('GEMINI_BASE_URL', 'https://generativelanguage.googleapis.com/v1beta').rstrip('/')
+        self._set_model_urls()
+        self.session = get_provider_session('gemini')
+        self.timeout = get_provider_timeout()
+    
+    def _set_model_urls(self):
+        """O modelo faz parte da URL no Gemini"""
+        self.base_url = f'{self.api_root}/models/{self.model}:generateContent'
+        self.stream_url = f'{self.api_root}/models/{self.model}:streamGenerateContent'
+    
+    def with_model(self, model):
+        service = super().with_model(model)
+        service._set_model_urls()
+        return service
     
-    def generate_response(self, prompt, module_type='general', session_id=None, max_tokens=1000):
+    def _request_completion(self, prompt, max_tokens):
         """
-        Gera resposta usando o modelo Gemini
+        Chama a API do Gemini (generateContent)
         """
         try:
             url = f"{self.base_url}?key={self.api_key}"
@@ -30,7 +46,7 @@ class GeminiService:
                 ],
                 "generationConfig": {
                     "maxOutputTokens": max_tokens,
-                    "temperature": 0.7
+                    "temperature": self.temperature
                 }
             }
             
@@ -39,41 +55,109 @@ class GeminiService:
             }
             
             start_time = time.time()
-            response = requests.post(url, headers=headers, json=payload)
+            response = self.session.post(url, headers=headers, json=payload, timeout=self._request_timeout())
             response_time_ms = int((time.time() - start_time) * 1000)
+            self._observe_rate_limit_headers(response.headers)
             
             if response.status_code == 200:
                 response_data = response.json()
                 content = response_data['candidates'][0]['content']['parts'][0]['text']
-                tokens_used = response_data.get('usageMetadata', {}).get('totalTokenCount', 0)
-                
-                # Salvar no banco de dados
-                groq_response = GroqResponse(
-                    session_id=session_id,
-                    prompt=prompt,
-                    response=content,
-                    model_used=self.model,
-                    tokens_used=tokens_used,
-                    response_time_ms=response_time_ms,
-                    module_type=module_type
-                )
-                db.session.add(groq_response)
-                db.session.commit()
+                usage = response_data.get('usageMetadata', {})
                 
                 return {
                     'success': True,
                     'content': content,
-                    'tokens_used': tokens_used,
+                    'tokens_used': usage.get('totalTokenCount', 0),
+                    'prompt_tokens': usage.get('promptTokenCount', 0),
+                    'completion_tokens': usage.get('candidatesTokenCount', 0),
                     'response_time_ms': response_time_ms
                 }
             else:
+                self._observe_retry_delay(response)
                 return {
                     'success': False,
-                    'error': f'API Error: {response.status_code} - {response.text}'
+                    'error': f'API Error: {response.status_code} - {response.text}',
+                    'status_code': response.status_code
                 }
                 
+        except requests.Timeout as e:
+            return {
+                'success': False,
+                'error': f'Timeout: {str(e)}'
+            }
         except Exception as e:
             return {
                 'success': False,
                 'error': f'Exception: {str(e)}'
-            }   
\ No newline at end of file
+            }
+    
+    def _stream_completion(self, prompt, max_tokens, usage):
+        """
+        Chama a API do Gemini (streamGenerateContent com alt=sse)
+        """
+        url = f"{self.stream_url}?alt=sse&key={self.api_key}"
+        
+        payload = {
+            "contents": [
+                {
+                    "parts": [
+                        {
+                            "text": prompt
+                        }
+                    ]
+                }
+            ],
+            "generationConfig": {
+                "maxOutputTokens": max_tokens,
+                "temperature": self.temperature
+            }
+        }
+        
+        headers = {
+            'Content-Type': 'application/json'
+        }
+        
+        try:
+            response = self.session.post(url, headers=headers, json=payload,
+                                         timeout=self._request_timeout(), stream=True)
+        except requests.RequestException as e:
+            raise LLMServiceError(f'Exception: {str(e)}')
+        
+        with response:
+            self._observe_rate_limit_headers(response.headers)
+            if response.status_code != 200:
+                self._observe_retry_delay(response)
+                raise LLMServiceError(f'API Error: {response.status_code} - {response.text}')
+            
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                
+                chunk = json.loads(line[5:].strip())
+                
+                # Cada chunk traz o usageMetadata acumulado
+                chunk_usage = chunk.get('usageMetadata')
+                if chunk_usage:
+                    usage['tokens_used'] = chunk_usage.get('totalTokenCount', 0)
+                    usage['prompt_tokens'] = chunk_usage.get('promptTokenCount', 0)
+                    usage['completion_tokens'] = chunk_usage.get('candidatesTokenCount', 0)
+                
+                for candidate in chunk.get('candidates', []):
+                    for part in candidate.get('content', {}).get('parts', []):
+                        if part.get('text'):
+                            yield part['text']
+    
+    def _observe_retry_delay(self, response):
+        """
+        Em respostas 429 o Gemini informa a espera em error.details[].retryDelay (ex.: '30s')
+        em vez do cabeçalho retry-after
+        """
+        if response.status_code != 429:
+            return
+        try:
+            for detail in response.json().get('error', {}).get('details', []):
+                if detail.get('retryDelay'):
+                    self._observe_rate_limit_headers({'retry-after': detail['retryDelay']})
+                    return
+        except ValueError:
+            pass
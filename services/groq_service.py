@@ -1,19 +1,57 @@
 # services/groq_service.py - Serviço de Integração com LLM
 import requests
 import json
+import re
 import time
 from flask import current_app
-from models import GroqResponse, db
+from jsonschema import validate, ValidationError
+from services.llm_service import BaseLLMService, LLMServiceError
+from services.prompt_builder import PromptBuilder, get_prompt_budget
+from services.json_stream import loads_tolerant
+from services.http_client import get_provider_session, get_provider_timeout
 
-class GroqService:
+# Esquema da resposta das sugestões do canvas em lote (várias seções por chamada)
+GDC_BATCH_SCHEMA = {
+    'type': 'object',
+    'required': ['sections'],
+    'properties': {
+        'sections': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'required': ['section', 'suggestions'],
+                'properties': {
+                    'section': {'type': 'string'},
+                    'suggestions': {'type': 'array', 'items': {'type': 'string'}}
+                }
+            }
+        }
+    }
+}
+
+def _section_key(name):
+    """Nome da seção normalizado para casar a resposta do modelo com as seções pedidas"""
+    return ' '.join((name or '').split()).casefold()
+
+def parse_suggestion_lines(content):
+    """Sugestões de uma resposta em texto, uma por linha (sem marcadores ou numeração)"""
+    lines = (re.sub(r'^\s*(?:[-*•]|\d+[.)])\s*', '', line).strip() for line in (content or '').split('\n'))
+    return [line for line in lines if line]
+
+class GroqService(BaseLLMService):
+    provider = 'groq'
+    
     def __init__(self):
         self.api_key = current_app.config.get('GROQ_API_KEY')
         self.model = current_app.config.get('GROQ_MODEL', 'llama3-70b-8192')
-        self.base_url = 'https://api.groq.com/openai/v1/chat/completions'
+        api_root = current_app.config.get('GROQ_BASE_URL', 'https://api.groq.com/openai/v1').rstrip('/')
+        self.base_url = f'{api_root}/chat/completions'
+        self.session = get_provider_session('groq')
+        self.timeout = get_provider_timeout()
     
-    def generate_response(self, prompt, module_type='general', session_id=None, max_tokens=1000):
+    def _request_completion(self, prompt, max_tokens):
         """
-        Gera resposta usando o modelo Groq
+        Chama a API do Groq (chat completions)
         """
         try:
             headers = {
@@ -30,54 +68,119 @@ class GroqService:
                     }
                 ],
                 'max_tokens': max_tokens,
-                'temperature': 0.7,
+                'temperature': self.temperature,
                 'top_p': 1,
                 'stream': False
             }
             
             start_time = time.time()
-            response = requests.post(self.base_url, headers=headers, json=payload)
+            response = self.session.post(self.base_url, headers=headers, json=payload, timeout=self._request_timeout())
             response_time_ms = int((time.time() - start_time) * 1000)
+            self._observe_rate_limit_headers(response.headers)
             
             if response.status_code == 200:
                 response_data = response.json()
                 content = response_data['choices'][0]['message']['content']
-                tokens_used = response_data.get('usage', {}).get('total_tokens', 0)
-                
-                # Salvar no banco de dados
-                groq_response = GroqResponse(
-                    session_id=session_id,
-                    prompt=prompt,
-                    response=content,
-                    model_used=self.model,
-                    tokens_used=tokens_used,
-                    response_time_ms=response_time_ms,
-                    module_type=module_type
-                )
-                db.session.add(groq_response)
-                db.session.commit()
+                usage = response_data.get('usage', {})
                 
                 return {
                     'success': True,
                     'content': content,
-                    'tokens_used': tokens_used,
+                    'tokens_used': usage.get('total_tokens', 0),
+                    'prompt_tokens': usage.get('prompt_tokens', 0),
+                    'completion_tokens': usage.get('completion_tokens', 0),
                     'response_time_ms': response_time_ms
                 }
             else:
                 return {
                     'success': False,
-                    'error': f'API Error: {response.status_code} - {response.text}'
+                    'error': f'API Error: {response.status_code} - {response.text}',
+                    'status_code': response.status_code
                 }
                 
+        except requests.Timeout as e:
+            return {
+                'success': False,
+                'error': f'Timeout: {str(e)}'
+            }
         except Exception as e:
             return {
                 'success': False,
                 'error': f'Exception: {str(e)}'
             }
     
-    def generate_brainstorm_suggestions(self, existing_cards, session_id=None):
+    def _stream_completion(self, prompt, max_tokens, usage):
+        """
+        Chama a API do Groq com 'stream': True (Server-Sent Events no formato OpenAI)
+        """
+        headers = {
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json',
+        }
+        
+        payload = {
+            'model': self.model,
+            'messages': [
+                {
+                    'role': 'user',
+                    'content': prompt
+                }
+            ],
+            'max_tokens': max_tokens,
+            'temperature': self.temperature,
+            'top_p': 1,
+            'stream': True
+        }
+        
+        try:
+            response = self.session.post(self.base_url, headers=headers, json=payload,
+                                         timeout=self._request_timeout(), stream=True)
+        except requests.RequestException as e:
+            raise LLMServiceError(f'Exception: {str(e)}')
+        
+        with response:
+            self._observe_rate_limit_headers(response.headers)
+            if response.status_code != 200:
+                raise LLMServiceError(f'API Error: {response.status_code} - {response.text}')
+            
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                
+                data = line[5:].strip()
+                if data == '[DONE]':
+                    break
+                
+                chunk = json.loads(data)
+                
+                # O Groq envia o uso de tokens no último chunk (x_groq.usage)
+                chunk_usage = chunk.get('usage') or chunk.get('x_groq', {}).get('usage')
+                if chunk_usage:
+                    usage['tokens_used'] = chunk_usage.get('total_tokens', 0)
+                    usage['prompt_tokens'] = chunk_usage.get('prompt_tokens', 0)
+                    usage['completion_tokens'] = chunk_usage.get('completion_tokens', 0)
+                
+                choices = chunk.get('choices') or []
+                if choices:
+                    content = choices[0].get('delta', {}).get('content')
+                    if content:
+                        yield content
+    
+    def _build_cards_prompt(self, intro, cards, instructions):
+        """
+        Monta um prompt com a lista de cards dentro do orçamento de tokens do modelo;
+        cards longos são cortados e os excedentes ficam de fora
+        """
+        builder = PromptBuilder(get_prompt_budget(self.model))
+        builder.add_text(intro)
+        builder.add_section(None, [card.text for card in cards], max_item_tokens=80)
+        builder.add_text(instructions)
+        return builder.build()
+    
+    def generate_brainstorm_suggestions(self, existing_cards, session_id=None, stream=False):
         """
         Gera sugestões para brainstorming baseado nos cards existentes
+        Com stream=True retorna um gerador de trechos de texto (ver BaseLLMService._respond)
         """
         if not existing_cards:
             prompt = """Como um especialista em design de jogos educativos, gere 3 ideias criativas e inovadoras para jogos educacionais. 
@@ -85,30 +188,29 @@ class GroqService:
             
             Responda apenas com as ideias, uma por linha, sem numeração."""
         else:
-            cards_text = '\n'.join([f"- {card.text}" for card in existing_cards])
-            prompt = f"""Como um especialista em design de jogos educativos, analise as seguintes ideias já geradas:
-
-{cards_text}
-
+            prompt = self._build_cards_prompt(
+                "Como um especialista em design de jogos educativos, analise as seguintes ideias já geradas:\n",
+                existing_cards,
+                """
 Baseado nessas ideias existentes, gere 3 novas ideias que sejam:
 1. Complementares às ideias existentes
 2. Inovadoras e criativas
 3. Focadas em diferentes aspectos educacionais
 
 Responda apenas com as novas ideias, uma por linha, sem numeração."""
+            )
         
-        return self.generate_response(prompt, 'brainstorm', session_id)
+        return self._respond(prompt, 'brainstorm', session_id, stream)
     
-    def generate_socratic_suggestions(self, cards, session_id=None):
+    def generate_socratic_suggestions(self, cards, session_id=None, stream=False):
         """
         Gera sugestões para as questões socráticas baseado nos cards
+        Com stream=True retorna um gerador de trechos de texto (ver BaseLLMService._respond)
         """
-        cards_text = '\n'.join([f"- {card.text}" for card in cards])
-        
-        prompt = f"""Como um especialista em método socrático aplicado ao design de jogos educativos, analise as seguintes ideias:
-
-{cards_text}
-
+        prompt = self._build_cards_prompt(
+            "Como um especialista em método socrático aplicado ao design de jogos educativos, analise as seguintes ideias:\n",
+            cards,
+            """
 Gere sugestões para responder às seguintes questões socráticas:
 
 1. PROBLEMA: Qual é o principal problema educacional que estas ideias tentam resolver?
@@ -117,13 +219,15 @@ Gere sugestões para responder às seguintes questões socráticas:
 4. MOTIVAÇÃO: O que motivaria os estudantes a se engajarem com estes jogos?
 
 Responda em formato JSON:
-{{"problem": "...", "justification": "...", "impact": "...", "motivation": "..."}}"""
+{"problem": "...", "justification": "...", "impact": "...", "motivation": "..."}"""
+        )
         
-        return self.generate_response(prompt, 'socratic', session_id)
+        return self._respond(prompt, 'socratic', session_id, stream)
     
-    def generate_bloom_objectives(self, socratic_answers, session_id=None):
+    def generate_bloom_objectives(self, socratic_answers, session_id=None, stream=False):
         """
         Gera objetivos educacionais baseados na Taxonomia de Bloom
+        Com stream=True retorna um gerador de trechos de texto (ver BaseLLMService._respond)
         """
         prompt = f"""Como um especialista em taxonomia de Bloom, analise o seguinte problema educacional e crie objetivos de aprendizagem:
 
@@ -137,11 +241,12 @@ Os objetivos devem começar com um verbo no infinitivo.
 Responda APENAS neste formato JSON, sem texto adicional:
 {{"objectives":[{{"text":"[verbo] [resto do objetivo]","level":"[nível da taxonomia]"}},{{"text":"[verbo] [resto do objetivo]","level":"[nível da taxonomia]"}}]}}"""
         
-        return self.generate_response(prompt, 'bloom', session_id)
+        return self._respond(prompt, 'bloom', session_id, stream)
     
-    def generate_gamedesign_suggestions(self, context, section_name, session_id=None):
+    def generate_gamedesign_suggestions(self, context, section_name, session_id=None, stream=False):
         """
         Gera sugestões para o Game Design Canvas
+        Com stream=True retorna um gerador de trechos de texto (ver BaseLLMService._respond)
         """
         prompt = f"""Como um especialista em design de jogos educativos, gere sugestões para a seção "{section_name}" do Game Design Canvas.
 
@@ -156,4 +261,92 @@ Forneça 3-5 sugestões específicas e práticas para esta seção, considerando
 
 Responda apenas com as sugestões, uma por linha, sem numeração."""
         
-        return self.generate_response(prompt, 'gamedesign', session_id)
\ No newline at end of file
+        return self._respond(prompt, 'gamedesign', session_id, stream)
+    
+    def generate_gamedesign_batch_suggestions(self, context, sections, session_id=None):
+        """
+        Gera sugestões para várias seções do Game Design Canvas com uma chamada JSON por lote.
+        sections: lista de {'name', 'description'}. Lotes acima de GDC_BATCH_MAX_SECTIONS ou do
+        limite de tokens de saída são divididos; seções ausentes ou inválidas na resposta são
+        geradas de novo individualmente (generate_gamedesign_suggestions).
+        Retorna {'success', 'suggestions': {nome: [...]}, 'failed': {nome: erro}, 'batches', 'fallbacks'}
+        """
+        config = current_app.config
+        tokens_per_section = int(config.get('GDC_BATCH_TOKENS_PER_SECTION', 250))
+        batch_size = max(1, min(
+            int(config.get('GDC_BATCH_MAX_SECTIONS', 9)),
+            int(config.get('GDC_BATCH_MAX_OUTPUT_TOKENS', 4000)) // tokens_per_section
+        ))
+        
+        suggestions = {}
+        missing = []
+        batches = [sections[i:i + batch_size] for i in range(0, len(sections), batch_size)]
+        
+        for batch in batches:
+            parsed = self._request_gamedesign_batch(context, batch, session_id, tokens_per_section * len(batch))
+            for section in batch:
+                items = parsed.get(_section_key(section['name']))
+                if items:
+                    suggestions[section['name']] = items
+                else:
+                    missing.append(section)
+        
+        failed = {}
+        for section in missing:
+            result = self.generate_gamedesign_suggestions(context, section['name'], session_id)
+            items = parse_suggestion_lines(result['content']) if result['success'] else []
+            if items:
+                suggestions[section['name']] = items
+            else:
+                failed[section['name']] = result.get('error') or 'Resposta sem sugestões'
+        
+        return {
+            'success': bool(suggestions) or not sections,
+            'suggestions': suggestions,
+            'failed': failed,
+            'batches': len(batches),
+            'fallbacks': len(missing)
+        }
+    
+    def _request_gamedesign_batch(self, context, sections, session_id, max_tokens):
+        """Uma chamada para o lote; retorna {nome normalizado: [sugestões]} (vazio se falhar)"""
+        section_lines = '\n'.join(
+            f"- {section['name']}" + (f"\n  ({section['description']})" if section.get('description') else '')
+            for section in sections
+        )
+        prompt = f"""Como um especialista em design de jogos educativos, gere sugestões para as seguintes seções do Game Design Canvas.
+
+Contexto do projeto:
+{context}
+
+Seções:
+{section_lines}
+
+Para cada seção, forneça 3-5 sugestões específicas e práticas, considerando:
+- Viabilidade técnica
+- Eficácia educacional
+- Engajamento dos jogadores
+- Recursos necessários
+
+Responda APENAS neste formato JSON, sem texto adicional, usando exatamente os nomes das seções:
+{{"sections": [{{"section": "Nome da seção", "suggestions": ["...", "..."]}}]}}"""
+        
+        result = self._respond(prompt, 'gamedesign_batch', session_id, max_tokens=max_tokens)
+        if not result['success']:
+            print(f"⚠️  Lote de sugestões do canvas falhou: {result.get('error')}")
+            return {}
+        
+        try:
+            data = loads_tolerant(result['content'])
+            validate(instance=data, schema=GDC_BATCH_SCHEMA)
+        except json.JSONDecodeError as e:
+            print(f"⚠️  Lote de sugestões do canvas com JSON inválido: {e}")
+            return {}
+        except ValidationError as e:
+            print(f"⚠️  Lote de sugestões do canvas fora do esquema: {e.message}")
+            return {}
+        
+        return {
+            _section_key(item['section']): [text.strip() for text in item['suggestions'] if text.strip()]
+            for item in data['sections']
+        }
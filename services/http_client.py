@@ -0,0 +1,52 @@
+# services/http_client.py - Cliente HTTP compartilhado para os provedores de LLM
+import atexit
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from flask import current_app
+
+# Uma sessão (pool keep-alive) por provedor, compartilhada por todo o processo
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_provider_session(provider):
+    """
+    Retorna a sessão HTTP do provedor ('groq', 'gemini', ...).
+    A sessão é criada na primeira chamada e reutilizada entre requisições e agentes,
+    evitando novo DNS + handshake TCP/TLS a cada chamada de LLM.
+    """
+    session = _sessions.get(provider)
+    if session is not None:
+        return session
+
+    with _sessions_lock:
+        session = _sessions.get(provider)
+        if session is None:
+            pool_size = int(current_app.config.get('LLM_POOL_SIZE', 10))
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _sessions[provider] = session
+
+    return session
+
+
+def get_provider_timeout():
+    """Retorna a tupla (connect, read) de timeouts configurada para chamadas de LLM"""
+    connect_timeout = float(current_app.config.get('LLM_CONNECT_TIMEOUT', 5))
+    read_timeout = float(current_app.config.get('LLM_READ_TIMEOUT', 60))
+    return (connect_timeout, read_timeout)
+
+
+def close_provider_sessions():
+    """Fecha todas as sessões abertas (chamado automaticamente ao encerrar o processo)"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+atexit.register(close_provider_sessions)
@@ -0,0 +1,388 @@
+# services/job_queue.py - Fila de jobs em SQLite para operações longas de LLM
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+# Estados de um job
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+ABANDONED_ERROR = 'Worker interrompido durante a execução'
+
+
+class JobError(Exception):
+    """Falha definitiva do job (não é repetida)"""
+    pass
+
+
+# Handlers registrados por tipo de job (ver register_job)
+_handlers = {}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    worker TEXT,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_status_created ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    event TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_job_events_job_seq ON job_events (job_id, seq);
+"""
+
+
+def register_job(kind):
+    """
+    Registra o handler de um tipo de job: handler(payload, job) -> dict (resultado).
+    O handler roda num worker, dentro de um app context, e pode chamar
+    job.report(evento, dados) para publicar progresso.
+    """
+    def decorator(handler):
+        _handlers[kind] = handler
+        return handler
+    return decorator
+
+
+class JobQueue:
+    """
+    Fila persistente em um arquivo SQLite compartilhado pelos processos do servidor.
+    Um job 'running' cujo lease expirou (worker reiniciado) volta a ser executado
+    até max_attempts tentativas.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        return _Connection(conn)
+
+    def enqueue(self, kind, payload, max_attempts=2, job_id=None):
+        """
+        Cria o job e retorna seu id.
+        Com um job_id determinístico, um job existente com o mesmo id é reaproveitado
+        (e só volta para a fila se tiver falhado).
+        """
+        job_id = job_id or uuid.uuid4().hex
+        with self._connect() as conn:
+            created = conn.execute(
+                'INSERT INTO jobs (id, kind, payload, status, max_attempts, created_at) VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (id) DO UPDATE SET status = excluded.status, payload = excluded.payload, '
+                'result = NULL, error = NULL, attempts = 0, worker = NULL, lease_until = NULL, '
+                'created_at = excluded.created_at, started_at = NULL, finished_at = NULL '
+                'WHERE jobs.status = ?',
+                (job_id, kind, json.dumps(payload, ensure_ascii=False), QUEUED, max_attempts, time.time(), FAILED)
+            ).rowcount
+        if created:
+            self.add_event(job_id, 'queued', {'status': QUEUED})
+        return job_id
+
+    def claim(self, worker, lease_seconds):
+        """Reserva o próximo job pendente (ou com lease expirado) para o worker"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Jobs abandonados que já esgotaram as tentativas
+                abandoned = [r['id'] for r in conn.execute(
+                    'SELECT id FROM jobs WHERE status = ? AND lease_until < ? AND attempts >= max_attempts',
+                    (RUNNING, now)
+                )]
+                for job_id in abandoned:
+                    conn.execute('UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?',
+                                 (FAILED, ABANDONED_ERROR, now, job_id))
+                    conn.execute(
+                        'INSERT INTO job_events (job_id, event, data, created_at) VALUES (?, ?, ?, ?)',
+                        (job_id, 'error', json.dumps({'status': FAILED, 'error': ABANDONED_ERROR},
+                                                     ensure_ascii=False), now)
+                    )
+
+                row = conn.execute(
+                    'SELECT * FROM jobs WHERE status = ? OR (status = ? AND lease_until < ?) '
+                    'ORDER BY created_at LIMIT 1',
+                    (QUEUED, RUNNING, now)
+                ).fetchone()
+                if row is None:
+                    conn.execute('COMMIT')
+                    return None
+
+                conn.execute(
+                    'UPDATE jobs SET status = ?, worker = ?, lease_until = ?, attempts = attempts + 1, '
+                    'started_at = ? WHERE id = ?',
+                    (RUNNING, worker, now + lease_seconds, now, row['id'])
+                )
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+
+        job = dict(row)
+        job['attempts'] += 1
+        job['payload'] = json.loads(job['payload'])
+        return job
+
+    def extend_lease(self, job_id, lease_seconds):
+        with self._connect() as conn:
+            conn.execute('UPDATE jobs SET lease_until = ? WHERE id = ? AND status = ?',
+                         (time.time() + lease_seconds, job_id, RUNNING))
+
+    def complete(self, job_id, result):
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, result = ?, finished_at = ?, lease_until = NULL WHERE id = ?',
+                (SUCCEEDED, json.dumps(result, ensure_ascii=False), time.time(), job_id)
+            )
+        self.add_event(job_id, 'done', {'status': SUCCEEDED, 'result': result})
+
+    def fail(self, job_id, error, retry=False):
+        """Marca o job como falho, ou o devolve à fila se retry=True"""
+        with self._connect() as conn:
+            if retry:
+                conn.execute('UPDATE jobs SET status = ?, error = ?, lease_until = NULL WHERE id = ?',
+                             (QUEUED, error, job_id))
+            else:
+                conn.execute(
+                    'UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease_until = NULL WHERE id = ?',
+                    (FAILED, error, time.time(), job_id)
+                )
+        if retry:
+            self.add_event(job_id, 'retry', {'status': QUEUED, 'error': error})
+        else:
+            self.add_event(job_id, 'error', {'status': FAILED, 'error': error})
+
+    def add_event(self, job_id, event, data):
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO job_events (job_id, event, data, created_at) VALUES (?, ?, ?, ?)',
+                (job_id, event, json.dumps(data, ensure_ascii=False), time.time())
+            )
+
+    def get(self, job_id):
+        """Estado do job (sem o payload) ou None"""
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        return {
+            'id': row['id'],
+            'kind': row['kind'],
+            'status': row['status'],
+            'result': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'attempts': row['attempts'],
+            'created_at': row['created_at'],
+            'started_at': row['started_at'],
+            'finished_at': row['finished_at']
+        }
+
+    def events_since(self, job_id, after_seq=0):
+        """Eventos de progresso do job com seq > after_seq"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT seq, event, data FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq',
+                (job_id, after_seq)
+            ).fetchall()
+        return [{'seq': row['seq'], 'event': row['event'], 'data': json.loads(row['data'])} for row in rows]
+
+    def take_result(self, job_id):
+        """Resultado de um job concluído, removendo-o da fila (consumo único); None se não concluído"""
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute('SELECT result FROM jobs WHERE id = ? AND status = ?',
+                                   (job_id, SUCCEEDED)).fetchone()
+                if row is not None:
+                    conn.execute('DELETE FROM job_events WHERE job_id = ?', (job_id,))
+                    conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        return json.loads(row['result']) if row is not None and row['result'] else None
+
+    def purge(self, older_than_seconds):
+        """Remove jobs finalizados (e seus eventos) mais antigos que o limite"""
+        cutoff = time.time() - older_than_seconds
+        with self._connect() as conn:
+            conn.execute(
+                'DELETE FROM job_events WHERE job_id IN '
+                '(SELECT id FROM jobs WHERE status IN (?, ?) AND finished_at < ?)',
+                (SUCCEEDED, FAILED, cutoff)
+            )
+            conn.execute('DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?',
+                         (SUCCEEDED, FAILED, cutoff))
+
+    def stats(self):
+        with self._connect() as conn:
+            rows = conn.execute('SELECT status, COUNT(*) AS total FROM jobs GROUP BY status').fetchall()
+        return {row['status']: row['total'] for row in rows}
+
+
+class _Connection:
+    """Conexão sqlite3 fechada ao sair do bloco with (o with do sqlite3 só faz commit)"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, *exc_info):
+        self.conn.close()
+
+
+class _RunningJob:
+    """Job entregue ao handler; report() publica progresso e renova o lease"""
+
+    def __init__(self, queue, job, lease_seconds):
+        self.id = job['id']
+        self.attempts = job['attempts']
+        self._queue = queue
+        self._lease_seconds = lease_seconds
+
+    def report(self, event, data=None):
+        self._queue.add_event(self.id, event, data or {})
+        self._queue.extend_lease(self.id, self._lease_seconds)
+
+
+class JobWorkerPool:
+    """Threads que consomem a fila e executam os handlers dentro de um app context"""
+
+    def __init__(self, app, queue):
+        self.app = app
+        self.queue = queue
+        self.size = int(app.config.get('JOB_WORKERS', 4))
+        self.poll_interval = float(app.config.get('JOB_POLL_INTERVAL', 0.5))
+        self.lease_seconds = float(app.config.get('JOB_LEASE_SECONDS', 300))
+        self.retention_seconds = float(app.config.get('JOB_RETENTION_HOURS', 24)) * 3600
+        self.worker_prefix = f'{socket.gethostname()}:{os.getpid()}'
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._threads or self.size <= 0:
+            return
+        with self._lock:
+            if self._threads or self.size <= 0:
+                return
+            for index in range(self.size):
+                thread = threading.Thread(
+                    target=self._run, args=(f'{self.worker_prefix}:{index}',),
+                    name=f'job-worker-{index}', daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def wake(self):
+        """Acorda os workers (chamado ao enfileirar neste processo)"""
+        self._wakeup.set()
+
+    def stop(self, timeout=10):
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self, worker):
+        last_purge = 0.0
+        while not self._stopping.is_set():
+            try:
+                job = self.queue.claim(worker, self.lease_seconds)
+            except sqlite3.Error as e:
+                print(f"❌ Erro ao buscar job na fila: {e}")
+                job = None
+
+            if job is None:
+                if time.monotonic() - last_purge > 3600:
+                    last_purge = time.monotonic()
+                    self.queue.purge(self.retention_seconds)
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            try:
+                self._execute(job)
+            except sqlite3.Error as e:
+                print(f"❌ Erro ao atualizar o job {job['id']} na fila: {e}")
+
+    def _execute(self, job):
+        handler = _handlers.get(job['kind'])
+        if handler is None:
+            self.queue.fail(job['id'], f"Tipo de job desconhecido: {job['kind']}")
+            return
+
+        running = _RunningJob(self.queue, job, self.lease_seconds)
+        running.report('started', {'status': RUNNING, 'attempt': job['attempts']})
+
+        try:
+            with self.app.app_context():
+                result = handler(job['payload'], running)
+            self.queue.complete(job['id'], result)
+        except JobError as e:
+            self.queue.fail(job['id'], str(e))
+        except Exception as e:
+            print(f"❌ Erro no job {job['kind']} ({job['id']}): {e}")
+            self.queue.fail(job['id'], str(e), retry=job['attempts'] < job['max_attempts'])
+            with self.app.app_context():
+                from extensions import db
+                db.session.rollback()
+
+
+def init_job_queue(app):
+    """
+    Cria a fila do app (arquivo JOB_QUEUE_PATH ou instance/jobs.sqlite3) e registra
+    o início preguiçoso dos workers na primeira requisição; retorna a fila.
+    """
+    path = app.config.get('JOB_QUEUE_PATH') or os.path.join(app.instance_path, 'jobs.sqlite3')
+    queue = JobQueue(path)
+    pool = JobWorkerPool(app, queue)
+    app.extensions['job_queue'] = queue
+    app.extensions['job_workers'] = pool
+
+    @app.before_request
+    def _start_job_workers():
+        pool.start()
+
+    return queue
+
+
+def enqueue_job(kind, payload, job_id=None):
+    """Enfileira um job na fila do app atual e acorda os workers locais"""
+    from flask import current_app
+
+    queue = current_app.extensions['job_queue']
+    job_id = queue.enqueue(kind, payload, int(current_app.config.get('JOB_MAX_ATTEMPTS', 2)), job_id)
+    current_app.extensions['job_workers'].wake()
+    return job_id
@@ -0,0 +1,186 @@
+# services/json_stream.py - Parser JSON incremental e tolerante para respostas de LLM
+import json
+import re
+
+# Strings JSON (ignoradas) ou defeitos a corrigir fora delas
+_STRING_OR_TRAILING_COMMA = re.compile(r'"(?:\\.|[^"\\])*"|,(\s*[}\]])')
+_STRING_OR_PY_LITERAL = re.compile(r'"(?:\\.|[^"\\])*"|\b(True|False|None)\b')
+_PY_LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+_COMPLETE_LITERALS = {'true', 'false', 'null', *_PY_LITERALS}
+
+
+def repair_json(text):
+    """
+    Corrige defeitos comuns do JSON gerado por LLM: cercas de código e texto
+    antes/depois do documento, vírgulas sobrando, literais do Python,
+    colchetes trocados e saída truncada (volta até o último valor completo e
+    fecha as estruturas abertas).
+    """
+    starts = [i for i in (text.find('{'), text.find('[')) if i != -1]
+    if not starts:
+        return text
+
+    out = []
+    stack = []
+    safe_point = None  # (tamanho de out, pilha) após o último valor completo
+    in_string = escape = False
+    expect_key = string_is_key = False  # posição de chave de objeto (antes do ':')
+    word = ''  # palavra solta em andamento (true, false, null, número...)
+
+    for c in text[min(starts):]:
+        if in_string:
+            out.append(c)
+            if escape:
+                escape = False
+            elif c == '\\':
+                escape = True
+            elif c == '"':
+                in_string = False
+                # Uma string de valor fechada é um valor completo; uma chave ainda não
+                if not string_is_key:
+                    safe_point = (len(out), list(stack))
+            continue
+
+        word = word + c if c.isalnum() else ''
+        if c == '"':
+            in_string = True
+            string_is_key = expect_key
+            out.append(c)
+        elif c in '{[':
+            stack.append('}' if c == '{' else ']')
+            expect_key = c == '{'
+            out.append(c)
+        elif c in '}]':
+            out.append(stack.pop())
+            if not stack:
+                break
+            expect_key = False
+            safe_point = (len(out), list(stack))
+        elif c == ',':
+            safe_point = (len(out), list(stack))
+            expect_key = stack[-1] == '}'
+            out.append(c)
+        else:
+            if c == ':':
+                expect_key = False
+            out.append(c)
+            # Literais completos também são valores completos (números podem estar cortados)
+            if word in _COMPLETE_LITERALS and not expect_key:
+                safe_point = (len(out), list(stack))
+
+    if stack:
+        if safe_point:
+            length, stack = safe_point
+            del out[length:]
+        else:
+            if escape:
+                out.pop()
+            if in_string:
+                out.append('"')
+            tail = ''.join(out).rstrip()
+            if tail.endswith(':'):
+                tail += ' null'
+            out = [tail.rstrip(',')]
+        out.extend(reversed(stack))
+
+    repaired = ''.join(out)
+    repaired = _STRING_OR_TRAILING_COMMA.sub(lambda m: m.group(1) if m.group(1) is not None else m.group(0), repaired)
+    return _STRING_OR_PY_LITERAL.sub(lambda m: _PY_LITERALS.get(m.group(1), m.group(0)), repaired)
+
+
+def loads_tolerant(text):
+    """json.loads que tenta repair_json antes de desistir (levanta json.JSONDecodeError)"""
+    try:
+        return json.loads(text, strict=False)
+    except json.JSONDecodeError:
+        return json.loads(repair_json(text), strict=False)
+
+
+class JSONStreamParser:
+    """
+    Recebe os trechos de uma resposta em streaming e devolve cada elemento dos
+    arrays cujo nome está em `fields` (ex.: 'objectives', 'suggestions') assim
+    que ele fecha. Texto antes do primeiro '{' (explicações, ```json) é ignorado.
+    """
+
+    def __init__(self, fields):
+        self.fields = set(fields)
+        self.buffer = ''
+        self.emitted = 0
+        self.errors = 0
+        self._pos = 0
+        self._stack = []  # [tipo, nome do campo, início do elemento atual]
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_string = None
+        self._key = None
+        self._done = False
+
+    def feed(self, chunk):
+        """Acrescenta um trecho; retorna a lista de (campo, elemento) completados"""
+        self.buffer += chunk
+        items = []
+        while self._pos < len(self.buffer) and not self._done:
+            self._step(self.buffer[self._pos], self._pos, items)
+            self._pos += 1
+        return items
+
+    def document(self):
+        """Documento completo recebido até agora (com reparo de defeitos/truncamento)"""
+        return loads_tolerant(self.buffer)
+
+    def _step(self, c, pos, items):
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif c == '\\':
+                self._escape = True
+            elif c == '"':
+                self._in_string = False
+                self._last_string = self.buffer[self._string_start + 1:pos]
+            return
+
+        if not self._stack:
+            if c == '{':
+                self._stack.append(['{', None, None])
+            return
+
+        if c.isspace():
+            return
+
+        top = self._stack[-1]
+        target = top[0] == '[' and top[1] in self.fields
+        if target and top[2] is None and c not in ',]':
+            top[2] = pos
+
+        if c == '"':
+            self._in_string = True
+            self._string_start = pos
+        elif c == ':':
+            self._key = self._last_string
+        elif c in '{[':
+            self._stack.append([c, self._key if top[0] == '{' else None, None])
+            self._key = None
+        elif c == ',':
+            if target and top[2] is not None:
+                self._emit(top, self.buffer[top[2]:pos], items)
+        elif c in '}]':
+            if target and top[2] is not None:
+                self._emit(top, self.buffer[top[2]:pos], items)
+            self._stack.pop()
+            if not self._stack:
+                self._done = True
+                return
+            parent = self._stack[-1]
+            if parent[0] == '[' and parent[1] in self.fields and parent[2] is not None:
+                self._emit(parent, self.buffer[parent[2]:pos + 1], items)
+
+    def _emit(self, entry, raw, items):
+        entry[2] = None
+        try:
+            items.append((entry[1], loads_tolerant(raw.strip())))
+            self.emitted += 1
+        except json.JSONDecodeError as e:
+            self.errors += 1
+            print(f"⚠️  Elemento de '{entry[1]}' com JSON inválido ignorado: {e}")
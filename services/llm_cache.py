@@ -0,0 +1,142 @@
+# services/llm_cache.py - Cache de respostas de LLM em duas camadas
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from flask import current_app
+
+
+def build_cache_key(provider, model, prompt, **params):
+    """Gera a chave do cache (SHA-256) a partir de provedor, modelo, prompt e parâmetros de geração"""
+    key_data = {
+        'provider': provider,
+        'model': model,
+        'prompt': prompt,
+        'params': params
+    }
+    raw = json.dumps(key_data, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    L1: LRU em memória com TTL e limite de entradas (por processo).
+    L2: linhas anteriores de groq_responses encontradas pelo prompt_hash.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits_l1 = 0
+        self.hits_l2 = 0
+        self.misses = 0
+
+    def _config(self, name, default):
+        return current_app.config.get(name, default)
+
+    def get(self, key):
+        """Retorna o resultado em cache (dict) ou None"""
+        if not self._config('LLM_CACHE_ENABLED', True):
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, result = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits_l1 += 1
+                    return dict(result, cached=True, cache_level='l1')
+                del self._entries[key]
+
+        result = self._get_l2(key)
+        with self._lock:
+            if result is not None:
+                self.hits_l2 += 1
+            else:
+                self.misses += 1
+
+        if result is not None:
+            # Promover para o L1
+            self.set(key, result)
+            return dict(result, cached=True, cache_level='l2')
+        return None
+
+    def set(self, key, result):
+        """Armazena um resultado bem-sucedido no L1"""
+        if not self._config('LLM_CACHE_ENABLED', True):
+            return
+
+        ttl = float(self._config('LLM_CACHE_TTL_SECONDS', 3600))
+        max_entries = int(self._config('LLM_CACHE_MAX_ENTRIES', 1000))
+        value = {
+            'success': True,
+            'content': result['content'],
+            'tokens_used': result.get('tokens_used', 0),
+            'response_time_ms': result.get('response_time_ms', 0)
+        }
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    def _get_l2(self, key):
+        """Busca uma resposta persistida em groq_responses pelo prompt_hash"""
+        if not self._config('LLM_CACHE_L2_ENABLED', True):
+            return None
+
+        from models import GroqResponse, db
+
+        ttl = float(self._config('LLM_CACHE_L2_TTL_SECONDS', 7 * 24 * 3600))
+        cutoff = datetime.utcnow() - timedelta(seconds=ttl)
+
+        try:
+            row = (GroqResponse.query
+                   .filter(GroqResponse.prompt_hash == key)
+                   .filter(GroqResponse.created_at >= cutoff)
+                   .order_by(GroqResponse.id.desc())
+                   .first())
+        except Exception as e:
+            print(f"⚠️  Cache L2 indisponível: {e}")
+            db.session.rollback()
+            return None
+
+        if row is None:
+            return None
+
+        return {
+            'success': True,
+            'content': row.response,
+            'tokens_used': row.tokens_used or 0,
+            'response_time_ms': row.response_time_ms or 0
+        }
+
+    def clear(self):
+        """Esvazia o L1 e zera os contadores"""
+        with self._lock:
+            self._entries.clear()
+            self.hits_l1 = 0
+            self.hits_l2 = 0
+            self.misses = 0
+
+    def stats(self):
+        """Contadores de acerto/erro do cache"""
+        with self._lock:
+            lookups = self.hits_l1 + self.hits_l2 + self.misses
+            hits = self.hits_l1 + self.hits_l2
+            return {
+                'hits_l1': self.hits_l1,
+                'hits_l2': self.hits_l2,
+                'misses': self.misses,
+                'hit_ratio': round(hits / lookups, 4) if lookups else 0.0,
+                'size': len(self._entries)
+            }
+
+
+# Instância compartilhada pelo processo
+llm_cache = LLMResponseCache()
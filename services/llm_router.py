@@ -0,0 +1,343 @@
+# services/llm_router.py - Roteamento entre provedores com circuit breaker, failover e hedging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from flask import current_app
+
+# Estados do circuit breaker
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class ProviderHealth:
+    """Latência e taxa de erro recentes de um provedor, com circuit breaker"""
+
+    def __init__(self, provider, window):
+        self.provider = provider
+        self.samples = deque(maxlen=window)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.lock = threading.Lock()
+
+    def record(self, latency_ms, ok, config, probe=False):
+        with self.lock:
+            self.samples.append((latency_ms, ok))
+
+            if probe and self.state == HALF_OPEN:
+                # A requisição de teste decide se o circuito fecha ou reabre
+                self.probe_in_flight = False
+                if ok:
+                    self.state = CLOSED
+                    self.samples.clear()
+                else:
+                    self._open()
+                return
+
+            min_samples = int(config.get('LLM_BREAKER_MIN_SAMPLES', 5))
+            threshold = float(config.get('LLM_BREAKER_ERROR_THRESHOLD', 0.5))
+            if self.state == CLOSED and len(self.samples) >= min_samples and self._error_rate() >= threshold:
+                self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        print(f"⚠️  Circuit breaker aberto para {self.provider}")
+
+    def _error_rate(self):
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    def _cooled_down(self, config):
+        cooldown = float(config.get('LLM_BREAKER_COOLDOWN_SECONDS', 30))
+        return time.monotonic() - self.opened_at >= cooldown
+
+    def is_available(self, config):
+        """Se uma chamada seria aceita agora (sem alterar o estado do circuito)"""
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                return self._cooled_down(config)
+            return not self.probe_in_flight
+
+    def allow_request(self, config):
+        """
+        Reserva a chamada: CLOSED (circuito fechado), HALF_OPEN (esta é a única requisição
+        de teste após o cooldown) ou False (circuito aberto ou teste já em andamento).
+        """
+        with self.lock:
+            if self.state == CLOSED:
+                return CLOSED
+            if self.probe_in_flight:
+                return False
+            if self.state == HALF_OPEN or self._cooled_down(config):
+                self.state = HALF_OPEN
+                self.probe_in_flight = True
+                return HALF_OPEN
+            return False
+
+    def release_probe(self):
+        """Devolve o teste sem resultado (cache, orçamento, limite local ou exceção)"""
+        with self.lock:
+            if self.state == HALF_OPEN and self.probe_in_flight:
+                # Volta a aberto já resfriado: a próxima chamada pode testar
+                self.state = OPEN
+                self.probe_in_flight = False
+
+    def p95_ms(self):
+        """Latência p95 das chamadas bem-sucedidas recentes (None sem amostras)"""
+        with self.lock:
+            latencies = sorted(latency for latency, ok in self.samples if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+    def snapshot(self):
+        p95 = self.p95_ms()
+        with self.lock:
+            return {
+                'state': self.state,
+                'probe_in_flight': self.probe_in_flight,
+                'samples': len(self.samples),
+                'error_rate': round(self._error_rate(), 4),
+                'p95_ms': p95
+            }
+
+
+# Saúde dos provedores e pool de hedging compartilhados pelo processo
+_health = {}
+_health_lock = threading.Lock()
+_hedge_executor = None
+
+
+def get_provider_health(provider):
+    health = _health.get(provider)
+    if health is None:
+        with _health_lock:
+            health = _health.get(provider)
+            if health is None:
+                window = int(current_app.config.get('LLM_ROUTER_WINDOW', 50))
+                health = ProviderHealth(provider, window)
+                _health[provider] = health
+    return health
+
+
+def _get_hedge_executor():
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _health_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='llm-hedge')
+    return _hedge_executor
+
+
+def router_stats():
+    """Estado do circuit breaker, taxa de erro e p95 de cada provedor"""
+    with _health_lock:
+        providers = dict(_health)
+    return {provider: health.snapshot() for provider, health in providers.items()}
+
+
+class LLMRouter:
+    """
+    Encaminha chamadas ao provedor preferido, pulando provedores com circuito aberto
+    e fazendo failover para o próximo em caso de erro. Com LLM_HEDGE_ENABLED, dispara
+    uma requisição duplicada no provedor alternativo quando a principal passa do p95.
+    """
+
+    def __init__(self, services):
+        # services: {'groq': GroqService(), 'gemini': GeminiService()}
+        self.services = services
+
+    @classmethod
+    def with_defaults(cls, primary=None):
+        """Router com Groq e Gemini, reaproveitando a instância primary se fornecida"""
+        from services.groq_service import GroqService
+        from services.gemini_service import GeminiService
+
+        services = {}
+        if primary is not None:
+            services[primary.provider] = primary
+        if 'groq' not in services:
+            services['groq'] = GroqService()
+        if 'gemini' not in services:
+            services['gemini'] = GeminiService()
+        return cls(services)
+
+    def generate_response(self, prompt, module_type='general', session_id=None, max_tokens=1000,
+                          bypass_cache=False, preferred=None):
+        """Mesma interface de BaseLLMService.generate_response, com o provedor preferido opcional"""
+        config = current_app.config
+        kwargs = {
+            'prompt': prompt,
+            'module_type': module_type,
+            'session_id': session_id,
+            'max_tokens': max_tokens,
+            'bypass_cache': bypass_cache
+        }
+
+        candidates, forced = self._candidates(preferred, config)
+        attempted = set()
+        result = None
+
+        for index, provider in enumerate(candidates):
+            if provider in attempted:
+                continue
+            alternate = candidates[index + 1] if index + 1 < len(candidates) else None
+
+            if config.get('LLM_HEDGE_ENABLED', False) and alternate:
+                result = self._call_hedged(provider, alternate, kwargs, attempted)
+            else:
+                attempted.add(provider)
+                result = self._call(provider, kwargs, claim=not forced)
+
+            # Orçamento da sessão esgotado vale para todos os provedores
+            if result['success'] or result.get('budget_blocked'):
+                return result
+
+            if alternate and alternate not in attempted:
+                print(f"⚠️  Failover de {provider} para {alternate}: {result.get('error')}")
+
+        return result
+
+    def stream_response(self, prompt, module_type='general', session_id=None, max_tokens=1000,
+                        bypass_cache=False, preferred=None):
+        """
+        Mesma interface de BaseLLMService.stream_response, com circuit breaker e failover.
+        O failover só acontece antes do primeiro trecho; depois dele, um erro do provedor
+        é levantado (LLMServiceError) para não misturar respostas de dois modelos.
+        """
+        from services.llm_service import LLMServiceError
+
+        config = current_app.config
+        candidates, forced = self._candidates(preferred, config)
+        error = None
+
+        for index, provider in enumerate(candidates):
+            health = get_provider_health(provider)
+            admitted = CLOSED if forced else health.allow_request(config)
+            if not admitted:
+                error = LLMServiceError(f'Circuito aberto para {provider}')
+                continue
+            probe = admitted == HALF_OPEN
+
+            outcome = {}
+            started = False
+            start_time = time.time()
+            try:
+                for chunk in self.services[provider].stream_response(prompt, module_type, session_id, max_tokens,
+                                                                     bypass_cache, outcome=outcome):
+                    started = True
+                    yield chunk
+            except LLMServiceError as e:
+                # Recusas locais não refletem a saúde do provedor; o orçamento vale para todos
+                if e.rate_limited or e.budget_blocked:
+                    if probe:
+                        health.release_probe()
+                else:
+                    health.record((time.time() - start_time) * 1000, False, config, probe=probe)
+                if started or e.budget_blocked:
+                    raise
+                error = e
+                alternate = candidates[index + 1] if index + 1 < len(candidates) else None
+                if alternate:
+                    print(f"⚠️  Failover do streaming de {provider} para {alternate}: {e}")
+                continue
+            except BaseException:
+                # Exceção inesperada ou cliente desconectado (GeneratorExit): sem resultado
+                if probe:
+                    health.release_probe()
+                raise
+
+            if outcome.get('cached'):
+                if probe:
+                    health.release_probe()
+            else:
+                health.record((time.time() - start_time) * 1000, True, config, probe=probe)
+            return
+
+        raise error
+
+    def _candidates(self, preferred, config):
+        """
+        (provedores na ordem de tentativa sem os de circuito aberto, forçado).
+        Só consulta o circuito; a vaga de teste é reservada em _call.
+        """
+        order = list(self.services)
+        if preferred in self.services:
+            order.remove(preferred)
+            order.insert(0, preferred)
+
+        available = [p for p in order if get_provider_health(p).is_available(config)]
+        if available:
+            return available, False
+        # Com todos os circuitos abertos, tentar mesmo assim o preferido
+        return order[:1], True
+
+    def _call(self, provider, kwargs, claim=True):
+        """Chama o provedor e registra latência/erro"""
+        config = current_app.config
+        health = get_provider_health(provider)
+        admitted = health.allow_request(config) if claim else CLOSED
+        if not admitted:
+            return {
+                'success': False,
+                'error': f'Circuito aberto para {provider}',
+                'circuit_open': True,
+                'provider': provider
+            }
+        probe = admitted == HALF_OPEN
+
+        start_time = time.time()
+        try:
+            result = self.services[provider].generate_response(**kwargs)
+        except Exception:
+            if probe:
+                health.release_probe()
+            raise
+        latency_ms = (time.time() - start_time) * 1000
+
+        # Acertos de cache, bloqueios de orçamento e o limitador local não refletem a saúde do provedor
+        if result.get('cached') or result.get('budget_blocked') or result.get('rate_limited'):
+            if probe:
+                health.release_probe()
+        else:
+            health.record(latency_ms, result['success'], config, probe=probe)
+
+        result['provider'] = provider
+        return result
+
+    def _call_in_context(self, app, provider, kwargs):
+        with app.app_context():
+            return self._call(provider, kwargs)
+
+    def _call_hedged(self, primary, alternate, kwargs, attempted):
+        """Espera o p95 do principal; se não responder, dispara a cópia no alternativo"""
+        app = current_app._get_current_object()
+        p95_ms = get_provider_health(primary).p95_ms()
+        executor = _get_hedge_executor()
+
+        attempted.add(primary)
+        first = executor.submit(self._call_in_context, app, primary, kwargs)
+        if p95_ms is None:
+            return first.result()
+
+        try:
+            return first.result(timeout=p95_ms / 1000.0)
+        except FuturesTimeoutError:
+            pass
+
+        print(f"⚠️  {primary} passou do p95 ({p95_ms:.0f}ms), enviando requisição hedge para {alternate}")
+        attempted.add(alternate)
+        second = executor.submit(self._call_in_context, app, alternate, kwargs)
+
+        result = None
+        for future in as_completed([first, second]):
+            result = future.result()
+            if result['success']:
+                return result
+        return result
@@ -0,0 +1,326 @@
+# services/llm_service.py - Comportamento comum aos serviços de LLM (Groq/Gemini)
+import copy
+import time
+from flask import current_app
+from services.audit_sink import audit_sink
+from services.rate_limiter import rate_limiter, backoff_delay
+from services.single_flight import single_flight, normalize_prompt
+from services.prompt_builder import estimate_tokens
+from services.llm_cache import llm_cache, build_cache_key
+from services.semantic_cache import semantic_cache
+from services.metrics import record_llm_call
+from services.token_accounting import (
+    token_accounting, compute_cost, BUDGET_BLOCK, BUDGET_DOWNGRADE, BUDGET_EXCEEDED_ERROR
+)
+
+
+class LLMServiceError(Exception):
+    """
+    Erro do provedor durante uma resposta em streaming.
+    rate_limited/budget_blocked: recusa local (limitador ou orçamento da sessão), sem chamada ao provedor.
+    """
+
+    def __init__(self, message, rate_limited=False, budget_blocked=False):
+        super().__init__(message)
+        self.rate_limited = rate_limited
+        self.budget_blocked = budget_blocked
+
+
+class BaseLLMService:
+    """
+    Classe base dos provedores de LLM.
+    Cada provedor implementa _request_completion(prompt, max_tokens) e
+    _stream_completion(prompt, max_tokens, usage); a base cuida do cache
+    (exato e semântico), do orçamento por sessão e do registro em groq_responses.
+    """
+    provider = None
+    temperature = 0.7
+    deadline = None  # time.monotonic() limite da operação (ver with_deadline)
+
+    def generate_response(self, prompt, module_type='general', session_id=None, max_tokens=1000,
+                          bypass_cache=False):
+        """
+        Gera resposta usando o provedor, consultando antes o cache.
+        Use bypass_cache=True para forçar uma nova chamada à API.
+        Sessões acima do orçamento usam o modelo de rebaixamento ou são bloqueadas;
+        respostas em cache não gastam orçamento e são servidas mesmo assim.
+        """
+        if not bypass_cache:
+            cached = self._cached_response(prompt, module_type, max_tokens)
+            if cached is not None:
+                return cached
+
+        service = self._budgeted_service(session_id)
+        if service is None:
+            record_llm_call(self.provider, self.model, module_type, 0, 'budget_blocked')
+            return {'success': False, 'error': BUDGET_EXCEEDED_ERROR, 'status_code': 402, 'budget_blocked': True}
+
+        if service is not self and not bypass_cache:
+            cached = service._cached_response(prompt, module_type, max_tokens)
+            if cached is not None:
+                return cached
+        
+        return service._generate_response(prompt, module_type, session_id, max_tokens)
+
+    def _cached_response(self, prompt, module_type, max_tokens):
+        """Resposta do cache exato (L1/L2) ou semântico para este modelo, ou None"""
+        cache_key = build_cache_key(
+            self.provider, self.model, prompt,
+            max_tokens=max_tokens, temperature=self.temperature
+        )
+        cached = llm_cache.get(cache_key) or semantic_cache.get(
+            module_type, self._semantic_scope(max_tokens), prompt, cache_key
+        )
+        if cached is not None:
+            record_llm_call(self.provider, self.model, module_type, 0, 'cached')
+        return cached
+
+    def _generate_response(self, prompt, module_type, session_id, max_tokens):
+        cache_key = build_cache_key(
+            self.provider, self.model, prompt,
+            max_tokens=max_tokens, temperature=self.temperature
+        )
+
+        scope = self._semantic_scope(max_tokens)
+
+        def call_provider():
+            result = self._request_with_retries(prompt, max_tokens, module_type)
+            if result['success']:
+                self._save_response(prompt, result, module_type, session_id, cache_key)
+                llm_cache.set(cache_key, result)
+                semantic_cache.set(module_type, scope, prompt, cache_key, result)
+            return result
+
+        # Chamadas idênticas concorrentes esperam a mesma chamada ao provedor
+        if not current_app.config.get('LLM_COALESCING_ENABLED', True):
+            return call_provider()
+
+        flight_key = build_cache_key(
+            self.provider, self.model, normalize_prompt(prompt),
+            max_tokens=max_tokens, temperature=self.temperature
+        )
+        return single_flight.do(flight_key, call_provider)
+
+    def stream_response(self, prompt, module_type='general', session_id=None, max_tokens=1000,
+                        bypass_cache=False, outcome=None):
+        """
+        Gera a resposta em streaming, produzindo os trechos de texto à medida que chegam.
+        A linha em groq_responses é gravada quando o stream termina.
+        Erros do provedor (e orçamento da sessão esgotado) são levantados como LLMServiceError;
+        como em generate_response, o orçamento só é verificado quando o cache não responde.
+        outcome (dict opcional) recebe 'cached': True quando a resposta veio do cache.
+        """
+        outcome = outcome if outcome is not None else {}
+        if not bypass_cache:
+            cached = self._cached_response(prompt, module_type, max_tokens)
+            if cached is not None:
+                outcome['cached'] = True
+                yield cached['content']
+                return
+
+        service = self._budgeted_service(session_id)
+        if service is None:
+            record_llm_call(self.provider, self.model, module_type, 0, 'budget_blocked')
+            raise LLMServiceError(BUDGET_EXCEEDED_ERROR, budget_blocked=True)
+
+        if service is not self and not bypass_cache:
+            cached = service._cached_response(prompt, module_type, max_tokens)
+            if cached is not None:
+                outcome['cached'] = True
+                yield cached['content']
+                return
+        
+        yield from service._stream_response(prompt, module_type, session_id, max_tokens)
+
+    def _stream_response(self, prompt, module_type, session_id, max_tokens):
+        cache_key = build_cache_key(
+            self.provider, self.model, prompt,
+            max_tokens=max_tokens, temperature=self.temperature
+        )
+
+        scope = self._semantic_scope(max_tokens)
+
+        if not rate_limiter.acquire(self.provider, self.model, self._estimate_tokens(prompt, max_tokens)):
+            record_llm_call(self.provider, self.model, module_type, 0, 'rate_limited')
+            raise LLMServiceError('Rate limit: orçamento do provedor esgotado, tente novamente em instantes',
+                                  rate_limited=True)
+
+        parts = []
+        usage = {'tokens_used': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+        start_time = time.time()
+
+        try:
+            for chunk in self._stream_completion(prompt, max_tokens, usage):
+                parts.append(chunk)
+                yield chunk
+        except LLMServiceError:
+            record_llm_call(self.provider, self.model, module_type, time.time() - start_time, 'error')
+            raise
+
+        record_llm_call(self.provider, self.model, module_type, time.time() - start_time, 'success',
+                        usage['tokens_used'])
+        result = {
+            'success': True,
+            'content': ''.join(parts),
+            'tokens_used': usage['tokens_used'],
+            'prompt_tokens': usage['prompt_tokens'],
+            'completion_tokens': usage['completion_tokens'],
+            'response_time_ms': int((time.time() - start_time) * 1000)
+        }
+        self._save_response(prompt, result, module_type, session_id, cache_key)
+        llm_cache.set(cache_key, result)
+        semantic_cache.set(module_type, scope, prompt, cache_key, result)
+
+    def _respond(self, prompt, module_type, session_id=None, stream=False, max_tokens=1000):
+        """
+        Usado pelos geradores de prompt: com stream=True devolve o gerador de trechos;
+        com LLM_ROUTING_ENABLED passa pelo LLMRouter (failover/hedging), preferindo este provedor.
+        """
+        if current_app.config.get('LLM_ROUTING_ENABLED', True):
+            from services.llm_router import LLMRouter
+            router = LLMRouter.with_defaults(primary=self)
+            if stream:
+                return router.stream_response(prompt, module_type, session_id, max_tokens, preferred=self.provider)
+            return router.generate_response(prompt, module_type, session_id, max_tokens, preferred=self.provider)
+
+        if stream:
+            return self.stream_response(prompt, module_type, session_id, max_tokens)
+        return self.generate_response(prompt, module_type, session_id, max_tokens)
+
+    def with_model(self, model):
+        """Cópia do serviço usando outro modelo do mesmo provedor"""
+        service = copy.copy(self)
+        service.model = model
+        return service
+
+    def with_deadline(self, deadline):
+        """
+        Cópia do serviço cujas chamadas terminam até deadline (time.monotonic()):
+        timeouts HTTP, espera no limitador e novas tentativas ficam limitados ao tempo restante
+        """
+        service = copy.copy(self)
+        service.deadline = deadline
+        return service
+
+    def _remaining(self):
+        """Segundos até o prazo da operação (None sem prazo)"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def _request_timeout(self):
+        """Timeout (connect, read) da chamada HTTP, limitado pelo prazo da operação"""
+        remaining = self._remaining()
+        if remaining is None:
+            return self.timeout
+        connect_timeout, read_timeout = self.timeout
+        remaining = max(remaining, 0.1)
+        return (min(connect_timeout, remaining), min(read_timeout, remaining))
+
+    def _budgeted_service(self, session_id):
+        """
+        Serviço a usar conforme o orçamento da sessão: self, uma cópia com o modelo
+        de LLM_BUDGET_DOWNGRADE_MODELS, ou None quando a sessão está bloqueada
+        """
+        decision = token_accounting.check_session_budget(session_id)
+        if decision == BUDGET_BLOCK:
+            return None
+        if decision == BUDGET_DOWNGRADE:
+            model = current_app.config.get('LLM_BUDGET_DOWNGRADE_MODELS', {}).get(self.provider)
+            if model and model != self.model:
+                return self.with_model(model)
+        return self
+
+    def _request_with_retries(self, prompt, max_tokens, module_type='general'):
+        """
+        Chama o provedor respeitando o limitador de taxa e repetindo
+        erros 429/5xx com backoff exponencial com jitter.
+        Cada tentativa é registrada nas métricas de LLM.
+        """
+        max_retries = int(current_app.config.get('LLM_MAX_RETRIES', 3))
+        estimated_tokens = self._estimate_tokens(prompt, max_tokens)
+
+        for attempt in range(max_retries + 1):
+            remaining = self._remaining()
+            if remaining is not None and remaining <= 0:
+                return {'success': False, 'error': 'Prazo da operação esgotado', 'status_code': 504}
+
+            max_wait = None
+            if remaining is not None:
+                max_wait = min(float(current_app.config.get('LLM_RATE_LIMIT_MAX_WAIT', 10)), remaining)
+            if not rate_limiter.acquire(self.provider, self.model, estimated_tokens, max_wait=max_wait):
+                record_llm_call(self.provider, self.model, module_type, 0, 'rate_limited')
+                return {
+                    'success': False,
+                    'error': 'Rate limit: orçamento do provedor esgotado, tente novamente em instantes',
+                    'status_code': 429,
+                    'rate_limited': True  # rejeição local, sem chamada ao provedor
+                }
+
+            start_time = time.time()
+            result = self._request_completion(prompt, max_tokens)
+            record_llm_call(
+                self.provider, self.model, module_type, time.time() - start_time,
+                'success' if result['success'] else 'error', result.get('tokens_used', 0)
+            )
+
+            status_code = result.get('status_code')
+            retryable = status_code == 429 or (status_code is not None and status_code >= 500)
+            if result['success'] or not retryable or attempt == max_retries:
+                return result
+
+            delay = backoff_delay(attempt)
+            remaining = self._remaining()
+            if remaining is not None and delay >= remaining:
+                return result
+            print(f"⚠️  {self.provider} respondeu {status_code}, nova tentativa em {delay:.2f}s")
+            time.sleep(delay)
+
+    def _semantic_scope(self, max_tokens):
+        """Parâmetros que precisam coincidir para o cache semântico reaproveitar uma resposta"""
+        return f'{self.provider}:{self.model}:{max_tokens}:{self.temperature}'
+
+    def _estimate_tokens(self, prompt, max_tokens):
+        """Estimativa de tokens da chamada (prompt + saída máxima) para o limitador"""
+        return estimate_tokens(prompt) + max_tokens
+
+    def _observe_rate_limit_headers(self, headers):
+        """Repassa os cabeçalhos de rate limit da resposta ao limitador"""
+        rate_limiter.update_from_headers(self.provider, self.model, headers)
+
+    def _request_completion(self, prompt, max_tokens):
+        """Chama a API do provedor - implementado por cada serviço"""
+        raise NotImplementedError
+
+    def _stream_completion(self, prompt, max_tokens, usage):
+        """
+        Chama a API do provedor em modo streaming - implementado por cada serviço.
+        Produz trechos de texto e preenche usage['tokens_used'] ao final.
+        """
+        raise NotImplementedError
+
+    def _save_response(self, prompt, result, module_type, session_id, prompt_hash):
+        """
+        Registra a resposta em groq_responses (gravação assíncrona em lote)
+        e soma o gasto ao orçamento em memória da sessão
+        """
+        prompt_tokens = result.get('prompt_tokens', 0)
+        completion_tokens = result.get('completion_tokens', 0)
+        
+        # Antes do audit sink: o gasto da sessão é carregado dos rollups sem esta chamada
+        token_accounting.record_usage(
+            session_id, result['tokens_used'],
+            compute_cost(self.model, prompt_tokens, completion_tokens, result['tokens_used'])
+        )
+        audit_sink.record(
+            session_id=session_id,
+            prompt=prompt,
+            response=result['content'],
+            model_used=self.model,
+            tokens_used=result['tokens_used'],
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            response_time_ms=result['response_time_ms'],
+            module_type=module_type,
+            prompt_hash=prompt_hash
+        )
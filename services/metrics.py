@@ -0,0 +1,367 @@
+# services/metrics.py - Métricas da aplicação no formato texto do Prometheus
+import atexit
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+# Limites dos histogramas (segundos)
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+SIMILARITY_BUCKETS = (0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.92, 0.94, 0.96, 0.98, 0.99, 1)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """Contador monotônico com labels"""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        """Valores atuais serializáveis em JSON: [[labels, valor], ...]"""
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def merge(self, collected):
+        """Soma as coletas de vários processos em {labels: valor}"""
+        values = {}
+        for samples in collected:
+            for key, value in samples:
+                key = tuple(key)
+                values[key] = values.get(key, 0) + value
+        return values
+
+    def render(self, values=None):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        if values is None:
+            values = self.merge([self.collect()])
+        for key, value in sorted(values.items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    """Histograma com labels; observe() custa uma busca binária e um incremento"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=REQUEST_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # contagens por faixa (+Inf na última posição), soma e total
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self):
+        """Séries atuais serializáveis em JSON: [[labels, contagens, soma, total], ...]"""
+        with self._lock:
+            return [[list(key), list(s[0]), s[1], s[2]] for key, s in self._series.items()]
+
+    def merge(self, collected):
+        """Soma as coletas de vários processos em {labels: (contagens, soma, total)}"""
+        series = {}
+        size = len(self.buckets) + 1
+        for samples in collected:
+            for key, counts, total, count in samples:
+                if len(counts) != size:
+                    # Arquivo gravado com outras faixas (versão anterior do código)
+                    continue
+                merged = series.setdefault(tuple(key), [[0] * size, 0.0, 0])
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+                merged[2] += count
+        return series
+
+    def render(self, series=None):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        if series is None:
+            series = self.merge([self.collect()])
+
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else _format_value(bound)
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, ("le", le))} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {total!r}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {count}')
+        return lines
+
+
+# Métricas do processo
+http_request_duration = Histogram(
+    'http_request_duration_seconds', 'Duração das requisições HTTP por endpoint',
+    ('endpoint', 'method', 'status')
+)
+db_queries_per_request = Histogram(
+    'db_queries_per_request', 'Consultas SQL executadas por requisição HTTP',
+    ('endpoint',), buckets=QUERY_COUNT_BUCKETS
+)
+db_time_per_request = Histogram(
+    'db_time_per_request_seconds', 'Tempo total em SQL por requisição HTTP',
+    ('endpoint',), buckets=REQUEST_BUCKETS
+)
+db_query_duration = Histogram(
+    'db_query_duration_seconds', 'Duração de cada consulta SQL por tipo de comando',
+    ('operation',), buckets=DB_BUCKETS
+)
+db_pool_checkouts = Counter(
+    'db_pool_checkouts_total', 'Conexões retiradas do pool do banco'
+)
+db_pool_connect_duration = Histogram(
+    'db_pool_connect_duration_seconds', 'Tempo para abrir uma conexão nova com o banco',
+    buckets=DB_BUCKETS
+)
+db_pool_hold_duration = Histogram(
+    'db_pool_hold_duration_seconds', 'Tempo em que cada conexão fica fora do pool (da retirada à devolução)',
+    buckets=REQUEST_BUCKETS
+)
+llm_request_duration = Histogram(
+    'llm_request_duration_seconds', 'Duração das chamadas aos provedores de LLM',
+    ('provider', 'model', 'module_type'), buckets=LLM_BUCKETS
+)
+llm_requests = Counter(
+    'llm_requests_total', 'Chamadas de LLM por resultado (success, error, rate_limited, cached, budget_blocked)',
+    ('provider', 'model', 'module_type', 'outcome')
+)
+llm_tokens = Counter(
+    'llm_tokens_total', 'Tokens consumidos nas chamadas de LLM',
+    ('provider', 'model', 'module_type')
+)
+llm_semantic_similarity = Histogram(
+    'llm_semantic_cache_similarity', 'Maior similaridade encontrada no cache semântico por consulta',
+    ('module_type', 'outcome'), buckets=SIMILARITY_BUCKETS
+)
+
+REGISTRY = [
+    http_request_duration, db_queries_per_request, db_time_per_request,
+    db_query_duration, db_pool_checkouts, db_pool_connect_duration, db_pool_hold_duration,
+    llm_request_duration, llm_requests, llm_tokens,
+    llm_semantic_similarity
+]
+
+
+# Modo multiprocesso (METRICS_MULTIPROC_DIR): cada processo grava suas métricas
+# num arquivo do diretório compartilhado e /metrics soma os arquivos de todos
+_multiproc_dir = None
+_flush_interval = 5.0
+_flusher_pid = None
+_snapshot_path = None
+_flusher_lock = threading.Lock()
+
+
+def _collect_all():
+    return {metric.name: metric.collect() for metric in REGISTRY}
+
+
+def write_snapshot():
+    """Grava as métricas deste processo no diretório compartilhado (escrita atômica)"""
+    if _snapshot_path is None:
+        return
+    tmp_path = f'{_snapshot_path}.tmp'
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(_collect_all(), f)
+        os.replace(tmp_path, _snapshot_path)
+    except OSError as e:
+        print(f"❌ Erro ao gravar métricas em {_snapshot_path}: {e}")
+
+
+def _read_snapshots():
+    """Coletas de todos os processos que já gravaram no diretório compartilhado"""
+    snapshots = []
+    for path in glob.glob(os.path.join(_multiproc_dir, 'metrics_*.json')):
+        try:
+            with open(path) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Arquivo de métricas ignorado ({path}): {e}")
+    return snapshots
+
+
+def _run_flusher(pid):
+    while _flusher_pid == pid:
+        time.sleep(_flush_interval)
+        write_snapshot()
+
+
+def _ensure_flusher():
+    """
+    Inicia a gravação periódica neste processo. Verifica o pid a cada requisição
+    porque os workers do gunicorn são criados por fork depois de init_metrics.
+    """
+    global _flusher_pid, _snapshot_path
+    pid = os.getpid()
+    if _multiproc_dir is None or _flusher_pid == pid:
+        return
+    with _flusher_lock:
+        if _flusher_pid == pid:
+            return
+        # pid + instante de início: um pid reaproveitado não sobrescreve os contadores de outro processo
+        _snapshot_path = os.path.join(_multiproc_dir, f'metrics_{pid}_{int(time.time() * 1000)}.json')
+        _flusher_pid = pid
+        threading.Thread(target=_run_flusher, args=(pid,), name='metrics-flush', daemon=True).start()
+
+
+def render_metrics():
+    """Todas as métricas no formato de exposição texto do Prometheus"""
+    if _multiproc_dir is None:
+        collected = [_collect_all()]
+    else:
+        _ensure_flusher()
+        write_snapshot()
+        collected = _read_snapshots()
+
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render(metric.merge(c.get(metric.name, []) for c in collected)))
+    return '\n'.join(lines) + '\n'
+
+
+def record_llm_call(provider, model, module_type, duration_seconds, outcome, tokens=0):
+    """Registra uma chamada (ou acerto de cache) de LLM"""
+    llm_requests.inc(provider=provider, model=model, module_type=module_type, outcome=outcome)
+    if outcome in ('success', 'error'):
+        llm_request_duration.observe(duration_seconds, provider=provider, model=model, module_type=module_type)
+    if tokens:
+        llm_tokens.inc(tokens, provider=provider, model=model, module_type=module_type)
+
+
+def record_semantic_lookup(module_type, similarity, hit):
+    """Registra a similaridade da consulta ao cache semântico (para calibrar o limiar)"""
+    llm_semantic_similarity.observe(similarity, module_type=module_type, outcome='hit' if hit else 'miss')
+
+
+def _before_request():
+    _ensure_flusher()
+    g.metrics_start = time.perf_counter()
+    g.db_queries = 0
+    g.db_time = 0.0
+
+
+def _after_request(response):
+    # Em respostas de streaming (SSE) mede-se o tempo até o início do envio
+    start = g.pop('metrics_start', None)
+    if start is not None:
+        endpoint = request.endpoint or 'unmatched'
+        http_request_duration.observe(
+            time.perf_counter() - start,
+            endpoint=endpoint, method=request.method, status=response.status_code
+        )
+        db_queries_per_request.observe(g.get('db_queries', 0), endpoint=endpoint)
+        db_time_per_request.observe(g.get('db_time', 0.0), endpoint=endpoint)
+    return response
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # O início fica no contexto da execução, descartado junto com ele mesmo se a consulta falhar
+    if context is not None:
+        context._metrics_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, '_metrics_query_start', None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'OTHER'
+    db_query_duration.observe(elapsed, operation=operation)
+
+    if has_request_context() and 'db_queries' in g:
+        g.db_queries += 1
+        g.db_time += elapsed
+
+
+def _do_connect(dialect, conn_rec, cargs, cparams):
+    conn_rec.info['metrics_connect_start'] = time.perf_counter()
+
+
+def _pool_connect(dbapi_connection, connection_record):
+    start = connection_record.info.pop('metrics_connect_start', None)
+    if start is not None:
+        db_pool_connect_duration.observe(time.perf_counter() - start)
+
+
+def _pool_checkout(dbapi_connection, connection_record, connection_proxy):
+    db_pool_checkouts.inc()
+    connection_record.info['metrics_checkout_start'] = time.perf_counter()
+
+
+def _pool_checkin(dbapi_connection, connection_record):
+    start = connection_record.info.pop('metrics_checkout_start', None)
+    if start is not None:
+        db_pool_hold_duration.observe(time.perf_counter() - start)
+
+
+def init_metrics(app, db):
+    """
+    Liga a instrumentação de requisições e do banco ao app.
+    Com vários workers (gunicorn), defina METRICS_MULTIPROC_DIR: sem ele cada
+    worker expõe só os próprios números e as coletas do Prometheus oscilam.
+    """
+    global _multiproc_dir, _flush_interval
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    multiproc_dir = app.config.get('METRICS_MULTIPROC_DIR')
+    if multiproc_dir:
+        os.makedirs(multiproc_dir, exist_ok=True)
+        _multiproc_dir = multiproc_dir
+        _flush_interval = float(app.config.get('METRICS_FLUSH_SECONDS', 5))
+        atexit.register(write_snapshot)
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+
+    with app.app_context():
+        engine = db.engine
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+        # Eventos do pool registrados no engine continuam valendo após engine.dispose()
+        event.listen(engine, 'do_connect', _do_connect)
+        event.listen(engine, 'connect', _pool_connect)
+        event.listen(engine, 'checkout', _pool_checkout)
+        event.listen(engine, 'checkin', _pool_checkin)
@@ -1,14 +1,67 @@
 # services/multiagent_service.py - Serviço Multiagentes
 import json
 import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from flask import current_app
+from jsonschema import validate, ValidationError
 from services.groq_service import GroqService
 from services.gemini_service import GeminiService
-from models import Card, SocraticSessionAnswers, BloomObjective, GdcNote
+from services.llm_service import LLMServiceError
+from services.llm_router import LLMRouter
+from services.prompt_builder import PromptBuilder, get_prompt_budget
+from services.json_stream import JSONStreamParser, loads_tolerant
+from services.session_loader import load_session, canvas_notes
+
+# Pool de threads compartilhado pelo processo para consultar os agentes em paralelo
+_agent_executor = None
+_agent_executor_lock = threading.Lock()
+
+
+# Tokens reservados para as instruções do agente e a mensagem do usuário
+AGENT_PROMPT_OVERHEAD_TOKENS = 400
+
+# Esquema da resposta da síntese em chamada única (síntese + sugestões)
+SYNTHESIS_SCHEMA = {
+    'type': 'object',
+    'required': ['synthesis', 'suggestions'],
+    'properties': {
+        'synthesis': {'type': 'string', 'minLength': 1},
+        'suggestions': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'required': ['section', 'action', 'content'],
+                'properties': {
+                    'section': {'type': 'string'},
+                    'action': {'type': 'string', 'enum': ['add', 'modify', 'remove']},
+                    'content': {'type': 'string'},
+                    'justification': {'type': 'string'}
+                }
+            }
+        }
+    }
+}
+
+
+def _get_agent_executor():
+    """Retorna o pool de threads dos agentes, criando-o na primeira chamada"""
+    global _agent_executor
+    if _agent_executor is None:
+        with _agent_executor_lock:
+            if _agent_executor is None:
+                max_workers = int(current_app.config.get('MULTIAGENT_MAX_WORKERS', 8))
+                _agent_executor = ThreadPoolExecutor(max_workers=max_workers,
+                                                     thread_name_prefix='multiagent')
+    return _agent_executor
+
 
 class MultiAgentService:
     def __init__(self):
         self.groq_service = GroqService()
         self.gemini_service = GeminiService()
+        self.router = LLMRouter({'groq': self.groq_service, 'gemini': self.gemini_service})
         
         # Definição dos agentes especializados
         self.agents = {
@@ -53,18 +106,21 @@ class MultiAgentService:
     def get_session_context(self, session_id):
         """Coleta o contexto completo da sessão"""
         context = {
+            'session_id': session_id,
             'ideas': [],
             'socratic_answers': None,
             'objectives': [],
             'current_canvas': {}
         }
         
-        # Buscar ideias do brainstorming
-        cards = Card.query.filter_by(session_id=session_id).all()
-        context['ideas'] = [card.text for card in cards]
+        # Sessão inteira (cards, respostas, objetivos e canvas) em número fixo de consultas
+        session = load_session(session_id)
+        if not session:
+            return context
+        
+        context['ideas'] = [card.text for card in session.cards]
         
-        # Buscar respostas socráticas
-        socratic = SocraticSessionAnswers.query.filter_by(session_id=session_id).first()
+        socratic = session.socratic_answers
         if socratic:
             context['socratic_answers'] = {
                 'problem': socratic.problem,
@@ -73,20 +129,15 @@ class MultiAgentService:
                 'motivation': socratic.motivation
             }
         
-        # Buscar objetivos de Bloom
-        objectives = BloomObjective.query.filter_by(session_id=session_id).all()
-        context['objectives'] = [{'text': obj.text, 'level': obj.level} for obj in objectives]
-        
-        # Buscar notas do canvas atual
-        notes = GdcNote.query.filter_by(session_id=session_id).all()
-        for note in notes:
-            section_name = note.section.name
-            if section_name not in context['current_canvas']:
-                context['current_canvas'][section_name] = []
-            context['current_canvas'][section_name].append(note.text)
+        context['objectives'] = [{'text': obj.text, 'level': obj.level} for obj in session.objectives]
+        context['current_canvas'] = canvas_notes(session)
         
         return context
     
+    def build_project_context(self, session_id):
+        """Contexto da sessão em texto (o mesmo enviado aos agentes)"""
+        return self._build_base_context(self.get_session_context(session_id))
+    
     def start_multiagent_discussion(self, session_id, user_message, focus_section=None):
         """Inicia uma discussão multiagentes sobre o design do jogo"""
         context = self.get_session_context(session_id)
@@ -98,55 +149,187 @@ class MultiAgentService:
         relevant_agents = self._select_relevant_agents(user_message, focus_section)
         
         # Coordenar discussão entre agentes
-        discussion_results = []
+        discussion_results = self._run_agents(relevant_agents, base_context, user_message, context)
         
-        for agent_id in relevant_agents:
-            agent = self.agents[agent_id]
-            agent_response = self._get_agent_response(
-                agent_id, agent, base_context, user_message, context
-            )
-            discussion_results.append({
-                'agent': agent,
-                'response': agent_response
-            })
+        # Coordenador sintetiza as propostas e extrai as sugestões numa única chamada;
+        # se a resposta não passar no esquema, volta ao fluxo em duas etapas
+        structured = None
+        if current_app.config.get('MULTIAGENT_SINGLE_CALL_SYNTHESIS', True):
+            structured = self._synthesize_with_suggestions(discussion_results, user_message, session_id)
         
-        # Coordenador sintetiza as propostas
-        synthesis = self._synthesize_proposals(discussion_results, context, user_message)
+        if structured:
+            synthesis = structured['synthesis']
+            suggestions = {'suggestions': structured['suggestions']}
+        else:
+            synthesis = self._synthesize_proposals(discussion_results, context, user_message)
+            suggestions = self._extract_actionable_suggestions(synthesis, session_id)
         
         return {
             'context': context,
             'agents_responses': discussion_results,
             'synthesis': synthesis,
-            'suggestions': self._extract_actionable_suggestions(synthesis)
+            'suggestions': suggestions
         }
     
+    def stream_multiagent_discussion(self, session_id, user_message, focus_section=None):
+        """
+        Versão em streaming da discussão multiagentes.
+        Produz tuplas (evento, dados): 'agent' para cada agente assim que ele termina
+        (em ordem de conclusão, com duration_ms/elapsed_ms), 'agents' com todas as
+        respostas na ordem da seleção, 'token' para cada trecho da síntese,
+        'suggestion' para cada sugestão extraída e 'suggestions' ao final.
+        """
+        context = self.get_session_context(session_id)
+        base_context = self._build_base_context(context)
+        relevant_agents = self._select_relevant_agents(user_message, focus_section)
+        
+        results = {}
+        for agent_id, result in self._iter_agent_responses(relevant_agents, base_context, user_message, context):
+            results[agent_id] = result
+            yield 'agent', dict(result, agent_id=agent_id, completed=len(results), total=len(relevant_agents))
+        
+        discussion_results = [results[agent_id] for agent_id in relevant_agents]
+        yield 'agents', {'agents_responses': discussion_results}
+        
+        # Síntese do coordenador transmitida trecho a trecho
+        synthesis_prompt = self._build_synthesis_prompt(discussion_results, user_message)
+        parts = []
+        try:
+            for chunk in self.router.stream_response(synthesis_prompt, 'multiagent_synthesis', session_id,
+                                                     preferred='groq'):
+                parts.append(chunk)
+                yield 'token', {'content': chunk}
+            synthesis = ''.join(parts)
+        except LLMServiceError as e:
+            print(f"❌ Erro no streaming da síntese: {e}")
+            synthesis = "Erro ao sintetizar propostas dos agentes."
+        
+        for event, data in self._stream_actionable_suggestions(synthesis, session_id):
+            if event == 'suggestion':
+                yield 'suggestion', {'suggestion': data}
+            else:
+                yield 'suggestions', {'synthesis': synthesis, 'suggestions': data}
+    
+    def _run_agents(self, relevant_agents, base_context, user_message, context):
+        """Obtém a resposta de cada agente selecionado (em paralelo, na ordem da seleção)"""
+        results = dict(self._iter_agent_responses(relevant_agents, base_context, user_message, context))
+        return [results[agent_id] for agent_id in relevant_agents]
+    
+    def _iter_agent_responses(self, relevant_agents, base_context, user_message, context):
+        """
+        Consulta os agentes em paralelo sob um prazo global (MULTIAGENT_DEADLINE_SECONDS).
+        Produz (agent_id, resultado) na ordem de conclusão; agentes que falham ou
+        estouram o prazo voltam como resultados parciais com status 'error'/'timeout'.
+        As chamadas aos provedores também respeitam o prazo, liberando a thread do pool.
+        """
+        app = current_app._get_current_object()
+        started = time.monotonic()
+        deadline = started + float(app.config.get('MULTIAGENT_DEADLINE_SECONDS', 45))
+        executor = _get_agent_executor()
+        
+        futures = {}
+        for agent_id in relevant_agents:
+            future = executor.submit(
+                self._get_agent_response_in_context, app,
+                agent_id, self.agents[agent_id], base_context, user_message, context, deadline
+            )
+            futures[future] = agent_id
+        
+        pending = set(futures)
+        try:
+            for future in as_completed(futures, timeout=max(0, deadline - time.monotonic())):
+                pending.discard(future)
+                yield futures[future], self._agent_result(futures[future], future, started)
+        except FuturesTimeoutError:
+            for future in pending:
+                agent_id = futures[future]
+                if future.done():
+                    yield agent_id, self._agent_result(agent_id, future, started)
+                else:
+                    # cancel() só evita agentes ainda na fila; os em execução param no prazo da chamada
+                    future.cancel()
+                    print(f"⚠️  Agente {agent_id} excedeu o prazo da discussão")
+                    elapsed_ms = int((time.monotonic() - started) * 1000)
+                    yield agent_id, {
+                        'agent': self.agents[agent_id],
+                        'response': 'Tempo esgotado: o agente não respondeu a tempo.',
+                        'status': 'timeout',
+                        'duration_ms': elapsed_ms,
+                        'elapsed_ms': elapsed_ms
+                    }
+    
+    def _agent_result(self, agent_id, future, started):
+        """
+        Monta o resultado de um agente a partir do future concluído.
+        duration_ms: tempo da chamada do agente; elapsed_ms: desde o início da discussão.
+        """
+        elapsed_ms = int((time.monotonic() - started) * 1000)
+        try:
+            response, duration_ms = future.result()
+            return {
+                'agent': self.agents[agent_id],
+                'response': response,
+                'status': 'ok',
+                'duration_ms': duration_ms,
+                'elapsed_ms': elapsed_ms
+            }
+        except Exception as e:
+            print(f"❌ Erro no agente {agent_id}: {e}")
+            return {
+                'agent': self.agents[agent_id],
+                'response': f"Erro ao obter resposta: {str(e)}",
+                'status': 'error',
+                'duration_ms': elapsed_ms,
+                'elapsed_ms': elapsed_ms
+            }
+    
+    def _get_agent_response_in_context(self, app, *args):
+        """
+        Executa _get_agent_response numa thread do pool, com contexto da aplicação.
+        Retorna (resposta, duração em ms).
+        """
+        start = time.monotonic()
+        with app.app_context():
+            response = self._get_agent_response(*args)
+        return response, int((time.monotonic() - start) * 1000)
+    
     def _build_base_context(self, context):
-        """Constrói o contexto base para os agentes"""
-        context_parts = ["=== CONTEXTO DO PROJETO DE JOGO EDUCATIVO ==="]
+        """Constrói o contexto base para os agentes, dentro do orçamento de tokens dos modelos"""
+        budget = min(
+            get_prompt_budget(self.groq_service.model),
+            get_prompt_budget(self.gemini_service.model)
+        ) - AGENT_PROMPT_OVERHEAD_TOKENS
         
-        if context['ideas']:
-            context_parts.append(f"\nIDEIAS DO BRAINSTORMING:")
-            for idea in context['ideas'][:5]:  # Limitar a 5 ideias
-                context_parts.append(f"- {idea}")
+        builder = PromptBuilder(budget)
+        builder.add_text("=== CONTEXTO DO PROJETO DE JOGO EDUCATIVO ===")
+        
+        builder.add_section(
+            "\nIDEIAS DO BRAINSTORMING:",
+            context['ideas'],
+            priority=2, max_item_tokens=80
+        )
         
         if context['socratic_answers']:
             sa = context['socratic_answers']
-            context_parts.append(f"\nREFLEXÃO SOCRÁTICA:")
-            context_parts.append(f"Problema: {sa['problem']}")
-            context_parts.append(f"Motivação: {sa['motivation']}")
-        
-        if context['objectives']:
-            context_parts.append(f"\nOBJETIVOS EDUCACIONAIS:")
-            for obj in context['objectives'][:3]:  # Limitar a 3 objetivos
-                context_parts.append(f"- {obj['text']} ({obj['level']})")
-        
-        if context['current_canvas']:
-            context_parts.append(f"\nCANVAS ATUAL:")
-            for section, notes in context['current_canvas'].items():
-                if notes:
-                    context_parts.append(f"{section}: {', '.join(notes[:2])}")
-        
-        return '\n'.join(context_parts)
+            builder.add_section(
+                "\nREFLEXÃO SOCRÁTICA:",
+                [f"Problema: {sa['problem']}", f"Motivação: {sa['motivation']}"],
+                priority=4, max_item_tokens=300, bullet=''
+            )
+        
+        builder.add_section(
+            "\nOBJETIVOS EDUCACIONAIS:",
+            [f"{obj['text']} ({obj['level']})" for obj in context['objectives']],
+            priority=3, max_item_tokens=80
+        )
+        
+        builder.add_section(
+            "\nCANVAS ATUAL:",
+            [f"{section}: {', '.join(notes)}" for section, notes in context['current_canvas'].items() if notes],
+            priority=1, max_item_tokens=120, bullet=''
+        )
+        
+        return builder.build()
     
     def _select_relevant_agents(self, user_message, focus_section):
         """Seleciona agentes relevantes baseado na mensagem e seção"""
@@ -197,8 +380,11 @@ class MultiAgentService:
         
         return list(set(selected))  # Remove duplicatas
     
-    def _get_agent_response(self, agent_id, agent, base_context, user_message, context):
-        """Obtém resposta de um agente específico"""
+    def _get_agent_response(self, agent_id, agent, base_context, user_message, context, deadline=None):
+        """
+        Obtém resposta de um agente específico; levanta LLMServiceError se nenhum provedor responder.
+        Com deadline (time.monotonic()), as chamadas aos provedores terminam até o prazo.
+        """
         # Prompts especializados por agente
         agent_prompts = {
             'coordinator': f"""Você é o Agente Coordenador de um sistema multiagentes para design de jogos educativos.
@@ -287,19 +473,69 @@ Forneça sugestões práticas e viáveis tecnicamente."""
         
         prompt = agent_prompts.get(agent_id, agent_prompts['coordinator'])
         
-        # Usar o serviço apropriado para cada agente
-        if agent['service'] == 'groq':
-            result = self.groq_service.generate_response(prompt, 'multiagent')
-        else:  # gemini
-            result = self.gemini_service.generate_response(prompt, 'multiagent')
+        router = self.router
+        if deadline is not None:
+            router = LLMRouter({provider: service.with_deadline(deadline)
+                                for provider, service in self.router.services.items()})
+        
+        # Usar o serviço preferido de cada agente, com failover para o outro provedor
+        result = router.generate_response(prompt, 'multiagent', context.get('session_id'),
+                                          preferred=agent['service'])
+        
+        if not result['success']:
+            raise LLMServiceError(result['error'])
+        return result['content']
+    
+    def _synthesize_proposals(self, discussion_results, context, user_message):
+        """Coordenador sintetiza as propostas dos agentes"""
+        synthesis_prompt = self._build_synthesis_prompt(discussion_results, user_message)
+        result = self.router.generate_response(synthesis_prompt, 'multiagent_synthesis', context.get('session_id'),
+                                               preferred='groq')
         
         if result['success']:
             return result['content']
         else:
-            return f"Erro ao obter resposta: {result['error']}"
+            return "Erro ao sintetizar propostas dos agentes."
     
-    def _synthesize_proposals(self, discussion_results, context, user_message):
-        """Coordenador sintetiza as propostas dos agentes"""
+    def _synthesize_with_suggestions(self, discussion_results, user_message, session_id=None):
+        """
+        Síntese + sugestões acionáveis numa única chamada com resposta JSON.
+        Retorna {'synthesis': ..., 'suggestions': [...]} validado por SYNTHESIS_SCHEMA, ou None.
+        """
+        prompt = self._build_synthesis_prompt(discussion_results, user_message) + """
+
+Responda APENAS neste formato JSON, sem texto adicional:
+{
+  "synthesis": "Síntese completa das propostas, em texto corrido",
+  "suggestions": [
+    {
+      "section": "Nome da Seção do Canvas",
+      "action": "add|modify|remove",
+      "content": "Conteúdo específico da sugestão",
+      "justification": "Justificativa para a sugestão"
+    }
+  ]
+}"""
+        
+        result = self.router.generate_response(prompt, 'multiagent_synthesis', session_id, max_tokens=2000,
+                                               preferred='groq')
+        
+        if not result['success']:
+            return None
+        
+        try:
+            data = loads_tolerant(result['content'])
+            validate(instance=data, schema=SYNTHESIS_SCHEMA)
+            return data
+        except json.JSONDecodeError as e:
+            print(f"⚠️  Síntese estruturada inválida, usando fluxo em duas etapas: {e}")
+            return None
+        except ValidationError as e:
+            print(f"⚠️  Síntese estruturada fora do esquema, usando fluxo em duas etapas: {e.message}")
+            return None
+    
+    def _build_synthesis_prompt(self, discussion_results, user_message):
+        """Monta o prompt de síntese a partir das respostas dos agentes"""
         agents_responses = []
         for result in discussion_results:
             agent_name = result['agent']['name']
@@ -318,16 +554,11 @@ Organize por seções do canvas quando relevante.
 Evite contradições entre as propostas.
 Forneça justificativas baseadas nas diferentes perspectivas dos agentes."""
         
-        result = self.groq_service.generate_response(synthesis_prompt, 'multiagent_synthesis')
-        
-        if result['success']:
-            return result['content']
-        else:
-            return "Erro ao sintetizar propostas dos agentes."
+        return synthesis_prompt
     
-    def _extract_actionable_suggestions(self, synthesis):
-        """Extrai sugestões acionáveis da síntese"""
-        extraction_prompt = f"""A partir da seguinte síntese de agentes especialistas, extraia sugestões específicas e acionáveis para o Game Design Canvas:
+    def _build_extraction_prompt(self, synthesis):
+        """Prompt para extrair sugestões acionáveis da síntese"""
+        return f"""A partir da seguinte síntese de agentes especialistas, extraia sugestões específicas e acionáveis para o Game Design Canvas:
 
 {synthesis}
 
@@ -344,44 +575,65 @@ Formate as sugestões como uma lista JSON com a seguinte estrutura:
 }}
 
 Foque em sugestões práticas que podem ser implementadas diretamente no canvas."""
+    
+    def _fallback_suggestions(self, synthesis):
+        """Estrutura básica quando a resposta não traz sugestões em JSON"""
+        return {
+            "suggestions": [
+                {
+                    "section": "Geral",
+                    "action": "add",
+                    "content": synthesis[:200] + "...",
+                    "justification": "Sugestão baseada na discussão dos agentes especialistas"
+                }
+            ]
+        }
+    
+    def _extract_actionable_suggestions(self, synthesis, session_id=None):
+        """Extrai sugestões acionáveis da síntese"""
+        result = self.router.generate_response(self._build_extraction_prompt(synthesis), 'suggestion_extraction',
+                                               session_id, preferred='groq')
         
-        result = self.groq_service.generate_response(extraction_prompt, 'suggestion_extraction')
+        if not result['success']:
+            return {"suggestions": []}
         
-        if result['success']:
-            try:
-                # Tentar extrair JSON da resposta
-                response_text = result['content'].strip()
-                
-                # Procurar por JSON na resposta
-                start_idx = response_text.find('{')
-                end_idx = response_text.rfind('}') + 1
-                
-                if start_idx != -1 and end_idx > start_idx:
-                    json_text = response_text[start_idx:end_idx]
-                    return json.loads(json_text)
-                else:
-                    # Se não encontrar JSON válido, criar estrutura básica
-                    return {
-                        "suggestions": [
-                            {
-                                "section": "Geral",
-                                "action": "add",
-                                "content": synthesis[:200] + "...",
-                                "justification": "Sugestão baseada na discussão dos agentes especialistas"
-                            }
-                        ]
-                    }
-            except:
-                # Em caso de erro, retornar estrutura básica
-                return {
-                    "suggestions": [
-                        {
-                            "section": "Geral",
-                            "action": "add", 
-                            "content": synthesis[:200] + "...",
-                            "justification": "Sugestão baseada na discussão dos agentes especialistas"
-                        }
-                    ]
-                }
-        else:
-            return {"suggestions": []}
\ No newline at end of file
+        try:
+            # JSON da resposta, com reparo de defeitos comuns (texto em volta, vírgulas, truncamento)
+            data = loads_tolerant(result['content'])
+            if isinstance(data, dict) and isinstance(data.get('suggestions'), list):
+                return data
+        except json.JSONDecodeError:
+            pass
+        return self._fallback_suggestions(synthesis)
+    
+    def _stream_actionable_suggestions(self, synthesis, session_id=None):
+        """
+        Extração de sugestões em streaming: produz ('suggestion', item) para cada
+        sugestão assim que seu JSON fecha e ('suggestions', resultado) ao final.
+        Se o streaming falhar, usa a extração sem streaming (com failover).
+        """
+        parser = JSONStreamParser(['suggestions'])
+        items = []
+        try:
+            for chunk in self.router.stream_response(self._build_extraction_prompt(synthesis),
+                                                     'suggestion_extraction', session_id, preferred='groq'):
+                for _, item in parser.feed(chunk):
+                    items.append(item)
+                    yield 'suggestion', item
+        except LLMServiceError as e:
+            print(f"⚠️  Streaming da extração de sugestões falhou, usando chamada única: {e}")
+            yield 'suggestions', self._extract_actionable_suggestions(synthesis, session_id)
+            return
+        
+        if items:
+            yield 'suggestions', {'suggestions': items}
+            return
+        
+        try:
+            data = parser.document()
+            if isinstance(data, dict) and isinstance(data.get('suggestions'), list):
+                yield 'suggestions', data
+                return
+        except json.JSONDecodeError:
+            pass
+        yield 'suggestions', self._fallback_suggestions(synthesis)
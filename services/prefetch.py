@@ -0,0 +1,123 @@
+# services/prefetch.py - Pré-geração especulativa da saída de IA da próxima etapa
+import hashlib
+import json
+import time
+from flask import current_app
+from models import Card, SocraticSessionAnswers
+from services.groq_service import GroqService
+from services.job_queue import enqueue_job, register_job, JobError, QUEUED, RUNNING
+
+# Etapas com pré-geração (brainstorm -> socrático -> bloom)
+SOCRATIC_SUGGESTIONS = 'socratic_suggestions'
+BLOOM_OBJECTIVES = 'bloom_objectives'
+
+
+def _stage_inputs(stage, session_id):
+    """Entradas do prompt da etapa (None quando ainda não há o que gerar)"""
+    if stage == SOCRATIC_SUGGESTIONS:
+        cards = Card.query.filter_by(session_id=session_id).order_by(Card.id).all()
+        return cards or None
+    if stage == BLOOM_OBJECTIVES:
+        return SocraticSessionAnswers.query.filter_by(session_id=session_id).first()
+    raise ValueError(f'Etapa de pré-geração desconhecida: {stage}')
+
+
+def content_version(stage, session_id):
+    """Hash do conteúdo usado no prompt da etapa; muda quando as entradas mudam"""
+    return _version_of(stage, _stage_inputs(stage, session_id))
+
+
+def _version_of(stage, inputs):
+    if inputs is None:
+        return None
+
+    if stage == SOCRATIC_SUGGESTIONS:
+        content = [card.text for card in inputs]
+    else:
+        content = [inputs.problem, inputs.motivation, inputs.impact]
+    raw = json.dumps({'stage': stage, 'content': content}, ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _job_id(stage, session_id, version):
+    return f'prefetch-{stage}-{session_id}-{version[:32]}'
+
+
+def start_prefetch(stage, session_id):
+    """
+    Enfileira a geração da próxima etapa em segundo plano (PREFETCH_ENABLED).
+    Falhas aqui nunca interrompem a rota que chamou.
+    """
+    if not current_app.config.get('PREFETCH_ENABLED', True):
+        return None
+
+    try:
+        version = content_version(stage, session_id)
+        if version is None:
+            return None
+        return enqueue_job(f'prefetch.{stage}', {'session_id': session_id, 'version': version},
+                           job_id=_job_id(stage, session_id, version))
+    except Exception as e:
+        print(f"⚠️  Erro ao iniciar pré-geração ({stage}): {e}")
+        return None
+
+
+def take_prefetched(stage, session_id):
+    """
+    Resultado pré-gerado para o conteúdo atual da sessão (consumido uma única vez), ou None.
+    Se a pré-geração ainda estiver em andamento, espera até PREFETCH_WAIT_SECONDS.
+    Resultados de uma versão anterior do conteúdo nunca casam (o id inclui a versão).
+    """
+    if not current_app.config.get('PREFETCH_ENABLED', True):
+        return None
+
+    try:
+        version = content_version(stage, session_id)
+        if version is None:
+            return None
+
+        queue = current_app.extensions['job_queue']
+        job_id = _job_id(stage, session_id, version)
+        deadline = time.monotonic() + float(current_app.config.get('PREFETCH_WAIT_SECONDS', 10))
+        poll_interval = float(current_app.config.get('JOB_POLL_INTERVAL', 0.5))
+
+        while True:
+            result = queue.take_result(job_id)
+            if result is not None:
+                return result
+            job = queue.get(job_id)
+            if job is None or job['status'] not in (QUEUED, RUNNING) or time.monotonic() >= deadline:
+                return None
+            time.sleep(poll_interval)
+
+    except Exception as e:
+        print(f"⚠️  Erro ao buscar pré-geração ({stage}): {e}")
+        return None
+
+
+def _check_version(stage, payload):
+    """Interrompe o job se as entradas mudaram desde o enfileiramento"""
+    inputs = _stage_inputs(stage, payload['session_id'])
+    if _version_of(stage, inputs) != payload['version']:
+        raise JobError('Conteúdo da sessão mudou; pré-geração descartada')
+    return inputs
+
+
+@register_job(f'prefetch.{SOCRATIC_SUGGESTIONS}')
+def prefetch_socratic_suggestions(payload, job):
+    """Job: sugestões socráticas a partir dos cards do brainstorming"""
+    cards = _check_version(SOCRATIC_SUGGESTIONS, payload)
+    result = GroqService().generate_socratic_suggestions(cards, payload['session_id'])
+    if not result['success']:
+        raise JobError(result['error'])
+    return {'version': payload['version'], 'content': result['content']}
+
+
+@register_job(f'prefetch.{BLOOM_OBJECTIVES}')
+def prefetch_bloom_objectives(payload, job):
+    """Job: objetivos de Bloom a partir das respostas socráticas (gravados só quando usados)"""
+    answers = _check_version(BLOOM_OBJECTIVES, payload)
+    result = GroqService().generate_bloom_objectives(answers, payload['session_id'])
+    if not result['success']:
+        raise JobError(result['error'])
+    return {'version': payload['version'], 'content': result['content']}
@@ -0,0 +1,102 @@
+# services/prompt_builder.py - Montagem de prompts com orçamento de tokens
+import re
+from flask import current_app
+
+# Palavras e sinais de pontuação; palavras longas contam como vários tokens
+_TOKEN_PATTERN = re.compile(r'\w+|[^\w\s]')
+
+
+def estimate_tokens(text):
+    """Estimativa local e rápida do número de tokens (sem tokenizador do provedor)"""
+    if not text:
+        return 0
+    return sum(1 + (len(piece) - 1) // 6 for piece in _TOKEN_PATTERN.findall(text))
+
+
+def trim_to_tokens(text, max_tokens):
+    """Corta o texto para caber em max_tokens, na fronteira de palavra"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    words = text.split()
+    kept = []
+    used = 0
+    for word in words:
+        cost = estimate_tokens(word)
+        if used + cost > max_tokens - 1:  # reservar espaço para as reticências
+            break
+        kept.append(word)
+        used += cost
+    return ' '.join(kept) + '…'
+
+
+def get_prompt_budget(model):
+    """Orçamento de tokens de prompt do modelo (LLM_PROMPT_TOKEN_BUDGETS ou o padrão)"""
+    budgets = current_app.config.get('LLM_PROMPT_TOKEN_BUDGETS', {})
+    return int(budgets.get(model, current_app.config.get('LLM_PROMPT_TOKEN_BUDGET', 3000)))
+
+
+class PromptBuilder:
+    """
+    Monta um prompt dentro de um orçamento de tokens.
+    Textos fixos (add_text) entram sempre; seções de itens (add_section) são
+    preenchidas por prioridade até o orçamento acabar, com itens longos cortados.
+    A ordem original das partes é preservada no texto final.
+    """
+
+    def __init__(self, budget_tokens):
+        self.budget_tokens = budget_tokens
+        self.token_count = 0
+        self.dropped_items = 0
+        self._parts = []
+
+    def add_text(self, text):
+        """Texto fixo (instruções, cabeçalhos); sempre incluído"""
+        self._parts.append({'kind': 'text', 'text': text})
+        return self
+
+    def add_section(self, header, items, priority=0, max_item_tokens=200, bullet='- '):
+        """Lista de itens opcional; seções de maior prioridade são preenchidas primeiro (header=None omite o título)"""
+        self._parts.append({
+            'kind': 'section',
+            'header': header,
+            'items': [item for item in items if item],
+            'priority': priority,
+            'max_item_tokens': max_item_tokens,
+            'bullet': bullet,
+            'selected': []
+        })
+        return self
+
+    def build(self):
+        """Retorna o prompt final; token_count e dropped_items ficam disponíveis no builder"""
+        used = sum(estimate_tokens(part['text']) for part in self._parts if part['kind'] == 'text')
+
+        sections = [part for part in self._parts if part['kind'] == 'section']
+        self.dropped_items = 0
+        for section in sorted(sections, key=lambda part: -part['priority']):
+            section['selected'] = []
+            header_cost = estimate_tokens(section['header'] or '')
+
+            for item in section['items']:
+                line = section['bullet'] + trim_to_tokens(item, section['max_item_tokens'])
+                cost = estimate_tokens(line) + (0 if section['selected'] else header_cost)
+                if used + cost > self.budget_tokens:
+                    continue  # item não cabe; itens menores ainda podem caber
+                section['selected'].append(line)
+                used += cost
+
+            self.dropped_items += len(section['items']) - len(section['selected'])
+
+        lines = []
+        for part in self._parts:
+            if part['kind'] == 'text':
+                lines.append(part['text'])
+            elif part['selected']:
+                if part['header'] is not None:
+                    lines.append(part['header'])
+                lines.extend(part['selected'])
+
+        prompt = '\n'.join(lines)
+        self.token_count = estimate_tokens(prompt)
+        return prompt
@@ -0,0 +1,130 @@
+# services/query_audit.py - Detector de N+1: consultas por requisição, repetições e orçamento
+import os
+import threading
+import traceback
+from collections import Counter
+from flask import g, request
+from sqlalchemy import event
+
+# Frames ignorados ao procurar o ponto do código que disparou a consulta (bibliotecas e este módulo)
+_IGNORED_PATHS = (os.sep + 'site-packages' + os.sep, os.sep + 'dist-packages' + os.sep,
+                  os.path.dirname(os.__file__) + os.sep, os.path.abspath(__file__))
+
+_local = threading.local()
+_project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Mais consultas que o orçamento do bloco (falha testes e scripts de verificação)"""
+
+
+class QueryAudit:
+    """Consultas executadas num bloco (uma requisição ou um query_budget)"""
+
+    def __init__(self, label):
+        self.label = label
+        self.count = 0
+        self.statements = {}  # SQL -> [execuções, Counter de pontos de chamada]
+
+    def record(self, statement):
+        self.count += 1
+        entry = self.statements.setdefault(statement, [0, Counter()])
+        entry[0] += 1
+        entry[1][_call_site()] += 1
+
+    def repeated(self, threshold):
+        """[(SQL, execuções, pontos de chamada)] executados threshold vezes ou mais"""
+        found = [(sql, count, sites) for sql, (count, sites) in self.statements.items() if count >= threshold]
+        return sorted(found, key=lambda item: -item[1])
+
+    def report(self, threshold):
+        lines = [f"{self.label}: {self.count} consultas"]
+        for sql, count, sites in self.repeated(threshold):
+            lines.append(f"  {count}x {' '.join(sql.split())[:200]}")
+            lines.extend(f"      {times}x em {site}" for site, times in sites.most_common(3))
+        return '\n'.join(lines)
+
+
+def _call_site():
+    """Frame mais interno fora das bibliotecas (rota, serviço, template ou script)"""
+    for frame in reversed(traceback.extract_stack()):
+        filename = os.path.abspath(frame.filename)
+        if not any(filename.startswith(path) or path in filename for path in _IGNORED_PATHS):
+            if filename.startswith(_project_root + os.sep):
+                filename = os.path.relpath(filename, _project_root)
+            return f"{filename}:{frame.lineno} ({frame.name})"
+    return 'desconhecido'
+
+
+def _active():
+    if not hasattr(_local, 'audits'):
+        _local.audits = []
+    return _local.audits
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    audits = getattr(_local, 'audits', None)
+    if audits:
+        for audit in audits:
+            audit.record(statement)
+
+
+class query_budget:
+    """
+    Limita as consultas de um bloco (ex.: `with query_budget(5, 'contexto da sessão'):`).
+    Ao sair, levanta QueryBudgetExceeded com o relatório das consultas repetidas.
+    """
+
+    def __init__(self, max_queries, label='bloco', repeat_threshold=2):
+        self.max_queries = max_queries
+        self.repeat_threshold = repeat_threshold
+        self.audit = QueryAudit(label)
+
+    def __enter__(self):
+        _active().append(self.audit)
+        return self.audit
+
+    def __exit__(self, exc_type, exc, tb):
+        _active().remove(self.audit)
+        if exc_type is None and self.audit.count > self.max_queries:
+            raise QueryBudgetExceeded(
+                f"Orçamento de {self.max_queries} consultas excedido\n{self.audit.report(self.repeat_threshold)}"
+            )
+        return False
+
+
+def init_query_audit(app, db):
+    """
+    Liga a contagem de consultas (usada por query_budget) e, com QUERY_AUDIT_ENABLED
+    (padrão: modo debug), o relatório por requisição de consultas repetidas (N+1)
+    e acima de QUERY_AUDIT_MAX_QUERIES.
+    """
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+
+    if not app.config.get('QUERY_AUDIT_ENABLED', False):
+        return
+
+    threshold = int(app.config.get('QUERY_AUDIT_REPEAT_THRESHOLD', 3))
+    max_queries = int(app.config.get('QUERY_AUDIT_MAX_QUERIES', 20))
+
+    @app.before_request
+    def _start_query_audit():
+        g.query_audit = QueryAudit(f"{request.method} {request.path}")
+        _active().append(g.query_audit)
+
+    @app.after_request
+    def _report_query_audit(response):
+        audit = g.get('query_audit')
+        if audit is not None:
+            # Em respostas de streaming, conta só o que rodou antes do início do envio
+            if audit.count > max_queries or audit.repeated(threshold):
+                print(f"⚠️  Possível N+1 (orçamento {max_queries}, repetição >= {threshold})\n{audit.report(threshold)}")
+            response.headers['X-Query-Count'] = str(audit.count)
+        return response
+
+    @app.teardown_request
+    def _stop_query_audit(exc):
+        audit = g.pop('query_audit', None)
+        if audit is not None and audit in _active():
+            _active().remove(audit)
@@ -0,0 +1,205 @@
+# services/rate_limiter.py - Limitador de taxa por provedor/modelo (requisições e tokens)
+import random
+import re
+import threading
+import time
+from flask import current_app
+
+# Limites padrão por minuto (ajustados depois pelos cabeçalhos x-ratelimit-* das respostas)
+DEFAULT_RATE_LIMITS = {
+    'groq': {'requests_per_minute': 30, 'tokens_per_minute': 12000},
+    'gemini': {'requests_per_minute': 15, 'tokens_per_minute': 1000000}
+}
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+
+
+def parse_duration(value):
+    """Converte durações como '7.66s', '2m59.56s', '120ms' ou '30' em segundos"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    multipliers = {'h': 3600, 'm': 60, 's': 1, 'ms': 0.001}
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * multipliers[unit] for amount, unit in parts)
+
+
+def backoff_delay(attempt, base=0.5, cap=20.0):
+    """Backoff exponencial com jitter completo"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class TokenBucket:
+    """Balde de tokens com reposição contínua"""
+
+    def __init__(self, capacity, refill_per_second):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self.available = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now):
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.available = min(self.capacity, self.available + elapsed * self.refill_per_second)
+            self.updated_at = now
+
+    def wait_time(self, amount, now):
+        """Segundos até que 'amount' esteja disponível"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        if self.refill_per_second <= 0:
+            return float('inf')
+        return (amount - self.available) / self.refill_per_second
+
+    def consume(self, amount):
+        self.available -= min(amount, self.capacity)
+
+    def resize(self, capacity, refill_per_second):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self.available = min(self.available, self.capacity)
+
+
+class ModelBudget:
+    """Orçamento de requisições e tokens de um par provedor/modelo"""
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.lock = threading.Lock()
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+        self.blocked_until = 0.0
+
+
+class ProviderRateLimiter:
+    """
+    Limitador compartilhado pelo processo.
+    acquire() enfileira o chamador brevemente até haver orçamento;
+    update_from_headers() adapta o orçamento aos cabeçalhos do provedor.
+    """
+
+    def __init__(self):
+        self._budgets = {}
+        self._lock = threading.Lock()
+        self.throttled = 0
+        self.rejected = 0
+
+    def _budget(self, provider, model):
+        key = (provider, model)
+        budget = self._budgets.get(key)
+        if budget is None:
+            with self._lock:
+                budget = self._budgets.get(key)
+                if budget is None:
+                    limits = current_app.config.get('LLM_RATE_LIMITS', DEFAULT_RATE_LIMITS)
+                    provider_limits = limits.get(provider) or DEFAULT_RATE_LIMITS.get(provider) or {}
+                    budget = ModelBudget(
+                        provider_limits.get('requests_per_minute', 60),
+                        provider_limits.get('tokens_per_minute', 100000)
+                    )
+                    self._budgets[key] = budget
+        return budget
+
+    def acquire(self, provider, model, estimated_tokens, max_wait=None):
+        """
+        Reserva uma requisição e estimated_tokens do orçamento.
+        Espera até max_wait segundos; retorna False se não houver orçamento a tempo.
+        """
+        if not current_app.config.get('LLM_RATE_LIMIT_ENABLED', True):
+            return True
+        if max_wait is None:
+            max_wait = float(current_app.config.get('LLM_RATE_LIMIT_MAX_WAIT', 10))
+
+        budget = self._budget(provider, model)
+        deadline = time.monotonic() + max_wait
+        waited = False
+
+        while True:
+            now = time.monotonic()
+            with budget.lock:
+                wait = max(
+                    budget.requests.wait_time(1, now),
+                    budget.tokens.wait_time(estimated_tokens, now),
+                    budget.blocked_until - now
+                )
+                if wait <= 0:
+                    budget.requests.consume(1)
+                    budget.tokens.consume(estimated_tokens)
+                    if waited:
+                        with self._lock:
+                            self.throttled += 1
+                    return True
+
+            if now + wait > deadline:
+                with self._lock:
+                    self.rejected += 1
+                return False
+
+            waited = True
+            time.sleep(wait + random.uniform(0, 0.05))
+
+    def update_from_headers(self, provider, model, headers):
+        """Adapta o orçamento a partir de x-ratelimit-* e retry-after"""
+        if not headers:
+            return
+
+        budget = self._budget(provider, model)
+        now = time.monotonic()
+
+        with budget.lock:
+            token_limit = headers.get('x-ratelimit-limit-tokens')
+            if token_limit:
+                try:
+                    limit = float(token_limit)
+                    budget.tokens.resize(limit, limit / 60.0)
+                except ValueError:
+                    pass
+
+            remaining_tokens = headers.get('x-ratelimit-remaining-tokens')
+            if remaining_tokens:
+                try:
+                    budget.tokens._refill(now)
+                    budget.tokens.available = min(budget.tokens.available, float(remaining_tokens))
+                except ValueError:
+                    pass
+
+            # Cota de requisições esgotada: bloquear até o reset informado
+            if headers.get('x-ratelimit-remaining-requests') == '0':
+                reset = parse_duration(headers.get('x-ratelimit-reset-requests'))
+                if reset:
+                    budget.blocked_until = max(budget.blocked_until, now + reset)
+
+            retry_after = parse_duration(headers.get('retry-after'))
+            if retry_after:
+                budget.blocked_until = max(budget.blocked_until, now + retry_after)
+
+    def stats(self):
+        """Contadores e orçamento atual por provedor/modelo"""
+        now = time.monotonic()
+        with self._lock:
+            budgets = dict(self._budgets)
+            stats = {'throttled': self.throttled, 'rejected': self.rejected, 'budgets': {}}
+
+        for (provider, model), budget in budgets.items():
+            with budget.lock:
+                budget.requests._refill(now)
+                budget.tokens._refill(now)
+                stats['budgets'][f'{provider}/{model}'] = {
+                    'requests_available': round(budget.requests.available, 2),
+                    'tokens_available': round(budget.tokens.available, 2),
+                    'blocked_for_seconds': round(max(0.0, budget.blocked_until - now), 2)
+                }
+        return stats
+
+
+# Instância compartilhada pelo processo
+rate_limiter = ProviderRateLimiter()
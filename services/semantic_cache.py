@@ -0,0 +1,204 @@
+# services/semantic_cache.py - Cache semântico de prompts quase idênticos (similaridade vetorial local)
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from flask import current_app
+from services.metrics import record_semantic_lookup
+
+try:
+    import numpy as np
+except ImportError:  # dependência opcional: sem NumPy o cache semântico fica desligado
+    np = None
+
+# Tamanhos dos n-gramas de caracteres usados na vetorização
+NGRAM_RANGE = (3, 5)
+
+# Vetores calculados no get() e reaproveitados no set() da mesma chamada
+PENDING_VECTORS_LIMIT = 256
+
+
+def semantic_cache_available():
+    """True quando o NumPy está instalado"""
+    return np is not None
+
+
+def hashed_ngram_vector(text, dimensions):
+    """
+    Vetor de frequências (log 1+tf) de n-gramas de caracteres e de palavras,
+    projetados em `dimensions` posições por hash (CRC32).
+    """
+    text = ' '.join(text.lower().split())
+    indexes = [zlib.crc32(b'w:' + word.encode('utf-8')) % dimensions for word in text.split()]
+    encoded = text.encode('utf-8')
+    for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+        indexes.extend(zlib.crc32(encoded[i:i + n]) % dimensions for i in range(len(encoded) - n + 1))
+
+    counts = np.bincount(np.asarray(indexes, dtype=np.int64), minlength=dimensions)
+    return np.log1p(counts).astype(np.float32)
+
+
+class _ModuleIndex:
+    """
+    Índice vetorial de um module_type: buffer circular de vetores tf e
+    frequência de documentos por posição (para o IDF).
+    """
+
+    def __init__(self, dimensions, capacity):
+        self.vectors = np.zeros((capacity, dimensions), dtype=np.float32)
+        self.document_frequency = np.zeros(dimensions, dtype=np.float32)
+        self.expires_at = np.zeros(capacity, dtype=np.float64)
+        self.scopes = np.zeros(capacity, dtype=np.int64)
+        self.values = [None] * capacity
+        self.size = 0
+        self.next_slot = 0
+
+    def add(self, vector, scope, value, expires_at):
+        slot = self.next_slot
+        if self.values[slot] is not None:
+            self.document_frequency -= self.vectors[slot] > 0
+
+        self.vectors[slot] = vector
+        self.document_frequency += vector > 0
+        self.expires_at[slot] = expires_at
+        self.scopes[slot] = scope
+        self.values[slot] = value
+
+        self.next_slot = (slot + 1) % len(self.values)
+        self.size = min(self.size + 1, len(self.values))
+
+    def nearest(self, vector, scope, now):
+        """(valor, similaridade do cosseno TF-IDF) da entrada válida mais próxima"""
+        if not self.size:
+            return None, 0.0
+
+        idf = np.log((1 + self.size) / (1 + self.document_frequency)) + 1
+        query = vector * idf
+        query_norm = np.linalg.norm(query)
+        if not query_norm:
+            return None, 0.0
+
+        matrix = self.vectors[:self.size] * idf
+        similarities = matrix @ query / (np.linalg.norm(matrix, axis=1) * query_norm + 1e-12)
+
+        valid = (self.expires_at[:self.size] > now) & (self.scopes[:self.size] == scope)
+        if not valid.any():
+            return None, 0.0
+
+        similarities[~valid] = -1.0
+        best = int(np.argmax(similarities))
+        return self.values[best], float(similarities[best])
+
+
+class SemanticCache:
+    """
+    Camada opcional após o cache exato: reaproveita a resposta de um prompt
+    anterior do mesmo module_type (e mesmo provedor/modelo/parâmetros) quando a
+    similaridade passa de LLM_SEMANTIC_CACHE_THRESHOLD. Índices em memória, por processo.
+    """
+
+    def __init__(self):
+        self._indexes = {}
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+        self._warned = False
+        self.hits = 0
+        self.misses = 0
+
+    def _config(self, name, default):
+        return current_app.config.get(name, default)
+
+    def enabled(self):
+        if not self._config('LLM_SEMANTIC_CACHE_ENABLED', False):
+            return False
+        if np is None:
+            if not self._warned:
+                self._warned = True
+                print("⚠️  LLM_SEMANTIC_CACHE_ENABLED ativo, mas o NumPy não está instalado; cache semântico desligado")
+            return False
+        return True
+
+    def get(self, module_type, scope, prompt, key):
+        """Resposta de um prompt semelhante (dict) ou None"""
+        if not self.enabled():
+            return None
+
+        vector = hashed_ngram_vector(prompt, int(self._config('LLM_SEMANTIC_CACHE_DIMENSIONS', 4096)))
+        threshold = float(self._config('LLM_SEMANTIC_CACHE_THRESHOLD', 0.92))
+
+        with self._lock:
+            self._pending[key] = vector
+            while len(self._pending) > PENDING_VECTORS_LIMIT:
+                self._pending.popitem(last=False)
+
+            index = self._indexes.get(module_type)
+            if index is None or index.vectors.shape[1] != vector.shape[0]:
+                value, similarity = None, 0.0
+            else:
+                value, similarity = index.nearest(vector, hash(scope), time.monotonic())
+
+            hit = value is not None and similarity >= threshold
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if value is not None:
+            record_semantic_lookup(module_type, similarity, hit)
+            if self._config('LLM_SEMANTIC_CACHE_LOG_SCORES', True):
+                print(f"🔎 Cache semântico [{module_type}] similaridade {similarity:.4f} "
+                      f"(limiar {threshold:.2f}): {'acerto' if hit else 'falta'}")
+
+        if not hit:
+            return None
+        return dict(value, cached=True, cache_level='semantic', similarity=round(similarity, 4))
+
+    def set(self, module_type, scope, prompt, key, result):
+        """Indexa uma resposta bem-sucedida"""
+        if not self.enabled():
+            return
+
+        dimensions = int(self._config('LLM_SEMANTIC_CACHE_DIMENSIONS', 4096))
+        with self._lock:
+            vector = self._pending.pop(key, None)
+        if vector is None or vector.shape[0] != dimensions:
+            vector = hashed_ngram_vector(prompt, dimensions)
+
+        ttl = float(self._config('LLM_CACHE_TTL_SECONDS', 3600))
+        capacity = int(self._config('LLM_SEMANTIC_CACHE_MAX_ENTRIES', 500))
+        value = {
+            'success': True,
+            'content': result['content'],
+            'tokens_used': result.get('tokens_used', 0),
+            'response_time_ms': result.get('response_time_ms', 0)
+        }
+
+        with self._lock:
+            index = self._indexes.get(module_type)
+            if index is None or index.vectors.shape != (capacity, dimensions):
+                index = self._indexes[module_type] = _ModuleIndex(dimensions, capacity)
+            index.add(vector, hash(scope), value, time.monotonic() + ttl)
+
+    def clear(self):
+        """Esvazia os índices e zera os contadores"""
+        with self._lock:
+            self._indexes.clear()
+            self._pending.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Acertos, faltas e tamanho dos índices por module_type"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'available': np is not None,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'sizes': {module_type: index.size for module_type, index in self._indexes.items()}
+            }
+
+
+# Instância compartilhada pelo processo
+semantic_cache = SemanticCache()
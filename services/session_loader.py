@@ -0,0 +1,57 @@
+# services/session_loader.py - Carregamento do agregado da sessão em número fixo de consultas
+from sqlalchemy.orm import joinedload, selectinload
+from models import BrainstormSession, GdcTemplate, GdcSection
+
+# Partes do agregado: a sessão e as respostas socráticas vêm numa consulta (JOIN);
+# cards, objetivos e o canvas (templates + seções + notas, com JOIN) custam uma consulta cada
+CARDS = 'cards'
+SOCRATIC = 'socratic'
+OBJECTIVES = 'objectives'
+CANVAS = 'canvas'
+ALL_PARTS = (CARDS, SOCRATIC, OBJECTIVES, CANVAS)
+
+
+def _load_options(parts):
+    options = []
+    for part in parts:
+        if part == CARDS:
+            options.append(selectinload(BrainstormSession.cards))
+        elif part == SOCRATIC:
+            options.append(joinedload(BrainstormSession.socratic_answers))
+        elif part == OBJECTIVES:
+            options.append(selectinload(BrainstormSession.objectives))
+        elif part == CANVAS:
+            options.append(selectinload(BrainstormSession.gdc_templates)
+                           .joinedload(GdcTemplate.sections)
+                           .joinedload(GdcSection.notes))
+        else:
+            raise ValueError(f'Parte da sessão desconhecida: {part}')
+    return options
+
+
+def _session_query(parts):
+    return BrainstormSession.query.options(*_load_options(parts or ALL_PARTS))
+
+
+def load_session(session_id, *parts):
+    """
+    Sessão com as partes pedidas já carregadas (todas, se nenhuma for pedida), ou None.
+    O número de consultas não depende de quantos cards, objetivos ou notas a sessão tem;
+    o nível de cada objetivo vem do registro em memória (services/bloom_taxonomy.py).
+    """
+    return _session_query(parts).filter(BrainstormSession.id == session_id).first()
+
+
+def load_session_or_404(session_id, *parts):
+    """Como load_session, mas responde 404 quando a sessão não existe"""
+    return _session_query(parts).filter(BrainstormSession.id == session_id).first_or_404()
+
+
+def canvas_notes(session):
+    """{nome da seção: [textos das notas]} do canvas da sessão (requer a parte CANVAS)"""
+    canvas = {}
+    for template in session.gdc_templates:
+        for section in template.sections:
+            for note in section.notes:
+                canvas.setdefault(section.name, []).append(note.text)
+    return canvas
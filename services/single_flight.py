@@ -0,0 +1,69 @@
+# services/single_flight.py - Coalescência de chamadas idênticas de LLM em andamento
+import threading
+
+
+def normalize_prompt(prompt):
+    """Normaliza espaços em branco para que prompts equivalentes gerem a mesma chave"""
+    return ' '.join(prompt.split())
+
+
+class _InFlightCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Garante uma única chamada em andamento por chave: chamadas concorrentes
+    com a mesma chave esperam a chamada líder e compartilham o resultado.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """Executa fn() ou espera a execução em andamento para a mesma chave"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _InFlightCall()
+                self._calls[key] = call
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return dict(call.result, coalesced=True)
+
+        try:
+            call.result = fn()
+            return dict(call.result)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        """Contadores de coalescência"""
+        with self._lock:
+            return {
+                'executed': self.executed,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._calls)
+            }
+
+
+# Instância compartilhada pelo processo
+single_flight = SingleFlight()
@@ -0,0 +1,323 @@
+# services/token_accounting.py - Contabilidade de tokens e custos das chamadas de LLM
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+# Preço em USD por milhão de tokens (entrada/saída); sobrescrito por LLM_MODEL_PRICING
+DEFAULT_MODEL_PRICING = {
+    'llama-3.3-70b-versatile': {'prompt': 0.59, 'completion': 0.79},
+    'llama-3.1-8b-instant': {'prompt': 0.05, 'completion': 0.08},
+    'gemini-2.0-flash': {'prompt': 0.10, 'completion': 0.40},
+    'gemini-2.0-flash-lite': {'prompt': 0.075, 'completion': 0.30}
+}
+
+# Decisões do orçamento por sessão
+BUDGET_OK = 'ok'
+BUDGET_DOWNGRADE = 'downgrade'
+BUDGET_BLOCK = 'block'
+
+BUDGET_EXCEEDED_ERROR = 'Orçamento de tokens da sessão esgotado'
+
+# Agrupamentos aceitos nos relatórios
+REPORT_GROUPS = ('day', 'model', 'module_type', 'session_id')
+
+
+def compute_cost(model, prompt_tokens, completion_tokens, total_tokens=0):
+    """
+    Custo em USD de uma chamada.
+    Linhas antigas sem a separação entrada/saída são cobradas pelo preço de entrada.
+    """
+    pricing = current_app.config.get('LLM_MODEL_PRICING', DEFAULT_MODEL_PRICING).get(model)
+    if not pricing:
+        return 0.0
+
+    prompt_tokens = prompt_tokens or 0
+    completion_tokens = completion_tokens or 0
+    if not prompt_tokens and not completion_tokens:
+        prompt_tokens = total_tokens or 0
+
+    return (prompt_tokens * pricing['prompt'] + completion_tokens * pricing['completion']) / 1000000
+
+
+def aggregate_rows(rows):
+    """Soma as linhas de groq_responses por (dia, modelo, módulo, sessão)"""
+    totals = {}
+    for row in rows:
+        created_at = row.get('created_at') or datetime.utcnow()
+        model = row.get('model_used') or 'desconhecido'
+        key = (created_at.date(), model, row.get('module_type') or 'general', row.get('session_id') or 0)
+
+        prompt_tokens = row.get('prompt_tokens') or 0
+        completion_tokens = row.get('completion_tokens') or 0
+        total_tokens = row.get('tokens_used') or (prompt_tokens + completion_tokens)
+
+        entry = totals.setdefault(key, {
+            'requests': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0, 'cost_usd': 0.0
+        })
+        entry['requests'] += 1
+        entry['prompt_tokens'] += prompt_tokens
+        entry['completion_tokens'] += completion_tokens
+        entry['total_tokens'] += total_tokens
+        entry['cost_usd'] += compute_cost(model, prompt_tokens, completion_tokens, total_tokens)
+    return totals
+
+
+def apply_rollups(session, rows):
+    """
+    Acumula as linhas nos totais de token_usage_rollups, na transação do chamador.
+    UPDATE incremental e, se a linha ainda não existir, INSERT (com nova tentativa
+    de UPDATE caso outro processo tenha criado a linha no meio tempo).
+    """
+    from models import TokenUsageRollup
+
+    table = TokenUsageRollup.__table__
+    now = datetime.utcnow()
+
+    for (day, model, module_type, session_id), entry in aggregate_rows(rows).items():
+        cost = Decimal(str(round(entry['cost_usd'], 6)))
+        match = (
+            (table.c.day == day) & (table.c.model == model) &
+            (table.c.module_type == module_type) & (table.c.session_id == session_id)
+        )
+        increment = table.update().where(match).values(
+            requests=table.c.requests + entry['requests'],
+            prompt_tokens=table.c.prompt_tokens + entry['prompt_tokens'],
+            completion_tokens=table.c.completion_tokens + entry['completion_tokens'],
+            total_tokens=table.c.total_tokens + entry['total_tokens'],
+            cost_usd=table.c.cost_usd + cost,
+            updated_at=now
+        )
+
+        if session.execute(increment).rowcount:
+            continue
+
+        try:
+            with session.begin_nested():
+                session.execute(table.insert().values(
+                    day=day, model=model, module_type=module_type, session_id=session_id,
+                    requests=entry['requests'],
+                    prompt_tokens=entry['prompt_tokens'],
+                    completion_tokens=entry['completion_tokens'],
+                    total_tokens=entry['total_tokens'],
+                    cost_usd=cost,
+                    updated_at=now
+                ))
+        except IntegrityError:
+            session.execute(increment)
+
+
+def _budget_configured():
+    """Se há orçamento por sessão (em tokens ou em USD) configurado"""
+    config = current_app.config
+    return bool(int(config.get('LLM_SESSION_TOKEN_BUDGET', 0)) or float(config.get('LLM_SESSION_COST_BUDGET_USD', 0)))
+
+
+def _session_key(session_id):
+    """session_id como inteiro (vem como texto de request.args); None se inválido"""
+    try:
+        return int(session_id) if session_id else None
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenAccounting:
+    """
+    Gasto por sessão para as verificações de orçamento.
+    O total vem de token_usage_rollups (recarregado a cada LLM_BUDGET_CACHE_SECONDS)
+    e é somado em memória às chamadas ainda não gravadas pelo audit sink.
+    """
+
+    def __init__(self):
+        self._spend = {}
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """Descarta o gasto em memória (recarregado dos rollups na próxima consulta)"""
+        with self._lock:
+            self._spend.clear()
+
+    def record_usage(self, session_id, tokens, cost_usd):
+        """
+        Soma uma chamada ao gasto em memória da sessão, carregando o total dos rollups
+        na primeira chamada registrada. Deve rodar antes de a linha ir para o audit sink,
+        senão o total carregado já poderia incluir esta chamada.
+        """
+        session_id = _session_key(session_id)
+        if not session_id or not _budget_configured():
+            return
+        with self._lock:
+            entry = self._spend.get(session_id)
+        if entry is None:
+            entry = self._load_spend(session_id)
+            entry['loaded_at'] = time.monotonic()
+            with self._lock:
+                entry = self._spend.setdefault(session_id, entry)
+        with self._lock:
+            entry['tokens'] += tokens or 0
+            entry['cost_usd'] += cost_usd or 0.0
+
+    def session_spend(self, session_id):
+        """Tokens e custo acumulados da sessão"""
+        ttl = float(current_app.config.get('LLM_BUDGET_CACHE_SECONDS', 30))
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._spend.get(session_id)
+            if entry is not None and now - entry['loaded_at'] < ttl:
+                return {'tokens': entry['tokens'], 'cost_usd': entry['cost_usd']}
+
+        entry = self._load_spend(session_id)
+        entry['loaded_at'] = now
+        with self._lock:
+            self._spend[session_id] = entry
+        return {'tokens': entry['tokens'], 'cost_usd': entry['cost_usd']}
+
+    def _load_spend(self, session_id):
+        from models import TokenUsageRollup, db
+
+        try:
+            tokens, cost = db.session.query(
+                func.coalesce(func.sum(TokenUsageRollup.total_tokens), 0),
+                func.coalesce(func.sum(TokenUsageRollup.cost_usd), 0)
+            ).filter(TokenUsageRollup.session_id == session_id).one()
+            return {'tokens': int(tokens), 'cost_usd': float(cost)}
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️  Erro ao carregar gasto da sessão {session_id}: {e}")
+            return {'tokens': 0, 'cost_usd': 0.0}
+
+    def check_session_budget(self, session_id):
+        """
+        BUDGET_OK dentro do orçamento; acima dele, BUDGET_DOWNGRADE (modelo mais barato)
+        ou BUDGET_BLOCK conforme LLM_BUDGET_EXCEEDED_ACTION. Com 'downgrade', a sessão
+        é bloqueada ao passar de LLM_BUDGET_HARD_LIMIT_FACTOR vezes o orçamento.
+        """
+        status = self.session_budget_status(session_id)
+        return status['decision'] if status else BUDGET_OK
+
+    def session_budget_status(self, session_id):
+        """Gasto, orçamento e decisão atual da sessão (None sem sessão ou sem orçamento)"""
+        config = current_app.config
+        token_budget = int(config.get('LLM_SESSION_TOKEN_BUDGET', 0))
+        cost_budget = float(config.get('LLM_SESSION_COST_BUDGET_USD', 0))
+        session_id = _session_key(session_id)
+        if not session_id or (not token_budget and not cost_budget):
+            return None
+
+        spend = self.session_spend(session_id)
+        usage_ratio = max(
+            spend['tokens'] / token_budget if token_budget else 0.0,
+            spend['cost_usd'] / cost_budget if cost_budget else 0.0
+        )
+
+        decision = BUDGET_OK
+        if usage_ratio >= 1:
+            hard_limit = float(config.get('LLM_BUDGET_HARD_LIMIT_FACTOR', 2.0))
+            action = config.get('LLM_BUDGET_EXCEEDED_ACTION', 'downgrade')
+            decision = BUDGET_BLOCK if action == 'block' or usage_ratio >= hard_limit else BUDGET_DOWNGRADE
+
+        return {
+            'session_id': session_id,
+            'tokens_used': spend['tokens'],
+            'cost_usd': round(spend['cost_usd'], 6),
+            'token_budget': token_budget or None,
+            'cost_budget_usd': cost_budget or None,
+            'usage_ratio': round(usage_ratio, 4),
+            'decision': decision
+        }
+
+
+def cost_report(group_by=('model',), start=None, end=None, session_id=None):
+    """
+    Relatório de tokens e custo a partir de token_usage_rollups.
+    group_by: combinação de 'day', 'model', 'module_type' e 'session_id'.
+    start/end: datas (inclusive).
+    """
+    from models import TokenUsageRollup, db
+
+    invalid = [group for group in group_by if group not in REPORT_GROUPS]
+    if invalid:
+        raise ValueError(f"Agrupamento inválido: {', '.join(invalid)}")
+
+    columns = [getattr(TokenUsageRollup, group) for group in group_by]
+    cost = func.sum(TokenUsageRollup.cost_usd)
+    query = db.session.query(
+        *columns,
+        func.sum(TokenUsageRollup.requests),
+        func.sum(TokenUsageRollup.prompt_tokens),
+        func.sum(TokenUsageRollup.completion_tokens),
+        func.sum(TokenUsageRollup.total_tokens),
+        cost
+    )
+
+    if start:
+        query = query.filter(TokenUsageRollup.day >= start)
+    if end:
+        query = query.filter(TokenUsageRollup.day <= end)
+    if session_id is not None:
+        query = query.filter(TokenUsageRollup.session_id == session_id)
+
+    rows = []
+    for row in query.group_by(*columns).order_by(cost.desc()).all():
+        keys = dict(zip(group_by, row[:len(group_by)]))
+        if 'day' in keys:
+            keys['day'] = keys['day'].isoformat()
+        requests_count, prompt_tokens, completion_tokens, total_tokens, cost_usd = row[len(group_by):]
+        rows.append(dict(
+            keys,
+            requests=int(requests_count or 0),
+            prompt_tokens=int(prompt_tokens or 0),
+            completion_tokens=int(completion_tokens or 0),
+            total_tokens=int(total_tokens or 0),
+            cost_usd=round(float(cost_usd or 0), 6)
+        ))
+
+    return {
+        'group_by': list(group_by),
+        'rows': rows,
+        'total_tokens': sum(row['total_tokens'] for row in rows),
+        'total_cost_usd': round(sum(row['cost_usd'] for row in rows), 6)
+    }
+
+
+def rebuild_rollups(batch_size=1000):
+    """
+    Recalcula token_usage_rollups a partir de groq_responses (uso único, após a migração).
+    Lê apenas as colunas numéricas, sem carregar prompt/response.
+    """
+    from models import GroqResponse, TokenUsageRollup, db
+
+    columns = [
+        GroqResponse.id, GroqResponse.session_id, GroqResponse.model_used, GroqResponse.module_type,
+        GroqResponse.tokens_used, GroqResponse.prompt_tokens, GroqResponse.completion_tokens,
+        GroqResponse.created_at
+    ]
+
+    db.session.query(TokenUsageRollup).delete()
+    processed = 0
+    last_id = 0
+    while True:
+        # Paginação por id: o UPDATE dos rollups não pode intercalar com um cursor aberto
+        batch = [
+            dict(row._mapping) for row in db.session.query(*columns)
+            .filter(GroqResponse.id > last_id)
+            .order_by(GroqResponse.id)
+            .limit(batch_size)
+        ]
+        if not batch:
+            break
+        apply_rollups(db.session, batch)
+        processed += len(batch)
+        last_id = batch[-1]['id']
+
+    db.session.commit()
+    token_accounting.reset()
+    return processed
+
+
+# Instância compartilhada pelo processo
+token_accounting = TokenAccounting()
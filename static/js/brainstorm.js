@@ -32,6 +32,9 @@ document.addEventListener('DOMContentLoaded', function() {
     
     console.log(`✅ Session ID: ${BRAINSTORM_CONFIG.SESSION_ID}`);
     
+    // Alterações de cards vão em lote (requer static/js/card_batch.js carregado antes)
+    initCardBatch(BRAINSTORM_CONFIG.SESSION_ID);
+    
     // Inicializar componentes
     initializeSuggestionsButton();
     initializeAddCardButton();
@@ -1056,30 +1059,8 @@ function updateCardPosition(cardElement, x, y) {
         return;
     }
     
-    console.log(`📍 Atualizando posição do card ${cardId} para (${x}, ${y})`);
-    
-    fetch('/brainstorm/update-card-position', {
-        method: 'POST',
-        headers: {
-            'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-            card_id: parseInt(cardId),
-            position_x: x,
-            position_y: y
-        })
-    })
-    .then(response => response.json())
-    .then(data => {
-        if (data.success) {
-            console.log('✅ Posição atualizada com sucesso');
-        } else {
-            console.error('❌ Erro ao atualizar posição:', data.error);
-        }
-    })
-    .catch(error => {
-        console.error('❌ Erro na requisição de posição:', error);
-    });
+    console.log(`📍 Posição do card ${cardId} na fila: (${x}, ${y})`);
+    queueCardChange(cardId, { position_x: x, position_y: y });
 }
 
 // =============================================================================
@@ -0,0 +1,173 @@
+// =============================================================================
+// FILA DE ALTERAÇÕES DE CARDS (enviadas em lote para /brainstorm/cards/batch)
+// =============================================================================
+
+const CARD_BATCH_CONFIG = {
+    URL: '/brainstorm/cards/batch',
+    SESSION_ID: null,
+    DELAY: 400,        // ms sem novas alterações antes de enviar o lote
+    MAX_DELAY: 2000,   // ms máximos de espera com alterações pendentes
+    RETRY_DELAY: 2000, // ms antes de reenviar um lote que falhou
+    MAX_RETRIES: 5     // falhas seguidas do servidor (5xx) antes de descartar o lote
+};
+
+const cardChangeQueue = {
+    updates: {},        // card_id -> campos alterados (o último valor de cada campo vence)
+    deletes: new Set(),
+    timer: null,
+    firstQueuedAt: null,
+    inFlight: null,     // Promise do envio em andamento
+    serverFailures: 0   // respostas 5xx seguidas
+};
+
+function initCardBatch(sessionId, url) {
+    CARD_BATCH_CONFIG.SESSION_ID = parseInt(sessionId);
+    if (url) {
+        CARD_BATCH_CONFIG.URL = url;
+    }
+}
+
+function queueCardChange(cardId, fields) {
+    const id = parseInt(cardId);
+    if (cardChangeQueue.deletes.has(id)) return;
+
+    cardChangeQueue.updates[id] = Object.assign(cardChangeQueue.updates[id] || {}, fields);
+    scheduleCardBatch();
+}
+
+function queueCardDelete(cardId) {
+    const id = parseInt(cardId);
+    delete cardChangeQueue.updates[id];
+    cardChangeQueue.deletes.add(id);
+    scheduleCardBatch();
+}
+
+function hasPendingCardChanges() {
+    return Object.keys(cardChangeQueue.updates).length > 0 || cardChangeQueue.deletes.size > 0;
+}
+
+function scheduleCardBatch(delay) {
+    // Debounce: cada alteração adia o envio, até o limite de MAX_DELAY
+    const now = Date.now();
+    if (cardChangeQueue.firstQueuedAt === null) {
+        cardChangeQueue.firstQueuedAt = now;
+    }
+
+    if (delay === undefined) {
+        const waited = now - cardChangeQueue.firstQueuedAt;
+        delay = Math.max(0, Math.min(CARD_BATCH_CONFIG.DELAY, CARD_BATCH_CONFIG.MAX_DELAY - waited));
+    }
+
+    clearTimeout(cardChangeQueue.timer);
+    cardChangeQueue.timer = setTimeout(flushCardChanges, delay);
+}
+
+function takeCardBatch() {
+    const batch = {
+        session_id: CARD_BATCH_CONFIG.SESSION_ID,
+        updates: Object.entries(cardChangeQueue.updates).map(([id, fields]) => Object.assign({ card_id: parseInt(id) }, fields)),
+        deletes: Array.from(cardChangeQueue.deletes)
+    };
+
+    cardChangeQueue.updates = {};
+    cardChangeQueue.deletes = new Set();
+    cardChangeQueue.firstQueuedAt = null;
+    clearTimeout(cardChangeQueue.timer);
+    cardChangeQueue.timer = null;
+
+    return batch;
+}
+
+function requeueCardBatch(batch) {
+    // Alterações feitas durante o envio são mais novas e prevalecem
+    batch.updates.forEach(({ card_id, ...fields }) => {
+        if (!cardChangeQueue.deletes.has(card_id)) {
+            cardChangeQueue.updates[card_id] = Object.assign(fields, cardChangeQueue.updates[card_id] || {});
+        }
+    });
+    batch.deletes.forEach(id => cardChangeQueue.deletes.add(id));
+    scheduleCardBatch(CARD_BATCH_CONFIG.RETRY_DELAY);
+}
+
+function flushCardChanges() {
+    // Envia o que estiver pendente; a Promise resolve true quando tudo foi aplicado
+    if (cardChangeQueue.inFlight) {
+        return cardChangeQueue.inFlight.then(() => flushCardChanges());
+    }
+
+    if (!hasPendingCardChanges()) {
+        clearTimeout(cardChangeQueue.timer);
+        return Promise.resolve(true);
+    }
+
+    const batch = takeCardBatch();
+    console.log(`📦 Enviando lote: ${batch.updates.length} alteração(ões), ${batch.deletes.length} remoção(ões)`);
+
+    cardChangeQueue.inFlight = fetch(CARD_BATCH_CONFIG.URL, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(batch)
+    })
+    // Respostas sem JSON (ex.: 502 do proxy) são tratadas pelo status
+    .then(response => response.json().catch(() => ({})).then(data => ({ status: response.status, data })))
+    .then(({ status, data }) => {
+        if (data.success) {
+            cardChangeQueue.serverFailures = 0;
+            console.log(`✅ Lote aplicado: ${data.updated} atualizado(s), ${data.deleted} removido(s)`);
+            if (data.missing && data.missing.length) {
+                console.warn('⚠️ Cards não encontrados na sessão:', data.missing);
+            }
+            return true;
+        }
+        if (status >= 500) {
+            cardChangeQueue.serverFailures += 1;
+            if (cardChangeQueue.serverFailures > CARD_BATCH_CONFIG.MAX_RETRIES) {
+                // O servidor continua recusando: descartar para não reenviar para sempre
+                console.error(`❌ Lote descartado após ${CARD_BATCH_CONFIG.MAX_RETRIES} novas tentativas:`, data.error, batch);
+                cardChangeQueue.serverFailures = 0;
+            } else {
+                console.error('❌ Erro ao aplicar lote, tentando novamente:', data.error);
+                requeueCardBatch(batch);
+            }
+        } else {
+            // Lote inválido: reenviar não adianta
+            console.error('❌ Lote rejeitado:', data.error);
+        }
+        return false;
+    })
+    .catch(error => {
+        // Falha de rede (ex.: sem conexão): reenviar até voltar, sem limite
+        console.error('❌ Erro na requisição do lote:', error);
+        requeueCardBatch(batch);
+        return false;
+    })
+    .finally(() => {
+        cardChangeQueue.inFlight = null;
+    });
+
+    return cardChangeQueue.inFlight;
+}
+
+function flushCardChangesOnExit() {
+    // Ao sair da página, envia o que estiver pendente sem esperar resposta
+    if (!hasPendingCardChanges()) return;
+
+    const body = new Blob([JSON.stringify(takeCardBatch())], { type: 'application/json' });
+    if (!navigator.sendBeacon || !navigator.sendBeacon(CARD_BATCH_CONFIG.URL, body)) {
+        fetch(CARD_BATCH_CONFIG.URL, { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: body, keepalive: true });
+    }
+}
+
+window.addEventListener('pagehide', flushCardChangesOnExit);
+document.addEventListener('visibilitychange', function() {
+    if (document.visibilityState === 'hidden') {
+        flushCardChangesOnExit();
+    }
+});
+
+window.initCardBatch = initCardBatch;
+window.queueCardChange = queueCardChange;
+window.queueCardDelete = queueCardDelete;
+window.flushCardChanges = flushCardChanges;
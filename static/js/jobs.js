@@ -0,0 +1,71 @@
+// =============================================================================
+// JOBS EM SEGUNDO PLANO (enfileirados com 202 e acompanhados em /jobs/<id>)
+// =============================================================================
+
+const JOB_CONFIG = {
+    POLL_INTERVAL: 1000,  // ms entre consultas ao estado do job
+    TIMEOUT: 300000       // ms máximos de espera pelo resultado
+};
+
+function runJob(url, payload, onProgress) {
+    // Enfileira o job; a Promise resolve com o resultado ou rejeita com a mensagem de erro
+    return fetch(url, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(payload)
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (!data.success) {
+            throw new Error(data.error || 'Erro ao enfileirar a tarefa');
+        }
+        console.log(`⏳ Job ${data.job_id} enfileirado`);
+        return waitForJob(data.status_url, Date.now() + JOB_CONFIG.TIMEOUT, onProgress);
+    });
+}
+
+function waitForJob(statusUrl, deadline, onProgress) {
+    return new Promise((resolve, reject) => {
+        function poll() {
+            fetch(statusUrl)
+            .then(response => response.json())
+            .then(data => {
+                if (!data.success) {
+                    reject(new Error(data.error || 'Tarefa não encontrada'));
+                    return;
+                }
+
+                const job = data.job;
+                if (job.status === 'succeeded') {
+                    resolve(job.result);
+                } else if (job.status === 'failed') {
+                    reject(new Error(job.error || 'A tarefa falhou'));
+                } else {
+                    if (onProgress) {
+                        onProgress(job);
+                    }
+                    retry();
+                }
+            })
+            .catch(error => {
+                // Falha de rede numa consulta: tenta de novo até o prazo
+                console.warn('⚠️ Erro ao consultar o job:', error);
+                retry();
+            });
+        }
+
+        function retry() {
+            if (Date.now() > deadline) {
+                reject(new Error('Tempo esgotado aguardando a tarefa'));
+            } else {
+                setTimeout(poll, JOB_CONFIG.POLL_INTERVAL);
+            }
+        }
+
+        poll();
+    });
+}
+
+window.runJob = runJob;
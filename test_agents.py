@@ -16,6 +16,7 @@ from app import create_app
 from services.multiagent_service import MultiAgentService
 from services.groq_service import GroqService
 from services.gemini_service import GeminiService
+from services.llm_service import LLMServiceError
 
 def test_individual_services():
     """Testa serviços individualmente"""
@@ -119,13 +120,17 @@ Problema: Crianças têm dificuldade com matemática básica
 Motivação: Tornar matemática divertida e envolvente
 """
         
-        response = multiagent._get_agent_response(
-            'narrative', 
-            agent, 
-            context, 
-            "Como criar uma narrativa envolvente para este jogo?", 
-            {}
-        )
+        try:
+            response = multiagent._get_agent_response(
+                'narrative', 
+                agent, 
+                context, 
+                "Como criar uma narrativa envolvente para este jogo?", 
+                {}
+            )
+        except LLMServiceError as e:
+            print(f"❌ Erro ao obter resposta: {e}")
+            return
         
         print(f"\nResposta:")
         print(f"   {response[:200]}...")
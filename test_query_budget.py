@@ -0,0 +1,176 @@
+# test_query_budget.py - Teste do Orçamento de Consultas por Sessão
+"""
+Script para verificar que as leituras do agregado da sessão custam um número
+fixo e pequeno de consultas, não importa quantos cards, objetivos e notas a
+sessão tenha (sem N+1).
+
+Cria duas sessões sintéticas (uma pequena e uma com muitas linhas), mede
+cada leitura dentro de query_budget e falha se o orçamento for excedido ou
+se a sessão grande custar mais consultas que a pequena. Remove tudo ao final.
+Use um banco de desenvolvimento.
+
+Requer as migrations aplicadas (flask db upgrade).
+
+Uso: python test_query_budget.py [--rows N]  (ou QUERY_BUDGET_SEED_ROWS)
+"""
+
+import sys
+import os
+import argparse
+
+# Adicionar diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import select, insert, delete
+from app import create_app
+from extensions import db
+from models import (
+    BrainstormSession, Card, SocraticSessionAnswers, BloomObjective, BloomTaxonomyLevel,
+    GdcTemplate, GdcSection, GdcNote
+)
+from services.multiagent_service import MultiAgentService
+from services.query_audit import query_budget, QueryBudgetExceeded
+
+SEED_THEME = '__query_budget_seed__'
+SMALL_ROWS = 2
+SECTIONS = 12
+
+# Consultas permitidas por leitura (sessão + respostas socráticas, cards, objetivos, canvas)
+QUERY_BUDGETS = {
+    'contexto da sessão': 4,
+    'página do Bloom': 2,
+    'página do Game Design': 2,
+}
+
+def seed_session(connection, rows):
+    """Sessão com rows cards, objetivos e notas (espalhadas em SECTIONS seções); retorna o id"""
+    session_id = connection.execute(
+        insert(BrainstormSession).values(theme=SEED_THEME, status='active')
+    ).inserted_primary_key[0]
+
+    level_ids = connection.execute(select(BloomTaxonomyLevel.id)).scalars().all() or [None]
+
+    connection.execute(insert(Card), [{'session_id': session_id, 'content': f'card {i}'} for i in range(rows)])
+    connection.execute(insert(BloomObjective), [{
+        'session_id': session_id, 'content': f'objetivo {i}', 'level_id': level_ids[i % len(level_ids)]
+    } for i in range(rows)])
+    connection.execute(insert(SocraticSessionAnswers).values(
+        session_id=session_id,
+        answers_json={'problem': 'p', 'justification': 'j', 'impact': 'i', 'motivation': 'm'}
+    ))
+
+    template_id = connection.execute(
+        insert(GdcTemplate).values(session_id=session_id, name='Endo-GDC')
+    ).inserted_primary_key[0]
+    connection.execute(insert(GdcSection), [{'template_id': template_id, 'name': f'seção {i}'}
+                                            for i in range(SECTIONS)])
+    section_ids = connection.execute(
+        select(GdcSection.id).where(GdcSection.template_id == template_id).order_by(GdcSection.id)
+    ).scalars().all()
+    connection.execute(insert(GdcNote), [{'section_id': section_ids[i % len(section_ids)], 'content': f'nota {i}'}
+                                         for i in range(rows)])
+    return session_id
+
+def remove_seed(connection):
+    """Apaga as sessões sintéticas (também as de uma execução interrompida)"""
+    session_ids = select(BrainstormSession.id).where(BrainstormSession.theme == SEED_THEME).scalar_subquery()
+    template_ids = select(GdcTemplate.id).where(GdcTemplate.session_id.in_(session_ids)).scalar_subquery()
+    section_ids = select(GdcSection.id).where(GdcSection.template_id.in_(template_ids)).scalar_subquery()
+
+    connection.execute(delete(GdcNote).where(GdcNote.section_id.in_(section_ids)))
+    connection.execute(delete(GdcSection).where(GdcSection.template_id.in_(template_ids)))
+    for model in (GdcTemplate, Card, BloomObjective, SocraticSessionAnswers):
+        connection.execute(delete(model).where(model.session_id.in_(session_ids)))
+    connection.execute(delete(BrainstormSession).where(BrainstormSession.theme == SEED_THEME))
+
+def session_reads(app):
+    """Leituras medidas: (nome, função que recebe o id da sessão)"""
+    client = app.test_client()
+
+    def get_page(path):
+        def load(session_id):
+            response = client.get(f'{path}?session_id={session_id}')
+            assert response.status_code == 200, f'{path} respondeu {response.status_code}'
+        return load
+
+    def session_context(session_id):
+        # Identity map limpo: a leitura precisa ir ao banco como numa requisição nova
+        db.session.expire_all()
+        MultiAgentService().get_session_context(session_id)
+
+    return [
+        ('contexto da sessão', session_context),
+        ('página do Bloom', get_page('/bloom/')),
+        ('página do Game Design', get_page('/gamedesign/')),
+    ]
+
+def count_queries(label, read, session_id):
+    """Consultas de uma leitura; levanta QueryBudgetExceeded acima do orçamento"""
+    with query_budget(QUERY_BUDGETS[label], label) as audit:
+        read(session_id)
+    return audit.count
+
+def check_query_budgets(rows=None):
+    """Mede cada leitura nas sessões pequena e grande; retorna a lista de falhas"""
+    if rows is None:
+        rows = int(os.environ.get('QUERY_BUDGET_SEED_ROWS', 200))
+
+    print("🧪 TESTE DO ORÇAMENTO DE CONSULTAS")
+    print("=" * 50)
+
+    app = create_app()
+    failures = []
+
+    with app.app_context():
+        print(f"Banco: {db.engine.dialect.name} (sessões com {SMALL_ROWS} e {rows} linhas por parte)\n")
+        try:
+            with db.engine.begin() as connection:
+                remove_seed(connection)
+                small_id = seed_session(connection, SMALL_ROWS)
+                large_id = seed_session(connection, rows)
+
+            for label, read in session_reads(app):
+                # Primeira leitura fora da medição: aquece caches do processo (ex.: níveis de Bloom)
+                read(small_id)
+                try:
+                    small = count_queries(label, read, small_id)
+                    large = count_queries(label, read, large_id)
+                except QueryBudgetExceeded as e:
+                    failures.append(label)
+                    print(f"   ✗ {label}: {e}")
+                    continue
+
+                if large > small:
+                    failures.append(label)
+                    print(f"   ✗ {label}: {small} consultas com {SMALL_ROWS} linhas, {large} com {rows}")
+                else:
+                    print(f"   ✓ {label}: {large} consultas (orçamento {QUERY_BUDGETS[label]})")
+        finally:
+            db.session.remove()
+            with db.engine.begin() as connection:
+                remove_seed(connection)
+
+    return failures
+
+def test_query_budgets():
+    """Nenhuma leitura da sessão pode passar do orçamento nem crescer com o tamanho da sessão"""
+    failures = check_query_budgets()
+    assert not failures, f"Leituras acima do orçamento: {', '.join(failures)}"
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description='Verifica o número de consultas das leituras da sessão')
+    parser.add_argument('--rows', type=int, default=None,
+                        help='cards, objetivos e notas da sessão grande (padrão: QUERY_BUDGET_SEED_ROWS ou 200)')
+    args = parser.parse_args()
+
+    failures = check_query_budgets(args.rows)
+
+    print("\n" + "=" * 50)
+    if failures:
+        print(f"❌ {len(failures)} leitura(s) acima do orçamento: {', '.join(failures)}")
+        sys.exit(1)
+    print("✅ Todas as leituras da sessão dentro do orçamento")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+# test_query_plans.py - Teste dos Planos de Consulta (EXPLAIN)
+"""
+Script para verificar se as consultas mais frequentes usam índices.
+Roda EXPLAIN (MySQL) ou EXPLAIN QUERY PLAN (SQLite) no banco configurado
+e falha se alguma consulta quente cair em varredura completa da tabela.
+
+Com tabelas quase vazias o otimizador prefere varrer a tabela, então o teste
+insere linhas sintéticas (uma sessão marcada por tema), roda ANALYZE e remove
+tudo ao final. Use um banco de desenvolvimento.
+
+Requer as migrations aplicadas (flask db upgrade).
+
+Uso: python test_query_plans.py [--seed-rows N]  (ou QUERY_PLAN_SEED_ROWS; 0 = sem dados)
+"""
+
+import sys
+import os
+import argparse
+from datetime import datetime, timedelta
+
+# Adicionar diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import select, insert, delete
+from app import create_app
+from extensions import db
+from models import (
+    BrainstormSession, Card, SocraticSessionAnswers, BloomObjective, BloomTaxonomyLevel, GameGroup,
+    GdcTemplate, GdcSection, GdcNote, GroqResponse, TokenUsageRollup
+)
+
+SEED_THEME = '__query_plan_seed__'
+SEED_MODULES = ['bloom', 'socratic', 'gdc', 'brainstorm', 'groups']
+
+def seed_rows(connection, count):
+    """Insere ~count linhas por tabela quente; retorna os ids usados nas consultas"""
+    sessions = max(count // 10, 2)
+    now = datetime.utcnow()
+
+    connection.execute(insert(BrainstormSession),
+                       [{'theme': SEED_THEME, 'status': 'completed'} for _ in range(sessions)])
+    session_ids = connection.execute(
+        select(BrainstormSession.id).where(BrainstormSession.theme == SEED_THEME).order_by(BrainstormSession.id)
+    ).scalars().all()
+
+    def spread(i):
+        return session_ids[i % len(session_ids)]
+
+    connection.execute(insert(Card), [{'session_id': spread(i), 'content': f'card {i}'} for i in range(count)])
+    connection.execute(insert(BloomObjective),
+                       [{'session_id': spread(i), 'content': f'objetivo {i}'} for i in range(count)])
+    connection.execute(insert(GameGroup), [{'session_id': spread(i), 'name': f'grupo {i}'} for i in range(count)])
+    connection.execute(insert(SocraticSessionAnswers),
+                       [{'session_id': session_id, 'answers_json': {}} for session_id in session_ids])
+    connection.execute(insert(GdcTemplate),
+                       [{'session_id': session_id, 'name': 'GDC'} for session_id in session_ids])
+    template_ids = connection.execute(
+        select(GdcTemplate.id).where(GdcTemplate.session_id.in_(session_ids)).order_by(GdcTemplate.id)
+    ).scalars().all()
+    connection.execute(insert(GdcSection), [{'template_id': template_ids[i % len(template_ids)], 'name': f'seção {i}'}
+                                            for i in range(count)])
+    section_ids = connection.execute(
+        select(GdcSection.id).where(GdcSection.template_id.in_(template_ids)).order_by(GdcSection.id)
+    ).scalars().all()
+    connection.execute(insert(GdcNote), [{'section_id': section_ids[i % len(section_ids)], 'content': f'nota {i}'}
+                                         for i in range(count)])
+    connection.execute(insert(GroqResponse), [{
+        'session_id': spread(i), 'prompt': 'p', 'response': 'r', 'tokens_used': 1,
+        'module_type': SEED_MODULES[i % len(SEED_MODULES)], 'prompt_hash': f'{i:064x}',
+        'created_at': now - timedelta(hours=i * 17 % (24 * 730)),
+    } for i in range(count)])
+    connection.execute(insert(TokenUsageRollup), [{
+        'day': (now - timedelta(days=i // len(SEED_MODULES))).date(), 'model': 'seed',
+        'module_type': SEED_MODULES[i % len(SEED_MODULES)], 'session_id': spread(i),
+    } for i in range(count)])
+
+    return {'session_id': session_ids[0], 'template_ids': template_ids[:2], 'section_ids': section_ids[:3]}
+
+def remove_seed(connection):
+    """Apaga as linhas sintéticas (também as de uma execução interrompida)"""
+    session_ids = select(BrainstormSession.id).where(BrainstormSession.theme == SEED_THEME).scalar_subquery()
+    template_ids = select(GdcTemplate.id).where(GdcTemplate.session_id.in_(session_ids)).scalar_subquery()
+    section_ids = select(GdcSection.id).where(GdcSection.template_id.in_(template_ids)).scalar_subquery()
+
+    connection.execute(delete(GdcNote).where(GdcNote.section_id.in_(section_ids)))
+    connection.execute(delete(GdcSection).where(GdcSection.template_id.in_(template_ids)))
+    for model in (GdcTemplate, Card, BloomObjective, GameGroup, SocraticSessionAnswers,
+                  GroqResponse, TokenUsageRollup):
+        connection.execute(delete(model).where(model.session_id.in_(session_ids)))
+    connection.execute(delete(BrainstormSession).where(BrainstormSession.theme == SEED_THEME))
+
+def analyze(connection, tables):
+    """Atualiza as estatísticas que o otimizador usa para escolher o plano"""
+    if connection.dialect.name == 'mysql':
+        connection.exec_driver_sql(f"ANALYZE TABLE {', '.join(sorted(tables))}").fetchall()
+    else:
+        connection.exec_driver_sql('ANALYZE')
+
+def hot_queries(session_id=1, template_ids=(1, 2), section_ids=(1, 2, 3)):
+    """Consultas representativas dos caminhos de acesso da aplicação"""
+    since = datetime(2026, 1, 1)
+    return [
+        ('cards da sessão', 'cards',
+         select(Card).where(Card.session_id == session_id).order_by(Card.id)),
+        ('respostas socráticas da sessão', 'socratic_session_answers',
+         select(SocraticSessionAnswers).where(SocraticSessionAnswers.session_id == session_id)),
+        ('objetivos da sessão', 'bloom_objectives',
+         select(BloomObjective).where(BloomObjective.session_id == session_id).order_by(BloomObjective.id)),
+        ('nível de Bloom pelo nome', 'bloom_taxonomy_levels',
+         select(BloomTaxonomyLevel).where(BloomTaxonomyLevel.name == 'Criar')),
+        ('grupos da sessão', 'game_groups',
+         select(GameGroup).where(GameGroup.session_id == session_id)),
+        ('templates da sessão', 'gdc_templates',
+         select(GdcTemplate).where(GdcTemplate.session_id == session_id)),
+        ('seções do template', 'gdc_sections',
+         select(GdcSection).where(GdcSection.template_id.in_(list(template_ids))).order_by(GdcSection.id)),
+        ('notas das seções', 'gdc_notes',
+         select(GdcNote).where(GdcNote.section_id.in_(list(section_ids))).order_by(GdcNote.id)),
+        ('cache L2 de respostas', 'groq_responses',
+         select(GroqResponse.id).where(GroqResponse.prompt_hash == 'a' * 64,
+                                       GroqResponse.created_at >= since)),
+        ('respostas por módulo e período', 'groq_responses',
+         select(GroqResponse.id, GroqResponse.tokens_used)
+         .where(GroqResponse.module_type == 'bloom', GroqResponse.created_at >= since)
+         .order_by(GroqResponse.created_at.desc())),
+        ('histórico de respostas da sessão', 'groq_responses',
+         select(GroqResponse.id).where(GroqResponse.session_id == session_id,
+                                       GroqResponse.created_at >= since - timedelta(days=30))),
+        ('custos da sessão', 'token_usage_rollups',
+         select(TokenUsageRollup).where(TokenUsageRollup.session_id == session_id)),
+    ]
+
+def explain(connection, statement):
+    """Linhas do plano de execução da consulta"""
+    dialect = connection.dialect
+    compiled = statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True})
+    prefix = 'EXPLAIN QUERY PLAN ' if dialect.name == 'sqlite' else 'EXPLAIN '
+    result = connection.exec_driver_sql(prefix + str(compiled))
+    return [dict(row._mapping) for row in result]
+
+def full_scans(dialect_name, table, plan):
+    """Passos do plano que leem a tabela inteira (lista vazia = consulta indexada)"""
+    if dialect_name == 'sqlite':
+        # 'SCAN tabela' sem índice é varredura completa; 'SEARCH ... USING INDEX' é busca indexada
+        return [row['detail'] for row in plan
+                if row['detail'].startswith(f'SCAN {table}') and 'USING' not in row['detail']]
+    if dialect_name == 'mysql':
+        # type=ALL (tabela inteira), type=index (índice inteiro) ou nenhuma chave usada;
+        # linhas sem a tabela (ex.: 'no matching row in const table') não leem nada
+        return [f"type={row.get('type')} key={row.get('key')} rows={row.get('rows')}" for row in plan
+                if row.get('table') == table and (row.get('type') in ('ALL', 'index') or not row.get('key'))]
+    raise RuntimeError(f'Dialeto sem suporte no teste de planos: {dialect_name}')
+
+def check_query_plans(seed=None):
+    """Roda EXPLAIN nas consultas quentes; retorna a lista de falhas"""
+    if seed is None:
+        seed = int(os.environ.get('QUERY_PLAN_SEED_ROWS', 1000))
+
+    print("🧪 TESTE DOS PLANOS DE CONSULTA")
+    print("=" * 50)
+
+    app = create_app()
+    failures = []
+
+    with app.app_context():
+        with db.engine.connect() as connection:
+            dialect_name = connection.dialect.name
+            print(f"Banco: {dialect_name} ({seed} linhas sintéticas por tabela)\n")
+
+            queries = hot_queries()
+            try:
+                if seed:
+                    with connection.begin():
+                        remove_seed(connection)
+                        queries = hot_queries(**seed_rows(connection, seed))
+                analyze(connection, {table for _, table, _ in queries})
+                if connection.in_transaction():
+                    connection.commit()
+
+                for label, table, statement in queries:
+                    plan = explain(connection, statement)
+                    scans = full_scans(dialect_name, table, plan)
+                    if scans:
+                        failures.append(label)
+                        print(f"   ✗ {label}: varredura completa em {table} ({'; '.join(scans)})")
+                    else:
+                        print(f"   ✓ {label}")
+            finally:
+                if connection.in_transaction():
+                    connection.rollback()
+                if seed:
+                    with connection.begin():
+                        remove_seed(connection)
+
+    return failures
+
+def test_query_plans():
+    """Nenhuma consulta quente pode varrer a tabela inteira"""
+    failures = check_query_plans()
+    assert not failures, f"Consultas sem índice: {', '.join(failures)}"
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description='Verifica os planos das consultas quentes')
+    parser.add_argument('--seed-rows', type=int, default=None,
+                        help='linhas sintéticas por tabela antes do EXPLAIN (padrão: QUERY_PLAN_SEED_ROWS ou 1000)')
+    args = parser.parse_args()
+
+    failures = check_query_plans(args.seed_rows)
+
+    print("\n" + "=" * 50)
+    if failures:
+        print(f"❌ {len(failures)} consulta(s) sem índice: {', '.join(failures)}")
+        sys.exit(1)
+    print("✅ Todas as consultas quentes usam índices")
+
+if __name__ == "__main__":
+    main()